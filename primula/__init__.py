@@ -1,15 +1,57 @@
 from .base import Level, Pin, Pull
 from .wire import Wire
+from .simulation import Simulation
 from . import gates
 from . import latches
 from . import flipflops
+from . import trace
+from . import activity
+from . import timing
+from . import netlist
+from .netlist import Netlist
+from . import vector
+from . import fault
+from . import netfile
+from . import subcircuit
+from .subcircuit import Subcircuit
+from .deferred import building
+from . import importer
+from . import vcd
+from .sweep import sweep
+from .snapshot import snapshot
+from . import bus
+from .bus import Bus
+from . import memory
+from .clock import Clock
+from .store import Store
 
 __all__ = (
     'Level',
     'Pin',
     'Pull',
     'Wire',
+    'Simulation',
     'gates',
     'latches',
     'flipflops',
+    'trace',
+    'activity',
+    'timing',
+    'netlist',
+    'Netlist',
+    'vector',
+    'fault',
+    'netfile',
+    'subcircuit',
+    'Subcircuit',
+    'building',
+    'importer',
+    'vcd',
+    'sweep',
+    'snapshot',
+    'bus',
+    'Bus',
+    'memory',
+    'Clock',
+    'Store',
 )
@@ -2,7 +2,7 @@ from argparse import ArgumentParser
 from . import console  # noqa
 import logging
 
-from primula import latches, Pull, Wire, Level
+from primula import latches, trace, server, Pull, Wire, Level
 
 log = logging.getLogger()
 
@@ -13,6 +13,14 @@ def main():
                       action='count',
                       default=0,
                       help='Be more talkative')
+    cmds = opts.add_subparsers(dest='command')
+    serve = cmds.add_parser('serve',
+                            help='Serve a circuit on a Unix domain socket')
+    serve.add_argument('circuit',
+                       help='Netlist file, BLIF (.blif) or Verilog (.v)')
+    serve.add_argument('--socket', '-s',
+                       default='primula.sock',
+                       help='Path of the socket to listen on')
 
     args = opts.parse_args()
     if args.verbose >= 2:
@@ -22,6 +30,18 @@ def main():
     else:
         log.setLevel(logging.WARNING)
 
+    if args.verbose:
+        trace.attach(trace.LoggingSink())
+
+    if args.command == 'serve':
+        nl = server.load(args.circuit)
+        log.info('serving %d nets on %s', nl.nr_nets, args.socket)
+        try:
+            server.serve(nl, args.socket)
+        except KeyboardInterrupt:
+            pass
+        return
+
     s = Wire('S', Pull.DOWN)
     r = Wire('R', Pull.DOWN)
     q = Wire('Q')
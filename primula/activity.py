@@ -0,0 +1,155 @@
+from typing import Optional, List, Dict, Any, Iterator
+from contextlib import contextmanager
+from array import array
+from .base import ComponentBase
+
+
+class Profiler:
+    """
+    Count where the events of `Simulation.run` go.
+
+    Every wire and component which receives an event gets an index the first
+    time it does, and the counters are arrays by that index: `received` is
+    the number of events delivered to it and `emitted` the number of events
+    that produced. The ratio of the two is its fan-out. For each settle,
+    `depths` has the number of waves of events it took to reach the fix-point
+    and `sizes` the number of events.
+
+    Attach one with `attach` or `profiling`. While none is attached the only
+    cost is an `is None` test per settle. While one is, the index of each
+    object it has seen is kept in the object's `_activity` slot, so each
+    event costs a slot lookup and two array increments more.
+    """
+
+    __slots__ = (
+        'objects',
+        'received',
+        'emitted',
+        'depths',
+        'sizes',
+        '_index',
+    )
+
+    objects: List[ComponentBase]
+    received: array
+    emitted: array
+    depths: array
+    sizes: array
+    _index: Dict[ComponentBase, int]
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        if profiler is self:
+            self._unstamp()
+        self.objects = []
+        self.received = array('Q')
+        self.emitted = array('Q')
+        self.depths = array('I')
+        self.sizes = array('Q')
+        self._index = {}
+
+    def _add(self, obj: ComponentBase) -> int:
+        i = len(self.objects)
+        obj._activity = i
+        self._index[obj] = i
+        self.objects.append(obj)
+        self.received.append(0)
+        self.emitted.append(0)
+        return i
+
+    def _stamp(self) -> None:
+        for i, obj in enumerate(self.objects):
+            obj._activity = i
+
+    def _unstamp(self) -> None:
+        for obj in self.objects:
+            del obj._activity
+
+    def index(self, obj: ComponentBase) -> Optional[int]:
+        return self._index.get(obj)
+
+    def _entry(self, i: int) -> Dict[str, Any]:
+        obj = self.objects[i]
+        received = self.received[i]
+        return {
+            'name': getattr(obj, 'name', None) or str(obj),
+            'type': type(obj).__name__,
+            'received': received,
+            'emitted': self.emitted[i],
+            'fanout': self.emitted[i] / received if received else 0.0,
+        }
+
+    def report(self, top: int = 10) -> Dict[str, Any]:
+        """
+        Totals, settle depths and the `top` busiest nets, busiest components
+        and biggest fan-out amplifiers, as plain data
+        """
+
+        # Imported here as wire imports the simulation, which imports this
+        from .wire import Wire
+        from .component import Component
+
+        received = self.received
+        nets = [i for i, o in enumerate(self.objects) if isinstance(o, Wire)]
+        comps = [i for i, o in enumerate(self.objects)
+                 if isinstance(o, Component)]
+
+        def busiest(ids: List[int]) -> List[Dict[str, Any]]:
+            ids = sorted(ids, key=lambda i: received[i], reverse=True)
+            return [self._entry(i) for i in ids[:top]]
+
+        def fanout(i: int) -> float:
+            return self.emitted[i] / received[i] if received[i] else 0.0
+
+        amps = sorted(nets + comps, key=fanout, reverse=True)
+        depths = self.depths
+
+        return {
+            'settles': len(depths),
+            'events': sum(self.sizes),
+            'nets': len(nets),
+            'components': len(comps),
+            'depth_max': max(depths, default=0),
+            'depth_mean': sum(depths) / len(depths) if depths else 0.0,
+            'hot_nets': busiest(nets),
+            'hot_components': busiest(comps),
+            'amplifiers': [self._entry(i) for i in amps[:top]],
+        }
+
+
+profiler: Optional[Profiler] = None
+
+
+def attach(new: Optional[Profiler]) -> Optional[Profiler]:
+    """
+    Attach a profiler, or detach with None. Returns the previous profiler.
+    """
+
+    global profiler
+    old = profiler
+    if old is not None:
+        old._unstamp()
+    if new is not None:
+        new._stamp()
+    profiler = new
+    return old
+
+
+@contextmanager
+def profiling(new: Optional[Profiler] = None) -> Iterator[Profiler]:
+    if new is None:
+        new = Profiler()
+    old = attach(new)
+    try:
+        yield new
+    finally:
+        attach(old)
+
+
+__all__ = (
+    'Profiler',
+    'attach',
+    'profiling',
+)
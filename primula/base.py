@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Generator, NamedTuple, Iterator
+from typing import Generator, Tuple, Iterator, Optional, ClassVar, Dict
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 from enum import Enum
@@ -45,6 +45,12 @@ class Pull(Enum):
 
 @dataclass
 class ComponentPin:
+    # There are a few of these for every pin in a circuit
+    __slots__ = (
+        'component',
+        'pin',
+    )
+
     component: ComponentBase
     pin: int
 
@@ -59,7 +65,7 @@ class ComponentPin:
     def propagate(self,
                   level: Level,
                   epoch: SimStep) -> EventGenerator:
-        yield from self.component.propagate(self.pin, level, epoch)
+        return self.component.propagate(self.pin, level, epoch)
 
     def connected_pin(self, other: ComponentPin) -> None:
         return self.component.connected_pin(self.pin, other)
@@ -78,8 +84,45 @@ class SimStep:
     __slots__ = ('__weakref__',)
 
 
+class MergeStep(SimStep):
+    """
+    A step in which a wire may change more than once, taking the latest
+    level rather than going in to error, for changes which are made all at
+    once but which reach some wire by different routes. That is only as
+    long as it is the same driver changing its mind, two drivers still
+    conflict. After `max_merges` changes a wire is taken to be oscillating
+    and goes in to error after all.
+    """
+
+    __slots__ = ('_merges', )
+
+    max_merges: ClassVar[int] = 64
+
+    def __init__(self):
+        self._merges: Dict[object, int] = {}
+
+    def merge(self, net: object) -> bool:
+        """
+        Count another change of net in this step, False if it has changed
+        too many times already
+        """
+
+        n = self._merges.get(net, 0)
+        if n == self.max_merges:
+            return False
+        self._merges[net] = n + 1
+        return True
+
+
 class ComponentBase(ABC):
-    __slots__ = ()
+    # Index in to the counters of the attached activity.Profiler, only set
+    # while one is attached and has seen the object
+    __slots__ = ('_activity', )
+
+    _activity: int
+
+    # Propagation delay in ticks, only used by timed simulations
+    _delay: int = 0
 
     @abstractmethod
     def propagate(self,
@@ -104,11 +147,10 @@ class ComponentBase(ABC):
         return ComponentPin(self, pin)
 
 
-class Event(NamedTuple):
-    src: ComponentPin
-    dst: ComponentPin
-    level: Level
-
+# An event is a plain (source, destination, level) tuple. Pin handles and
+# levels are all shared objects so the only allocation per event is the tuple
+# itself. The source is None for events from outside the circuit.
+Event = Tuple[Optional[ComponentPin], ComponentPin, Level]
 
 EventGenerator = Generator[Event, None, None]
 
@@ -118,6 +160,7 @@ __all__ = (
     'Pull',
     'ComponentPin',
     'SimStep',
+    'MergeStep',
     'ComponentBase',
     'Event',
     'EventGenerator',
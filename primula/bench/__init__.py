@@ -0,0 +1,159 @@
+from typing import List, Iterable, NamedTuple, Dict, Any, Optional
+from time import perf_counter
+import gc
+import platform
+import sys
+import tracemalloc
+from ..simulation import Simulation
+from ..deferred import building
+from ..netlist import _walk
+from .circuits import Circuit, CIRCUITS
+
+
+class Result(NamedTuple):
+    """
+    Measurements of one circuit at one size.
+
+    Times are in seconds except for the per-step latencies, which are in
+    microseconds. A step is one stimulus: a single settle for the adders,
+    the inverter chain and the nand tree, but a pulse, so two of them, for
+    the counter and the SR latches. `failures` counts steps after which
+    the outputs were wrong, which should never happen: the numbers of a run
+    with failures are of a simulation that went wrong, such as a wire
+    driven twice in one settle so that it went to ERR.
+    """
+
+    circuit: str
+    size: int
+    components: int
+    build_s: float
+    peak_bytes: Optional[int]
+    steps: int
+    events: int
+    run_s: float
+    events_per_s: float
+    step_mean_us: float
+    step_max_us: float
+    failures: int
+
+
+def _build(name: str, size: int, deferred: bool) -> Circuit:
+    if not deferred:
+        return CIRCUITS[name](size)
+    with building():
+        return CIRCUITS[name](size)
+
+
+def _components(c: Circuit) -> int:
+    wires, comps = _walk(tuple(c.inputs))
+    return len(comps)
+
+
+def measure(name: str,
+            size: int,
+            steps: int = 100,
+            deferred: bool = False,
+            memory: bool = True) -> Result:
+    """
+    Build the named circuit at size, then apply steps stimuli to it and time
+    each one. The peak memory of construction is measured with tracemalloc in
+    a separate build, since tracing slows everything down.
+    """
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            _build(name, size, deferred)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    gc.collect()
+    t = perf_counter()
+    c = _build(name, size, deferred)
+    build_s = perf_counter() - t
+
+    events = Simulation.events
+    latencies = []
+    failures = 0
+    for i in range(steps):
+        t = perf_counter()
+        c.step(i)
+        latencies.append(perf_counter() - t)
+        if not c.check():
+            failures += 1
+    events = Simulation.events - events
+    run_s = sum(latencies)
+
+    return Result(name,
+                  size,
+                  _components(c),
+                  build_s,
+                  peak,
+                  steps,
+                  events,
+                  run_s,
+                  events / run_s if run_s else 0.0,
+                  run_s / steps * 1e6 if steps else 0.0,
+                  max(latencies, default=0.0) * 1e6,
+                  failures)
+
+
+def run(names: Iterable[str] = tuple(CIRCUITS),
+        sizes: Iterable[int] = (16, 256, 4096),
+        steps: int = 100,
+        deferred: bool = False,
+        memory: bool = True) -> Dict[str, Any]:
+    """
+    Measure every combination of circuit and size. The result is plain data
+    which can be written out as JSON and compared with a later run.
+    """
+
+    sizes = tuple(sizes)
+    results: List[Dict[str, Any]] = []
+    for name in names:
+        for size in sizes:
+            results.append(measure(name, size, steps, deferred,
+                                   memory)._asdict())
+
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'deferred': deferred,
+        'results': results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            key: str = 'events_per_s') -> List[Dict[str, Any]]:
+    """
+    Ratio of new to old for one measurement of each circuit and size that
+    is in both runs
+    """
+
+    before = {(r['circuit'], r['size']): r for r in old['results']}
+    out = []
+    for r in new['results']:
+        o = before.get((r['circuit'], r['size']))
+        if o is None or not o[key] or r[key] is None:
+            continue
+        out.append({
+            'circuit': r['circuit'],
+            'size': r['size'],
+            key: r[key],
+            'ratio': r[key] / o[key],
+        })
+    return out
+
+
+__all__ = (
+    'Circuit',
+    'CIRCUITS',
+    'Result',
+    'measure',
+    'run',
+    'compare',
+)
@@ -0,0 +1,72 @@
+from argparse import ArgumentParser
+import json
+import logging
+import sys
+from . import CIRCUITS, run, compare
+
+
+def _quiet(record: logging.LogRecord) -> bool:
+    # Connecting a gate's output to a wire which it then drives warns about
+    # driving an output pin, for every gate built. Anything else, such as a
+    # wire driven twice, would explain failures so it is kept.
+    return not str(record.msg).startswith('driving output pin')
+
+
+def main():
+    opts = ArgumentParser(description='Primula benchmarks')
+    opts.add_argument('--circuit', '-c',
+                      action='append',
+                      choices=sorted(CIRCUITS),
+                      help='Circuit to run, may be repeated (default: all)')
+    opts.add_argument('--sizes', '-s',
+                      default='16,256,4096',
+                      help='Comma separated circuit sizes')
+    opts.add_argument('--steps', '-n',
+                      type=int,
+                      default=100,
+                      help='Stimuli applied to each circuit')
+    opts.add_argument('--deferred',
+                      action='store_true',
+                      help='Build circuits inside primula.building()')
+    opts.add_argument('--no-memory',
+                      dest='memory',
+                      action='store_false',
+                      help='Skip the traced build for peak memory')
+    opts.add_argument('--output', '-o',
+                      help='Write JSON results here instead of stdout')
+    opts.add_argument('--compare',
+                      metavar='JSON',
+                      help='Print events/sec relative to an earlier run')
+
+    args = opts.parse_args()
+
+    logging.getLogger('sim').addFilter(_quiet)
+
+    names = args.circuit or list(CIRCUITS)
+    sizes = [int(s) for s in args.sizes.split(',')]
+    res = run(names, sizes, args.steps, args.deferred, args.memory)
+
+    if args.output is None:
+        json.dump(res, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(res, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for r in compare(old, res):
+            print(f'{r["circuit"]:>16} {r["size"]:>8} '
+                  f'{r["ratio"]:8.3f}', file=sys.stderr)
+
+    failed = [r for r in res['results'] if r['failures']]
+    for r in failed:
+        print(f'{r["circuit"]} size {r["size"]}: {r["failures"]} of '
+              f'{r["steps"]} steps gave the wrong outputs', file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
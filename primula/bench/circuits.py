@@ -0,0 +1,268 @@
+from typing import List, Callable, NamedTuple
+from random import Random
+from ..base import Level, Pull
+from ..wire import Wire
+from ..simulation import Simulation
+from .. import gates
+from .. import latches
+from .. import flipflops
+
+
+class Circuit(NamedTuple):
+    """
+    A generated benchmark circuit. `step` applies the i'th stimulus and
+    settles, `check` verifies the outputs after it.
+    """
+
+    name: str
+    size: int
+    inputs: List[Wire]
+    outputs: List[Wire]
+    step: Callable[[int], None]
+    check: Callable[[], bool]
+
+
+def _bits(wires: List[Wire]) -> int:
+    return sum(1 << i for i, w in enumerate(wires) if w.level is Level.HI)
+
+
+def _gate(cls, *wires: Wire) -> Wire:
+    """
+    Create a gate with the given input wires and a new output wire
+    """
+
+    out = Wire()
+    g = cls()
+    names = cls._pin_names
+    for name, w in zip(names, wires):
+        w.connect(getattr(g.pins, name))
+    out.connect(getattr(g.pins, names[len(wires)]))
+    return out
+
+
+def _tree(two, three, wires: List[Wire]) -> Wire:
+    while len(wires) > 1:
+        nxt = []
+        for i in range(0, len(wires), 3):
+            group = wires[i:i + 3]
+            if len(group) == 3:
+                nxt.append(_gate(three, *group))
+            elif len(group) == 2:
+                nxt.append(_gate(two, *group))
+            else:
+                nxt.append(group[0])
+        wires = nxt
+    return wires[0]
+
+
+def _adder(name: str, size: int, a: List[Wire], b: List[Wire],
+           s: List[Wire], cout: Wire) -> Circuit:
+    mask = (1 << size) - 1
+    rng = Random(size)
+    state = [0, 0]
+
+    def step(i: int) -> None:
+        x = rng.getrandbits(size)
+        y = rng.getrandbits(size)
+        state[:] = [x, y]
+
+        # Every input changes at once, in one settle
+        levels = {w: Level.HI if x >> k & 1 else Level.LO
+                  for k, w in enumerate(a)}
+        levels.update({w: Level.HI if y >> k & 1 else Level.LO
+                       for k, w in enumerate(b)})
+        Simulation.apply(levels)
+
+    def check() -> bool:
+        total = state[0] + state[1]
+        return _bits(s) == total & mask and \
+            (cout.level is Level.HI) == bool(total >> size)
+
+    return Circuit(name, size, a + b, s + [cout], step, check)
+
+
+def ripple_adder(size: int) -> Circuit:
+    """
+    Adder of two size bit numbers out of a chain of full adders
+    """
+
+    a = [Wire(f'a{i}', Pull.DOWN) for i in range(size)]
+    b = [Wire(f'b{i}', Pull.DOWN) for i in range(size)]
+    c = Wire('cin', Pull.DOWN)
+    s = []
+    for i in range(size):
+        p = _gate(gates.Xor, a[i], b[i])
+        s.append(_gate(gates.Xor, p, c))
+        c = _gate(gates.Or, _gate(gates.And, a[i], b[i]),
+                  _gate(gates.And, p, c))
+    return _adder('ripple_adder', size, a, b, s, c)
+
+
+def lookahead_adder(size: int, group: int = 4) -> Circuit:
+    """
+    Adder with carry lookahead inside each group of bits and the carry
+    rippling from one group to the next
+    """
+
+    a = [Wire(f'a{i}', Pull.DOWN) for i in range(size)]
+    b = [Wire(f'b{i}', Pull.DOWN) for i in range(size)]
+    c = Wire('cin', Pull.DOWN)
+    g = [_gate(gates.And, a[i], b[i]) for i in range(size)]
+    p = [_gate(gates.Xor, a[i], b[i]) for i in range(size)]
+    s = []
+    for base in range(0, size, group):
+        cin = c
+        for i in range(base, min(base + group, size)):
+            s.append(_gate(gates.Xor, p[i], c))
+
+            # c[i + 1] = g[i] | p[i]g[i - 1] | ... | p[i]...p[base]cin
+            terms = [g[i]]
+            for j in range(i - 1, base - 1, -1):
+                terms.append(_tree(gates.And, gates.And3,
+                                   p[j + 1:i + 1] + [g[j]]))
+            terms.append(_tree(gates.And, gates.And3,
+                               p[base:i + 1] + [cin]))
+            c = _tree(gates.Or, gates.Or3, terms)
+    return _adder('lookahead_adder', size, a, b, s, c)
+
+
+def counter(size: int) -> Circuit:
+    """
+    Ripple counter out of JK flip-flops, each one toggling on the falling
+    edge of the stage before
+    """
+
+    hi = Wire('hi', Pull.UP)
+    clk = Wire('clk', Pull.DOWN)
+    q = []
+    t = clk
+    for i in range(size):
+        # Start cleared, rather than with both outputs floating
+        ff = flipflops.JK()
+        ff._levels[ff.pins.q.pin] = Level.LO.value
+        ff._levels[ff.pins.q_.pin] = Level.HI.value
+        hi.connect(ff.pins.j, ff.pins.k)
+        t.connect(ff.pins.clk)
+        out = Wire(f'q{i}')
+        out.connect(ff.pins.q)
+        t = Wire(f'q{i}_')
+        t.connect(ff.pins.q_)
+        q.append(out)
+
+    mask = (1 << size) - 1
+    state = [_bits(q)]
+
+    def step(i: int) -> None:
+        state[0] = (_bits(q) + 1) & mask
+        clk.pulse()
+
+    def check() -> bool:
+        return _bits(q) == state[0]
+
+    return Circuit('counter', size, [clk], q, step, check)
+
+
+def inverter_chain(size: int) -> Circuit:
+    """
+    One input through a long line of inverters
+    """
+
+    inp = Wire('in', Pull.DOWN)
+    w = inp
+    for i in range(size):
+        w = _gate(gates.Inverter, w)
+
+    def step(i: int) -> None:
+        inp.drive(Level.HI if i & 1 else Level.LO)
+
+    def check() -> bool:
+        return (inp.level is w.level) == (size % 2 == 0)
+
+    return Circuit('inverter_chain', size, [inp], [w], step, check)
+
+
+def nand_tree(size: int) -> Circuit:
+    """
+    Wide NAND of every input out of a tree of two input and gates and an
+    inverter
+    """
+
+    ins = [Wire(f'in{i}', Pull.UP) for i in range(size)]
+    wires = ins
+    while len(wires) > 1:
+        nxt = []
+        for i in range(0, len(wires) - 1, 2):
+            nxt.append(_gate(gates.And, wires[i], wires[i + 1]))
+        if len(wires) & 1:
+            nxt.append(wires[-1])
+        wires = nxt
+    out = _gate(gates.Inverter, wires[0])
+
+    rng = Random(size)
+
+    def step(i: int) -> None:
+        w = ins[rng.randrange(size)]
+        w.drive(Level.LO if w.level is Level.HI else Level.HI)
+
+    def check() -> bool:
+        want = not all(w.level is Level.HI for w in ins)
+        return (out.level is Level.HI) == want
+
+    return Circuit('nand_tree', size, ins, [out], step, check)
+
+
+def sr_array(size: int) -> Circuit:
+    """
+    Independent SR latches sharing set and reset lines in groups of eight
+    """
+
+    lines = (size + 7) // 8
+    s = [Wire(f's{i}', Pull.DOWN) for i in range(lines)]
+    r = [Wire(f'r{i}', Pull.DOWN) for i in range(lines)]
+    q = []
+    for i in range(size):
+        latch = latches.SR()
+        s[i // 8].connect(latch.pins.s)
+        r[i // 8].connect(latch.pins.r)
+        out = Wire(f'q{i}')
+        out.connect(latch.pins.q)
+        Wire(f'q{i}_').connect(latch.pins.q_)
+        q.append(out)
+
+    rng = Random(size)
+    state = [(0, Level.LO)]
+
+    def step(i: int) -> None:
+        n = rng.randrange(lines)
+        state[0] = (n, Level.HI if i & 1 else Level.LO)
+        w = s[n] if i & 1 else r[n]
+        w.pulse()
+
+    def check() -> bool:
+        n, level = state[0]
+        return all(w.level is level for w in q[n * 8:n * 8 + 8])
+
+    return Circuit('sr_array', size, s + r, q, step, check)
+
+
+# Generator of each circuit by name
+CIRCUITS = {
+    'ripple_adder': ripple_adder,
+    'lookahead_adder': lookahead_adder,
+    'counter': counter,
+    'inverter_chain': inverter_chain,
+    'nand_tree': nand_tree,
+    'sr_array': sr_array,
+}
+
+
+__all__ = (
+    'Circuit',
+    'CIRCUITS',
+    'ripple_adder',
+    'lookahead_adder',
+    'counter',
+    'inverter_chain',
+    'nand_tree',
+    'sr_array',
+)
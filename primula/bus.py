@@ -0,0 +1,655 @@
+from typing import List, Optional, Sequence, Tuple, Type, Union, \
+                   NamedTuple, Generator, cast
+from abc import abstractmethod
+from array import array
+from itertools import islice
+from weakref import ref, ReferenceType
+import logging
+import weakref
+from .base import Level, \
+                  Pin, \
+                  EventGenerator, \
+                  ComponentBase, \
+                  ComponentPin, \
+                  SimStep
+from .component import PinsBase
+from .wire import Wire, LineDriver
+from .simulation import Simulation
+from . import errors
+
+
+sim = logging.getLogger('sim')
+
+_levels = tuple(Level)
+
+_HIZ = Pin.HIZ.value
+_IN = Pin.IN.value
+_OUT = Pin.OUT.value
+_LO = Level.LO.value
+_HI = Level.HI.value
+_FLT = Level.FLT.value
+_ERR = Level.ERR.value
+
+
+class Word(NamedTuple):
+    """
+    The value on a bus. Bit i of `flt` or `err` set means that bit i is
+    floating or in error, in which case bit i of `value` is zero.
+    """
+
+    value: int
+    flt: int = 0
+    err: int = 0
+
+    @property
+    def valid(self) -> bool:
+        return not (self.flt | self.err)
+
+    def bit(self, i: int) -> Level:
+        m = 1 << i
+        if self.err & m:
+            return Level.ERR
+        if self.flt & m:
+            return Level.FLT
+        return Level.HI if self.value & m else Level.LO
+
+
+# What the events on a bus carry, and on the pins of a BusComponent. The
+# simulation passes the third item of each event through without looking at
+# it, so it carries words as well as levels.
+Signal = Union[Level, Word]
+SignalEvent = Tuple[Optional[ComponentPin], ComponentPin, Signal]
+SignalGenerator = Generator[SignalEvent, None, None]
+
+
+def _level(signal: Signal) -> Level:
+    """
+    A signal as the Level the simulation's interface is typed with
+    """
+
+    return cast(Level, signal)
+
+
+def _bad(mask: int, *words: Word) -> Word:
+    """
+    Result with every bit in mask unknown: in error if any of the inputs has
+    an error, floating otherwise
+    """
+
+    if any(w.err for w in words):
+        return Word(0, 0, mask)
+    return Word(0, mask, 0)
+
+
+class BusBase(ComponentBase):
+    """
+    Base of everything which sends or receives words.
+
+    Subclasses implement `receive` and `signal`, which are `propagate` and
+    `get_level` with a Signal in place of a Level. Neither the simulation
+    nor a ComponentPin looks inside one, so the level of a ComponentPin on
+    a bus port is really a Word.
+    """
+
+    __slots__ = ()
+
+    def propagate(self,
+                  pin: int,
+                  level: Level,
+                  epoch: SimStep) -> EventGenerator:
+        return cast(EventGenerator, self.receive(pin, level, epoch))
+
+    def get_level(self, pin: int) -> Level:
+        return _level(self.signal(pin))
+
+    @abstractmethod
+    def receive(self,
+                pin: int,
+                signal: Signal,
+                epoch: SimStep) -> SignalGenerator:
+        pass
+
+    @abstractmethod
+    def signal(self, pin: int) -> Signal:
+        pass
+
+
+class Bus(BusBase):
+    """
+    A net of `width` wires which carries a whole word in each event.
+
+    It behaves like a `Wire`: pin 0 is its line driver, it goes in to error
+    if it is driven twice in one step and it echoes changes to every other
+    pin. The level is a `Word` though, so a 32 bit datapath takes one event
+    per change instead of 32. Connect `taps` or `join` to go to and from
+    single wires.
+
+    Buses are settled as soon as they are connected, even inside
+    `building()`, but events which pass through one in the settle at the
+    end of it are merged as they are for wires. They can't be compiled in
+    to a `Netlist` or captured by `snapshot`, which raise PrimulaError on
+    reaching one.
+    """
+
+    __slots__ = (
+        '__weakref__',
+        '_name',
+        '_width',
+        '_word',
+        '_pins',
+        '_handles',
+        '_driver',
+        '_epoch',
+    )
+
+    _name: Optional[str]
+    _width: int
+    _word: Word
+    _pins: List[ComponentPin]
+    _handles: List[ComponentPin]
+    _driver: int
+
+    def __init__(self,
+                 width: int,
+                 name: Optional[str] = None,
+                 value: Optional[int] = None):
+        if width < 1:
+            raise ValueError('bus width must be at least one')
+        self._name = name
+        self._width = width
+        self._driver = 0
+        self._epoch: Optional[ReferenceType[SimStep]] = None
+        if value is None:
+            self._word = self.floating
+        else:
+            self._word = self._check(value)
+
+        me = ComponentPin(self, 0)
+        line = ComponentPin(LineDriver(me, _level(self._word)), 0)
+        self._pins = [line]
+        self._handles = [me]
+
+    @property
+    def mask(self) -> int:
+        return (1 << self._width) - 1
+
+    @property
+    def floating(self) -> Word:
+        return Word(0, self.mask, 0)
+
+    def _check(self, value: Union[int, Word]) -> Word:
+        if isinstance(value, Word):
+            return value
+        if not 0 <= value <= self.mask:
+            raise ValueError(f'{value} does not fit in {self._width} bits')
+        return Word(value)
+
+    def signal(self, pin: int) -> Word:
+        return self._word
+
+    def get_direction(self, pin: int) -> Pin:
+        raise errors.PrimulaError('Buses are not directional')
+
+    def pin(self, pin: int) -> ComponentPin:
+        if 0 <= pin < len(self._handles):
+            return self._handles[pin]
+        raise errors.PinNotFoundError(f'{self}#{pin} no such pin')
+
+    def connected_pin(self, pin: int, other: ComponentPin):
+        raise NotImplementedError
+
+    def receive(self,
+                pin: int,
+                word: Signal,
+                epoch: SimStep) -> SignalGenerator:
+        if not isinstance(word, Word):
+            raise errors.PrimulaError(f'{self} driven with {word}')
+        if self._word == word:
+            return
+
+        if self._epoch is not None and epoch == self._epoch():
+            sim.warning('%s driven twice this step', self)
+            self._word = Word(0, 0, self.mask)
+            return
+
+        self._word = word
+        self._driver = pin
+        self._epoch = ref(epoch)
+
+        src = self._handles[pin]
+        pins = iter(self._pins)
+        for other in islice(pins, pin):
+            yield src, other, word
+        next(pins)
+        for other in pins:
+            yield src, other, word
+
+    def _release(self) -> ComponentPin:
+        self._word = self.floating
+        return self._pins[0]
+
+    def drive(self, value: Union[int, Word], at: Optional[int] = None):
+        """
+        Drive the bus to a value, an int or a Word, and settle immediately
+        or, if at is given, at that tick of Simulation.timeline
+        """
+
+        word = self._check(value)
+        if at is None:
+            Simulation.run(self._release(), _level(word))
+        else:
+            Simulation.timeline.schedule(at, self._pins[0], _level(word))
+
+    def _attach(self, cp: ComponentPin) -> ComponentPin:
+        this_id = len(self._pins)
+        self._pins.append(cp)
+        me = ComponentPin(self, this_id)
+        self._handles.append(me)
+        cp.connected_pin(me)
+        return me
+
+    def connect(self, *args: ComponentPin):
+        ports = []
+        for cp in args:
+            c = cp.component
+            if not isinstance(c, BusComponent) or \
+                    c._widths[cp.pin] != self._width:
+                raise errors.PrimulaError(f'{cp} is not a {self._width} '
+                                          f'bit bus port')
+            ports.append((cp, c))
+
+        driver = None
+        for cp, c in ports:
+            self._attach(cp)
+            word = c.word(cp.pin)
+            if c.get_direction(cp.pin) is not Pin.OUT or \
+                    word.flt == self.mask:
+                continue
+            if driver is not None:
+                self._word = Word(0, 0, self.mask)
+                sim.warning('Conflicting signals on %s', self)
+                return
+            driver = word
+
+        if driver is None:
+            level = _level(self._word)
+            Simulation.run_all([(cp, level) for cp in args])
+        else:
+            self.drive(driver)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._name
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def word(self) -> Word:
+        return self._word
+
+    @property
+    def value(self) -> Optional[int]:
+        """
+        The value of the bus, or None unless every bit is LO or HI
+        """
+
+        w = self._word
+        return w.value if w.valid else None
+
+    def __str__(self) -> str:
+        if self._name is not None:
+            return f'{self._name}[{self._width}]'
+        else:
+            return f'Bus[{self._width}]'
+
+
+class BusComponent(BusBase):
+    """
+    A component with bus ports as well as ordinary pins.
+
+    Ports are numbered and named like the pins of a `Component`. Each has a
+    width, zero for a pin which connects to a `Wire` and the bus width for
+    one which connects to a `Bus`. Pin levels are kept in `_levels` as usual
+    and words in `_words`, and subclasses compute their outputs in
+    `_on_change` with `output`. Floating and error levels on pins are
+    dropped as they are by components, but words are always delivered, with
+    the bits that aren't LO or HI marked in them.
+    """
+
+    __slots__ = (
+        '__weakref__',
+        '_widths',
+        '_directions',
+        '_levels',
+        '_words',
+        '_conns',
+        '_handles',
+        'pins',
+    )
+
+    _widths: Tuple[int, ...]
+    _directions: array
+    _levels: array
+    _words: List[Optional[Word]]
+    _conns: List[Optional[ComponentPin]]
+    _handles: Tuple[ComponentPin, ...]
+
+    # class variables
+    _proxy: Type[PinsBase]
+    _pin_names: Tuple[str, ...]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        names = cls.__dict__.get('_pin_names')
+        if names is not None:
+            cls._proxy = type(f'{cls.__name__}Pins',
+                              (PinsBase, ),
+                              {'__slots__': names, })
+
+    def __init__(self, widths: Sequence[int], directions: Sequence[Pin]):
+        nr_pins = len(widths)
+        self.pins = self._proxy(weakref.ref(self), self._pin_names)
+        self._widths = tuple(widths)
+        self._directions = array('B', (d.value for d in directions))
+        self._levels = array('B', (_FLT for x in range(nr_pins)))
+        self._words = [Word(0, (1 << w) - 1, 0) if w else None
+                       for w in widths]
+        self._conns = [None for x in range(nr_pins)]
+        self._handles = tuple(ComponentPin(self, x) for x in range(nr_pins))
+
+    def connected_pin(self, pin: int, other: ComponentPin):
+        if self._conns[pin] is not None:
+            raise errors.AlreadyConnectedError(f'{self}#{pin} '
+                                               'already attached')
+        self._conns[pin] = other
+
+    def pin(self, pin: int) -> ComponentPin:
+        if 0 <= pin < len(self._handles):
+            return self._handles[pin]
+        raise errors.PinNotFoundError(f'{self}#{pin} no such pin')
+
+    def signal(self, pin: int) -> Signal:
+        if self._widths[pin]:
+            return self.word(pin)
+        return _levels[self._levels[pin]]
+
+    def get_direction(self, pin: int) -> Pin:
+        return Pin(self._directions[pin])
+
+    def word(self, pin: int) -> Word:
+        w = self._words[pin]
+        assert w is not None
+        return w
+
+    def output(self, pin: int, value: Signal) -> SignalGenerator:
+        """
+        Set an output pin to a Level or an output port to a Word
+        """
+
+        if isinstance(value, Word):
+            if self._words[pin] == value:
+                return
+            self._words[pin] = value
+        else:
+            v = value.value
+            if self._levels[pin] == v:
+                return
+            self._levels[pin] = v
+        other = self._conns[pin]
+        if other is not None:
+            yield self._handles[pin], other, value
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        return
+        yield
+
+    def receive(self,
+                pin: int,
+                signal: Signal,
+                epoch: SimStep) -> SignalGenerator:
+        pd = self._directions[pin]
+        if pd == _HIZ:
+            return
+        if pd == _OUT:
+            sim.warning('driving output pin on %s #%d', self, pin)
+            return
+
+        if isinstance(signal, Word):
+            self._words[pin] = signal
+        elif signal is Level.FLT or signal is Level.ERR:
+            return
+        else:
+            self._levels[pin] = signal.value
+        yield from self._on_change(pin)
+
+    def __str__(self):
+        return type(self).__name__
+
+    def __repr__(self):
+        return type(self).__name__
+
+
+class Adder(BusComponent):
+    """
+    s = a + b + cin, with the carry out of the top bit on cout. Sum bits
+    from the lowest one that isn't LO or HI in an input upwards aren't
+    either. cin can be left unconnected for no carry in.
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'a',
+        'b',
+        'cin',
+        's',
+        'cout',
+    )
+
+    def __init__(self, width: int):
+        super().__init__((width, width, 0, width, 0),
+                         (Pin.IN, Pin.IN, Pin.IN, Pin.OUT, Pin.OUT))
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        a = self.word(0)
+        b = self.word(1)
+        c = self._levels[2]
+        width = self._widths[0]
+        mask = (1 << width) - 1
+
+        # An unconnected carry in is LO
+        if c > _HI and self._conns[2] is None:
+            c = _LO
+
+        bad = a.flt | a.err | b.flt | b.err
+        if c > _HI:
+            bad = mask
+        if bad:
+            bad = mask & ~((bad & -bad) - 1)
+            total = (a.value + b.value + c) & mask & ~bad
+            out = _bad(bad, a, b)._replace(value=total)
+            yield from self.output(3, out)
+            yield from self.output(4, Level.ERR if out.err else Level.FLT)
+            return
+
+        total = a.value + b.value + c
+        yield from self.output(3, Word(total & mask))
+        yield from self.output(4, _levels[total >> width])
+
+
+class Comparator(BusComponent):
+    """
+    Unsigned comparison, eq is HI if a == b and lt is HI if a < b
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'a',
+        'b',
+        'eq',
+        'lt',
+    )
+
+    def __init__(self, width: int):
+        super().__init__((width, width, 0, 0),
+                         (Pin.IN, Pin.IN, Pin.OUT, Pin.OUT))
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        a = self.word(0)
+        b = self.word(1)
+        if not (a.valid and b.valid):
+            level = Level.ERR if a.err | b.err else Level.FLT
+            yield from self.output(2, level)
+            yield from self.output(3, level)
+            return
+        yield from self.output(2, _levels[a.value == b.value])
+        yield from self.output(3, _levels[a.value < b.value])
+
+
+class Mux(BusComponent):
+    """
+    out is a while sel is LO and b while it is HI
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'a',
+        'b',
+        'sel',
+        'out',
+    )
+
+    def __init__(self, width: int):
+        super().__init__((width, width, 0, width),
+                         (Pin.IN, Pin.IN, Pin.IN, Pin.OUT))
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        sel = self._levels[2]
+        if sel == _LO:
+            yield from self.output(3, self.word(0))
+        elif sel == _HI:
+            yield from self.output(3, self.word(1))
+        else:
+            width = self._widths[3]
+            yield from self.output(3, Word(0, (1 << width) - 1, 0))
+
+
+class Register(BusComponent):
+    """
+    q takes the value of d whenever HI arrives on clk, the same as the
+    clock of a JK flip-flop
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'clk',
+        'd',
+        'q',
+    )
+
+    def __init__(self, width: int):
+        super().__init__((0, width, width),
+                         (Pin.IN, Pin.IN, Pin.OUT))
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        if pin != 0 or self._levels[0] != _HI:
+            return
+        yield from self.output(2, self.word(1))
+
+
+class Split(BusComponent):
+    """
+    Bus port `inp` to a pin per bit, `bit(i)`
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'inp',
+    )
+
+    def __init__(self, width: int):
+        super().__init__((width, ) + (0, ) * width,
+                         (Pin.IN, ) + (Pin.OUT, ) * width)
+
+    def bit(self, i: int) -> ComponentPin:
+        return self.pin(i + 1)
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        w = self.word(0)
+        levels = self._levels
+        for i in range(self._widths[0]):
+            level = w.bit(i)
+            if levels[i + 1] != level.value:
+                yield from self.output(i + 1, level)
+
+
+class Join(BusComponent):
+    """
+    A pin per bit, `bit(i)`, to bus port `out`
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'out',
+    )
+
+    def __init__(self, width: int):
+        super().__init__((width, ) + (0, ) * width,
+                         (Pin.OUT, ) + (Pin.IN, ) * width)
+
+    def bit(self, i: int) -> ComponentPin:
+        return self.pin(i + 1)
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        w = self.word(0)
+        m = 1 << (pin - 1)
+        v = self._levels[pin]
+        yield from self.output(0, Word(w.value & ~m | (m if v else 0),
+                                       w.flt & ~m,
+                                       w.err & ~m))
+
+
+def taps(bus: Bus) -> List[Wire]:
+    """
+    A new wire for each bit of a bus, driven from it
+    """
+
+    split = Split(bus.width)
+    bus.connect(split.pins.inp)
+    out = []
+    for i in range(bus.width):
+        w = Wire(None if bus.name is None else f'{bus.name}[{i}]')
+        w.connect(split.bit(i))
+        out.append(w)
+    return out
+
+
+def join(wires: Sequence[Wire], name: Optional[str] = None) -> Bus:
+    """
+    A new bus driven from wires, the first one being bit 0
+    """
+
+    j = Join(len(wires))
+    bus = Bus(len(wires), name)
+    bus.connect(j.pins.out)
+    for i, w in enumerate(wires):
+        w.connect(j.bit(i))
+    return bus
+
+
+__all__ = (
+    'Word',
+    'Signal',
+    'BusBase',
+    'Bus',
+    'BusComponent',
+    'Adder',
+    'Comparator',
+    'Mux',
+    'Register',
+    'Split',
+    'Join',
+    'taps',
+    'join',
+)
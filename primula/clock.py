@@ -0,0 +1,111 @@
+from typing import Callable, Dict, Iterable, Mapping, Optional, Union, Deque
+from collections import deque
+from .base import Level, SimStep, Event
+from .wire import Wire
+from .simulation import Simulation
+from . import trace
+from . import activity
+
+
+# Called after each cycle with its number, from zero. Returning True stops
+# the run there.
+OnCycle = Callable[[int], Optional[bool]]
+
+
+class Clock:
+    """
+    Drives a wire HI then LO once per cycle, many cycles per call.
+
+    This is the same as calling `pulse()` on the wire in a loop but the
+    loop is inside the simulator: the seed events and the settle of each
+    half cycle are run directly, without going through `Wire.drive` and
+    `Simulation.run`. Each half cycle is still its own SimStep, so the
+    circuit sees exactly what it would from `pulse()`.
+
+    With a trace sink or a profiler attached each half cycle goes through
+    `Simulation.run_all` instead, so that they see every event.
+    """
+
+    __slots__ = (
+        'wire',
+        'cycles',
+    )
+
+    wire: Wire
+    cycles: int
+
+    def __init__(self, wire: Wire):
+        self.wire = wire
+        self.cycles = 0
+
+    def run(self,
+            cycles: int,
+            on_cycle: Optional[OnCycle] = None,
+            sample: Union[Iterable[Wire], Mapping[str, Wire], None] = None) \
+            -> Dict[str, bytearray]:
+        """
+        Run up to `cycles` clock cycles, calling `on_cycle` after each one.
+
+        The level values of the `sample` wires after each cycle are stored
+        in arrays allocated up front, which are returned by wire name (or
+        by key if sample is a mapping). If `on_cycle` stops the run early
+        they are cut down to the cycles which were run.
+        """
+
+        if isinstance(sample, Mapping):
+            watched = dict(sample)
+        else:
+            watched = {w.name or str(i): w
+                       for i, w in enumerate(sample or ())}
+        out = {name: bytearray(cycles) for name in watched}
+        probes = [(w, out[name]) for name, w in watched.items()]
+
+        wire = self.wire
+        line = wire._pins[0]
+        hi = Level.HI
+        lo = Level.LO
+        flt = Level.FLT
+        q: Deque[Event] = deque()
+        popleft = q.popleft
+        extend = q.extend
+        max_events = Simulation.max_events
+        events = 0
+
+        done = cycles
+        for i in range(cycles):
+            if trace.sink is not None or activity.profiler is not None:
+                wire.pulse()
+            else:
+                for level in (hi, lo):
+                    budget = -1 if max_events is None else max_events
+                    start = budget
+                    epoch = SimStep()
+                    wire._level = flt
+                    extend(line.propagate(level, epoch))
+                    while q:
+                        if not budget:
+                            Simulation._overrun(q)
+                        budget -= 1
+                        src, dst, lvl = popleft()
+                        extend(dst.component.propagate(dst.pin, lvl, epoch))
+                    events += start - budget
+
+            for w, buf in probes:
+                buf[i] = w._level.value
+
+            if on_cycle is not None and on_cycle(i):
+                done = i + 1
+                break
+
+        Simulation.events += events
+        self.cycles += done
+        if done < cycles:
+            for buf in out.values():
+                del buf[done:]
+        return out
+
+
+__all__ = (
+    'Clock',
+    'OnCycle',
+)
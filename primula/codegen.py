@@ -0,0 +1,284 @@
+from typing import Callable, Dict, List, Tuple, TYPE_CHECKING
+from collections import deque, OrderedDict
+import hashlib
+from types import CodeType, FunctionType
+from .base import Pin
+
+if TYPE_CHECKING:
+    from .netlist import Netlist
+
+
+_OUT = Pin.OUT.value
+
+# Expression for the output of each gate opcode given its input pin levels,
+# exactly as the event loop in Netlist._settle has them
+_EXPRS = {
+    1: '0 if {0} else 1',
+    2: '0 if ({0} or {1}) else 1',
+    3: '0 if ({0} and {1}) else 1',
+    4: '{0} and {1}',
+    5: '{0} and {1} and {2}',
+    6: '{0} or {1}',
+    7: '{0} or {1} or {2}',
+    8: '1 if (not {0}) != (not {1}) else 0',
+}
+
+# Arguments of every generated function
+_ARGS = 'L, P, ND, NDIRTY, DN, CD, DC, push'
+
+# Code of the generated functions by the hash of their cone's shape, least
+# recently used first, up to _CACHE_SIZE of them
+_CACHE_SIZE = 1024
+_cache: 'OrderedDict[bytes, CodeType]' = OrderedDict()
+
+
+def _candidates(nl: 'Netlist') -> List[int]:
+    """
+    Gates which can go in a cone: those whose output net has no other
+    driver
+    """
+
+    opcodes = nl.opcodes
+    comp_base = nl.comp_base
+    pin_net = nl.pin_net
+    pin_dir = nl.pin_dir
+
+    drivers = [0] * nl.nr_nets
+    for slot, n in enumerate(pin_net):
+        if n >= 0 and pin_dir[slot] == _OUT:
+            drivers[n] += 1
+
+    out = []
+    for c, op in enumerate(opcodes):
+        if op not in _EXPRS:
+            continue
+        n = pin_net[comp_base[c + 1] - 1]
+        if n < 0 or drivers[n] == 1:
+            out.append(c)
+    return out
+
+
+def _order(nl: 'Netlist', comps: List[int]) -> List[int]:
+    """
+    The components which aren't on or after a feedback loop, in
+    topological order
+    """
+
+    member = set(comps)
+    comp_base = nl.comp_base
+    pin_net = nl.pin_net
+    pin_comp = nl.pin_comp
+    fan_start = nl.fan_start
+    fan_pins = nl.fan_pins
+
+    def loads(c: int) -> List[int]:
+        n = pin_net[comp_base[c + 1] - 1]
+        if n < 0:
+            return []
+        return [pin_comp[fan_pins[i]]
+                for i in range(fan_start[n], fan_start[n + 1])
+                if pin_comp[fan_pins[i]] in member]
+
+    indeg = dict.fromkeys(comps, 0)
+    for c in comps:
+        for d in loads(c):
+            indeg[d] += 1
+
+    ready = deque(c for c in comps if not indeg[c])
+    order = []
+    while ready:
+        c = ready.popleft()
+        order.append(c)
+        for d in loads(c):
+            indeg[d] -= 1
+            if not indeg[d]:
+                ready.append(d)
+    return order
+
+
+def _groups(nl: 'Netlist', order: List[int]) -> List[List[int]]:
+    """
+    Split ordered components in to cones which don't share any nets,
+    keeping the order within each
+    """
+
+    parent = {c: c for c in order}
+
+    def find(c: int) -> int:
+        while parent[c] != c:
+            parent[c] = parent[parent[c]]
+            c = parent[c]
+        return c
+
+    comp_base = nl.comp_base
+    pin_net = nl.pin_net
+    pin_comp = nl.pin_comp
+    fan_start = nl.fan_start
+    fan_pins = nl.fan_pins
+    for c in order:
+        n = pin_net[comp_base[c + 1] - 1]
+        if n < 0:
+            continue
+        for i in range(fan_start[n], fan_start[n + 1]):
+            d = pin_comp[fan_pins[i]]
+            if d in parent:
+                parent[find(d)] = find(c)
+
+    groups: Dict[int, List[int]] = {}
+    for c in order:
+        groups.setdefault(find(c), []).append(c)
+    return list(groups.values())
+
+
+# One gate of a cone, with every index relative to the cone's bases:
+# (opcode, component, first pin, output pin, output net or -1, and for each
+# pin on the net its slot and component, or -1 for outside the cone)
+_Gate = Tuple[int, int, int, int, int, Tuple[Tuple[int, int], ...]]
+
+
+def _layout(nl: 'Netlist', cone: List[int]) \
+        -> Tuple[Tuple[int, int, int], Tuple[_Gate, ...]]:
+    """
+    Lowest component, pin slot and net number used by a cone, and its gates
+    relative to them
+    """
+
+    comp_base = nl.comp_base
+    pin_net = nl.pin_net
+    pin_comp = nl.pin_comp
+    fan_start = nl.fan_start
+    fan_pins = nl.fan_pins
+    member = set(cone)
+
+    gates = []
+    for c in cone:
+        out = comp_base[c + 1] - 1
+        n = pin_net[out]
+        fan: Tuple[Tuple[int, int], ...] = ()
+        if n >= 0:
+            fan = tuple((s, pin_comp[s] if pin_comp[s] in member else -1)
+                        for s in fan_pins[fan_start[n]:fan_start[n + 1]])
+        gates.append((nl.opcodes[c], c, comp_base[c], out, n, fan))
+
+    c0 = min(cone)
+    p0 = min([g[2] for g in gates] + [s for g in gates for s, d in g[5]])
+    n0 = min([g[4] for g in gates if g[4] >= 0], default=0)
+
+    rel = tuple((op, c - c0, b - p0, out - p0, n - n0 if n >= 0 else -1,
+                 tuple((s - p0, d - c0 if d >= 0 else -1) for s, d in fan))
+                for op, c, b, out, n, fan in gates)
+    return (c0, p0, n0), rel
+
+
+def _source(gates: Tuple[_Gate, ...]) -> str:
+    """
+    Straight-line evaluation of a cone, in the terms of Netlist._settle:
+    each gate output which changes updates its net, marks it and the
+    component dirty for write-back, copies LO and HI to the cone's own
+    input pins on the net and queues events for everybody else's.
+
+    Every index in it is a placeholder string constant, see `_bind`, so that
+    all of the cones of the same shape share the code.
+    """
+
+    def comp(k: int) -> str:
+        return f"'c{k}'"
+
+    def pin(k: int) -> str:
+        return f"'p{k}'"
+
+    def net(k: int) -> str:
+        return f"'n{k}'"
+
+    lines = [f'def cone({_ARGS}):']
+    for op, c, b, out, n, fan in gates:
+        ins = [f'P[{pin(s)}]' for s in range(b, out)]
+        lines.append(f'    v = {_EXPRS[op].format(*ins)}')
+        lines.append(f'    if P[{pin(out)}] != v:')
+        lines.append(f'        P[{pin(out)}] = v')
+        lines.append(f'        if not CD[{comp(c)}]:')
+        lines.append(f'            CD[{comp(c)}] = 1')
+        lines.append(f'            DC.append({comp(c)})')
+        if n < 0:
+            continue
+        lines.append(f'        if L[{net(n)}] != v:')
+        lines.append(f'            L[{net(n)}] = v')
+        lines.append(f"            ND[{net(n)}] = 'd{out}'")
+        lines.append(f'            if not NDIRTY[{net(n)}]:')
+        lines.append(f'                NDIRTY[{net(n)}] = 1')
+        lines.append(f'                DN.append({net(n)})')
+        if not fan:
+            continue
+        lines.append('            if v < 2:')
+        for s, d in fan:
+            if d >= 0:
+                lines.append(f'                P[{pin(s)}] = v')
+                lines.append(f'                if not CD[{comp(d)}]:')
+                lines.append(f'                    CD[{comp(d)}] = 1')
+                lines.append(f'                    DC.append({comp(d)})')
+            else:
+                lines.append(f"                push('e{s}' | v)")
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def _bind(code: CodeType, c0: int, p0: int, n0: int) -> Callable[..., None]:
+    """
+    Function of the code for a cone with its placeholders replaced by the
+    indices they stand for: 'cK' is component c0 + K, 'pK' pin slot p0 + K,
+    'nK' net n0 + K, 'dK' the driver number of pin slot p0 + K and 'eK' a
+    pin event for pin slot p0 + K, less the level. They end up as plain
+    constants, as fast as if they had been written in to the source.
+    """
+
+    def value(const: object) -> object:
+        if not isinstance(const, str):
+            return const
+        kind, k = const[0], int(const[1:])
+        if kind == 'c':
+            return c0 + k
+        if kind == 'n':
+            return n0 + k
+        if kind == 'p':
+            return p0 + k
+        if kind == 'd':
+            return p0 + k + 1
+        return (p0 + k) << 3 | 4
+
+    consts = tuple(value(const) for const in code.co_consts)
+    return FunctionType(code.replace(co_consts=consts), {})
+
+
+def compile_cone(nl: 'Netlist', cone: List[int]) -> Callable[..., None]:
+    """
+    Function which evaluates a cone of a netlist. The code comes from the
+    cache if a cone of the same shape, wherever it is in the netlist, has
+    been compiled recently.
+    """
+
+    bases, gates = _layout(nl, cone)
+    key = hashlib.blake2b(repr(gates).encode(), digest_size=20).digest()
+    code = _cache.get(key)
+    if code is None:
+        ns: Dict[str, Callable[..., None]] = {}
+        exec(compile(_source(gates), f'<cone {key.hex()}>', 'exec'), ns)
+        code = _cache[key] = ns['cone'].__code__
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        _cache.move_to_end(key)
+    return _bind(code, *bases)
+
+
+def cones(nl: 'Netlist') -> List[List[int]]:
+    """
+    Acyclic cones of gates in a netlist, each in topological order
+    """
+
+    return _groups(nl, _order(nl, _candidates(nl)))
+
+
+__all__ = (
+    'cones',
+    'compile_cone',
+)
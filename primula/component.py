@@ -1,4 +1,4 @@
-from typing import List, Optional, Any, Iterable, Type
+from typing import List, Optional, Any, Iterable, Type, Tuple
 from array import array
 from abc import ABCMeta
 import logging
@@ -8,23 +8,33 @@ from .base import Level, \
                   SimStep, \
                   ComponentBase, \
                   ComponentPin, \
-                  Event, \
                   EventGenerator
+from .truthtable import TruthTable, tabulate
 from . import errors
+from . import trace
+from .trace import Kind, Record
 
 
 sim = logging.getLogger('sim')
 
+_levels = tuple(Level)
+
+# Enum attribute lookups are surprisingly slow, so the hot paths below use
+# these plain ints instead
+_HIZ = Pin.HIZ.value
+_IN = Pin.IN.value
+_OUT = Pin.OUT.value
+
 
 class PinsBase:
     """
     Proxy for accessing pins by their names
 
     All components have a 'pins' member. Accessing pins.PIN will lookup the
-    name 'PIN' to the pin index and return Component.pin(index) so that pins
-    can be hooked up. Performance of this proxy isn't a priority, the priority
-    is simulation speed. So all of this rigmarole is just to hide the fact that
-    pin configurations and states are in byte arrays.
+    name 'PIN' to the pin index and return the Component.pin(index) handle so
+    that pins can be hooked up. Performance of this proxy isn't a priority,
+    the priority is simulation speed. So all of this rigmarole is just to
+    hide the fact that pin configurations and states are in byte arrays.
     """
 
     __slots__ = (
@@ -64,6 +74,11 @@ class _ComponentMeta(ABCMeta):
     instantiated. It creates the pins proxy type which is used to implement
     Component.pins accessors which let you program pins by their names instead
     of their numbers.
+
+    When the first instance of a class which hasn't opted out with
+    `_tabulate = False` is constructed, its `_on_change` is run over every
+    input combination to build a truth table for the class. If that works,
+    all instances are evaluated by table lookup instead.
     """
     __slots__ = ()
 
@@ -85,6 +100,12 @@ class _ComponentMeta(ABCMeta):
 
         return cls
 
+    def __call__(cls, *args, **kwargs):
+        obj = super().__call__(*args, **kwargs)
+        if '_lut' not in cls.__dict__:
+            cls._lut = tabulate(obj)
+        return obj
+
 
 class Component(ComponentBase, metaclass=_ComponentMeta):
     """
@@ -95,6 +116,13 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
     `_on_change' method to implement the logic. You may also wish to override
     the constructor in order to set the configurations for the pins which all
     default in to high-impedance state.
+
+    Components whose outputs turn out to be purely a function of their
+    inputs are evaluated from a truth table instead. The table is built once
+    per class, so this is skipped for classes whose constructor takes
+    arguments. Stateful components, which keep their state in their output
+    pins where it can look like a function of the inputs, opt out with
+    `_tabulate = False`.
     """
 
     __slots__ = (
@@ -102,6 +130,7 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
         '_directions',
         '_levels',
         '_conns',
+        '_handles',
         'pins',
     )
 
@@ -109,10 +138,13 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
     _directions: array
     _levels: array
     _conns: List[Optional[ComponentPin]]
+    _handles: Tuple[ComponentPin, ...]
 
     # class variables
     _proxy: Type[PinsBase]
     _pin_names: Iterable[str]
+    _tabulate: bool = True
+    _lut: Optional[TruthTable] = None
 
     def __init__(self):
         self.pins = self._proxy(weakref.ref(self), self._pin_names)
@@ -126,6 +158,28 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
 
         self._conns = [None for x in range(nr_pins)]
 
+        # Pin handles are created once and shared, rather than allocating a
+        # new one every time a pin is looked up or an event is generated
+        self._handles = tuple(ComponentPin(self, x) for x in range(nr_pins))
+
+    @classmethod
+    def _restore(cls, directions: array, levels: array) -> 'Component':
+        """
+        Create an unconnected instance with the given pin directions and
+        levels, without running the constructor. Used for copying circuits,
+        which relies on components keeping all of their state in these two
+        arrays.
+        """
+
+        obj = cls.__new__(cls)
+        obj.pins = cls._proxy(weakref.ref(obj), cls._pin_names)
+        obj._directions = directions
+        obj._levels = levels
+        nr_pins = len(levels)
+        obj._conns = [None] * nr_pins
+        obj._handles = tuple(ComponentPin(obj, x) for x in range(nr_pins))
+        return obj
+
     def connected_pin(self, pin: int, other: ComponentPin):
         if self._conns[pin] is not None:
             raise errors.AlreadyConnectedError(f'{self}#{pin} '
@@ -136,8 +190,8 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
         self._directions[pin] = direction.value
 
     def pin(self, pin: int) -> ComponentPin:
-        if pin < len(self._directions):
-            return super().pin(pin)
+        if 0 <= pin < len(self._handles):
+            return self._handles[pin]
         raise errors.PinNotFoundError(f'{self}#{pin} no such pin')
 
     def get_level(self, pin: int) -> Level:
@@ -148,11 +202,13 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
 
     def _set_output_level(self, pin: int, new_level: int) -> EventGenerator:
         d = self._directions[pin]
-        if d == Pin.HIZ.value:
-            sim.info(f'asserting high-z pin on {self} #{pin}')
+        if d == _HIZ:
+            if trace.sink is not None:
+                trace.sink.record(Record(Kind.IGNORE, None, self.pin(pin),
+                                         _levels[new_level], None))
             return
-        if d == Pin.IN.value:
-            sim.warning(f'asserting input pin on {self} #{pin}')
+        if d == _IN:
+            sim.warning('asserting input pin on %s #%d', self, pin)
             return
 
         old_level = self._levels[pin]
@@ -164,9 +220,10 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
         if other is None:
             return
 
-        sim.info(f'assert: {self} #{pin} {Level(old_level)} '
-                 f'-> {Level(new_level)}')
-        yield Event(self.pin(pin), other, Level(new_level))
+        if trace.sink is not None:
+            trace.sink.record(Record(Kind.ASSERT, self.pin(pin), other,
+                                     _levels[new_level], None))
+        yield self._handles[pin], other, _levels[new_level]
 
     def assert_pin(self, pin: int, level: bool) -> EventGenerator:
         """
@@ -198,25 +255,35 @@ class Component(ComponentBase, metaclass=_ComponentMeta):
                   level: Level,
                   epoch: SimStep) -> EventGenerator:
         # Floating and Error levels never propagate
-        if level in (Level.FLT, Level.ERR):
-            sim.info(f'{self}#{pin} ignoring {level}')
+        if level is Level.FLT or level is Level.ERR:
+            if trace.sink is not None:
+                trace.sink.record(Record(Kind.IGNORE, None, self.pin(pin),
+                                         level, epoch))
             return
 
         pd = self._directions[pin]
 
         # If pin disconnected, do nothing
-        if pd == Pin.HIZ.value:
-            sim.debug('{self}#{pin} disconnected')
+        if pd == _HIZ:
+            if trace.sink is not None:
+                trace.sink.record(Record(Kind.IGNORE, None, self.pin(pin),
+                                         level, epoch))
             return
 
         # If output pin, then we're not going to accept a signal
-        if pd == Pin.OUT.value:
-            sim.warning(f'driving output pin on {self} #{pin}')
+        if pd == _OUT:
+            sim.warning('driving output pin on %s #%d', self, pin)
             return
 
-        sim.info(f'{self}#{pin} level changed')
-        self._levels[pin] = level.value
-        yield from self._on_change(pin)
+        if trace.sink is not None:
+            trace.sink.record(Record(Kind.PROPAGATE, None, self.pin(pin),
+                                     level, epoch))
+        self._levels[pin] = level._value_
+        lut = self._lut
+        if lut is None:
+            yield from self._on_change(pin)
+        else:
+            yield from lut.evaluate(self)
 
     def __str__(self):
         return type(self).__name__
@@ -0,0 +1,329 @@
+from typing import Dict, List, Tuple, Set, Iterator, Optional, Any, Deque
+from collections import deque
+from contextlib import contextmanager
+from heapq import heappush, heappop
+from itertools import islice
+from .base import Level, Pin, ComponentPin, SimStep, Event
+from .wire import Wire
+from .bus import Bus
+from .simulation import Simulation
+from . import trace
+from .trace import Kind, Record
+
+
+_IN = Pin.IN.value
+_OUT = Pin.OUT.value
+
+
+def _graph(roots: List[Wire]) -> Tuple[Dict[int, Any], Dict[int, List[int]]]:
+    """
+    Find the wires and components downstream of roots, by id, and the ids of
+    what each one drives.
+    """
+
+    nodes: Dict[int, Any] = {}
+    succ: Dict[int, List[int]] = {}
+    stack: List[Any] = list(roots)
+    while stack:
+        obj = stack.pop()
+        k = id(obj)
+        if k in nodes:
+            continue
+        nodes[k] = obj
+
+        # Buses are ranked, and have their events merged, like wires
+        if isinstance(obj, (Wire, Bus)):
+            out = []
+            for cp in islice(obj._pins, 1, None):
+                # Everything on a wire past the line driver has pin arrays
+                c: Any = cp.component
+                if c._directions[cp.pin] == _IN:
+                    out.append(c)
+        else:
+            dirs = obj._directions
+            out = [cp.component for p, cp in enumerate(obj._conns)
+                   if cp is not None and dirs[p] == _OUT]
+        succ[k] = [id(c) for c in out]
+        stack.extend(out)
+
+    return nodes, succ
+
+
+def _components(roots: List[int],
+                succ: Dict[int, List[int]]) -> List[List[int]]:
+    """
+    Strongly connected components of the graph, by Tarjan's algorithm, in
+    reverse topological order
+    """
+
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    stack: List[int] = []
+    on_stack: Set[int] = set()
+    found: List[List[int]] = []
+
+    for root in roots:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(succ[root]))]
+        while work:
+            v, it = work[-1]
+            for u in it:
+                if u not in index:
+                    index[u] = low[u] = len(index)
+                    stack.append(u)
+                    on_stack.add(u)
+                    work.append((u, iter(succ[u])))
+                    break
+                if u in on_stack:
+                    low[v] = min(low[v], index[u])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[v])
+                if low[v] == index[v]:
+                    scc = []
+                    while True:
+                        u = stack.pop()
+                        on_stack.discard(u)
+                        scc.append(u)
+                        if u == v:
+                            break
+                    found.append(scc)
+
+    return found
+
+
+def _loop_order(scc: List[int],
+                succ: Dict[int, List[int]],
+                connected: Dict[int, int]) -> List[int]:
+    """
+    Order the members of a feedback loop so that it is broken where it was
+    closed. Up to then, the loop was a chain which settled from what the
+    closing wire drives, so that goes first.
+    """
+
+    members = set(scc)
+    last = max(scc, key=lambda k: connected.get(k, -1))
+    post: List[int] = []
+    seen: Set[int] = set()
+    for start in [u for u in succ[last] if u in members] + scc:
+        if start in seen:
+            continue
+        seen.add(start)
+        work = [(start, iter(succ[start]))]
+        while work:
+            v, it = work[-1]
+            for u in it:
+                if u in members and u not in seen:
+                    seen.add(u)
+                    work.append((u, iter(succ[u])))
+                    break
+            else:
+                work.pop()
+                post.append(v)
+    post.reverse()
+    return post
+
+
+def _ranks(roots: List[Wire]) \
+        -> Tuple[Dict[int, int], Dict[int, int], Set[int]]:
+    """
+    Number the wires and components downstream of roots, by id, in
+    topological order from drivers to inputs. Also returns the ids of the
+    wires' line drivers.
+
+    Roots are in the order they were first connected. Each feedback loop is
+    broken at the connection which closed it, the way constructing it
+    outside building() would have, so a latch that neither input sets comes
+    up in the same state either way.
+    """
+
+    nodes, succ = _graph(roots)
+    connected = {id(w): i for i, w in enumerate(roots)}
+    order: List[int] = []
+    for scc in reversed(_components(list(connected), succ)):
+        if len(scc) == 1:
+            order += scc
+        else:
+            order += _loop_order(scc, succ, connected)
+
+    ranks = {k: i + 1 for i, k in enumerate(order)}
+    wires = [obj for obj in nodes.values() if isinstance(obj, (Wire, Bus))]
+    wire_ranks = {id(w): ranks.pop(id(w)) for w in wires}
+    line_drivers = {id(w._pins[0].component) for w in wires}
+
+    return wire_ranks, ranks, line_drivers
+
+
+def settle(pending: Dict[Wire, List[ComponentPin]]) -> None:
+    """
+    Initial settle of everything connected inside building().
+
+    Wires which gained a driver are driven from it, the rest drive their
+    level in to the input pins which were connected to them. Events are then
+    processed in waves, each in topological order and with all of the
+    changes to a wire within the wave merged. So each wire in an acyclic
+    circuit changes just once, in one SimStep, and glitches on the way to
+    the fix-point don't put anything in to the error state. Two different
+    drivers disagreeing still do. Events which go back round a feedback loop
+    are put off to the next wave, which is a new SimStep.
+    """
+
+    if not pending:
+        return
+
+    wire_rank, comp_rank, line_drivers = _ranks(list(pending))
+    wave = 0
+    rank = -1
+
+    # Wire events are queued with no level, the level to propagate is kept
+    # in `queued` so that later events for the same wire can replace it
+    heap: List[Tuple[int, int, int, Optional[ComponentPin], ComponentPin,
+                     Optional[Level]]] = []
+    queued: Dict[int, List[Any]] = {}
+    seq = 0
+
+    def push(src: Optional[ComponentPin],
+             dst: ComponentPin,
+             level: Level) -> None:
+        nonlocal seq
+        k = id(dst.component)
+        if k in line_drivers:
+            # A wire's line driver remembers its level and echoes it back,
+            # which the wire ignores. Don't let that look like a second
+            # driver.
+            for echo in dst.propagate(level, epoch):
+                pass
+            return
+
+        r = wire_rank.get(k)
+        if r is None:
+            # Events for output pins upstream of everything that was
+            # connected only get ignored, so they can go anywhere
+            r = comp_rank.get(k, rank + 1)
+            w = wave if r > rank else wave + 1
+            heappush(heap, (w, r, seq, src, dst, level))
+            seq += 1
+            return
+
+        entry = queued.get(k)
+        if entry is None:
+            queued[k] = [src, dst, level]
+            w = wave if r > rank else wave + 1
+            heappush(heap, (w, r, seq, None, dst, None))
+            seq += 1
+        elif entry[2] is Level.ERR:
+            pass
+        elif entry[1].pin != dst.pin and entry[2] is not level:
+            # Two drivers disagree
+            entry[2] = Level.ERR
+        else:
+            entry[:] = src, dst, level
+
+    epoch = SimStep()
+    sink = trace.sink
+
+    for wire, pins in pending.items():
+        if wire._level is Level.ERR:
+            continue
+
+        driver = None
+        for cp in pins:
+            if cp.direction is Pin.OUT and cp.level is not Level.FLT:
+                driver = cp
+                break
+
+        if driver is not None:
+            wire._release()
+            seed = next(h for cp, h in zip(reversed(wire._pins),
+                                           reversed(wire._handles))
+                        if cp is driver)
+            level = driver.level
+            if sink is not None:
+                sink.record(Record(Kind.SEED, driver, seed, level, epoch))
+            push(driver, seed, level)
+            continue
+
+        level = wire._level
+        if level is Level.FLT:
+            continue
+        for cp in pins:
+            if cp.direction is Pin.IN:
+                if sink is not None:
+                    sink.record(Record(Kind.SEED, None, cp, level, epoch))
+                push(None, cp, level)
+
+    budget = Simulation.max_events
+    if budget is None:
+        budget = -1
+
+    while heap:
+        if not budget:
+            left: Deque[Event] = deque()
+            for w, r, s, src, dst, lvl in heap:
+                if lvl is None:
+                    src, dst, lvl = queued[id(dst.component)]
+                left.append((src, dst, lvl))
+            Simulation._overrun(left)
+        budget -= 1
+
+        w, rank, s, src, dst, lvl = heappop(heap)
+        c = dst.component
+        if lvl is None:
+            src, dst, level = queued.pop(id(c))
+        else:
+            level = lvl
+
+        if w != wave:
+            if sink is not None:
+                sink.record(Record(Kind.SETTLED, None, None, None, epoch))
+            epoch = SimStep()
+            wave = w
+
+        if sink is not None:
+            sink.record(Record(Kind.EVENT, src, dst, level, epoch))
+        for nxt_src, nxt, nxt_level in c.propagate(dst.pin, level, epoch):
+            push(nxt_src, nxt, nxt_level)
+
+    if sink is not None:
+        sink.record(Record(Kind.SETTLED, None, None, None, epoch))
+
+
+@contextmanager
+def building() -> Iterator[None]:
+    """
+    Construct a circuit without simulating each connection as it is made.
+
+    Inside the block Wire.connect only records connectivity and flags
+    conflicting drivers, then the whole lot is settled in one go on the way
+    out. Wire.drive still runs straight away. Nested blocks settle when the
+    outermost one exits and nothing is settled if the block raises.
+
+    Feedback loops are broken at the connection which closed them, so a
+    latch which nothing sets comes up the same way round as it does when
+    connected one piece at a time.
+    """
+
+    if Simulation.deferred is not None:
+        yield
+        return
+
+    pending: Dict[Wire, List[ComponentPin]] = {}
+    Simulation.deferred = pending
+    try:
+        yield
+    finally:
+        Simulation.deferred = None
+
+    settle(pending)
+
+
+__all__ = (
+    'building',
+    'settle',
+)
@@ -10,8 +10,45 @@ class PinNotFoundError(PrimulaError, IndexError):
     pass
 
 
+class NetNotFoundError(PrimulaError, KeyError):
+    pass
+
+
+class NetFileError(PrimulaError):
+    pass
+
+
+class ParseError(PrimulaError, ValueError):
+    """
+    A design file could not be imported. `line` is the line number the
+    problem was found on.
+    """
+
+    def __init__(self, msg: str, line: int):
+        super().__init__(msg)
+        self.line = line
+
+
+class OscillationError(PrimulaError):
+    """
+    The circuit did not settle.
+
+    `nets` are the wires which were still changing and `period` is the
+    length of the cycle in ticks, if one was identified.
+    """
+
+    def __init__(self, msg: str, nets=(), period=None):
+        super().__init__(msg)
+        self.nets = tuple(nets)
+        self.period = period
+
+
 __all__ = (
     'PrimulaError',
     'AlreadyConnectedError',
     'PinNotFoundError',
+    'NetNotFoundError',
+    'NetFileError',
+    'OscillationError',
+    'ParseError',
 )
@@ -0,0 +1,212 @@
+from typing import List, Dict, Optional, Sequence, Mapping, Union, Any, \
+                   NamedTuple
+from .base import Level, Pin
+from .wire import Wire
+from .netlist import Netlist
+from .vector import VectorNetlist
+
+
+_OUT = Pin.OUT.value
+
+Vector = Mapping[Union[Wire, str, int], Union[Level, int, bool]]
+
+
+class Fault(NamedTuple):
+    """
+    A stuck-at fault: net number `net` held at `level`, or only the input pin
+    with slot number `slot` on it if that isn't None.
+    """
+
+    net: int
+    slot: Optional[int]
+    level: Level
+
+    def describe(self,
+                 nl: Netlist,
+                 names: Optional[List[Optional[str]]] = None) -> str:
+        if names is None:
+            names = list(nl._names())
+        name = names[self.net] or f'net{self.net}'
+        sa = 1 if self.level is Level.HI else 0
+        if self.slot is None:
+            return f'{name} sa{sa}'
+        c = nl.pin_comp[self.slot]
+        cls = nl.types[nl.comp_type[c]]
+        pin = tuple(cls._pin_names)[self.slot - nl.comp_base[c]]
+        return f'{name}->{cls.__name__}[{c}].{pin} sa{sa}'
+
+
+def faults(nl: Netlist, branches: bool = True) -> List[Fault]:
+    """
+    Stuck-at-0 and stuck-at-1 on every net and, if `branches`, on every input
+    pin of nets which fan out to more than one. No equivalent faults are
+    collapsed.
+    """
+
+    out = []
+    fan_start = nl.fan_start
+    fan_pins = nl.fan_pins
+    for n in range(nl.nr_nets):
+        for level in (Level.LO, Level.HI):
+            out.append(Fault(n, None, level))
+        if not branches or fan_start[n + 1] - fan_start[n] < 2:
+            continue
+        for j in range(fan_start[n], fan_start[n + 1]):
+            for level in (Level.LO, Level.HI):
+                out.append(Fault(n, fan_pins[j], level))
+    return out
+
+
+def outputs(nl: Netlist) -> List[int]:
+    """
+    Nets driven by a component which don't go to any component input, the
+    default places where faults are observed
+    """
+
+    driven = set(n for slot, n in enumerate(nl.pin_net)
+                 if n >= 0 and nl.pin_dir[slot] == _OUT)
+    fan_start = nl.fan_start
+    return [n for n in sorted(driven) if fan_start[n] == fan_start[n + 1]]
+
+
+class Coverage:
+    """
+    Result of a fault simulation. `detected` has the index of the first
+    vector which detected each fault that was.
+    """
+
+    __slots__ = (
+        'netlist',
+        'faults',
+        'detected',
+        'vectors',
+    )
+
+    netlist: Netlist
+    faults: List[Fault]
+    detected: Dict[Fault, int]
+    vectors: int
+
+    def __init__(self, nl: Netlist, faults: List[Fault], vectors: int):
+        self.netlist = nl
+        self.faults = faults
+        self.detected = {}
+        self.vectors = vectors
+
+    @property
+    def undetected(self) -> List[Fault]:
+        return [f for f in self.faults if f not in self.detected]
+
+    @property
+    def coverage(self) -> float:
+        if not self.faults:
+            return 1.0
+        return len(self.detected) / len(self.faults)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Coverage as plain data, with the first detecting vector of each
+        fault and the names of those which weren't detected
+        """
+
+        nl = self.netlist
+        names = list(nl._names())
+        per_vector = [0] * self.vectors
+        for i in self.detected.values():
+            per_vector[i] += 1
+        return {
+            'faults': len(self.faults),
+            'detected': len(self.detected),
+            'coverage': self.coverage,
+            'vectors': self.vectors,
+            'detected_by_vector': per_vector,
+            'undetected': [f.describe(nl, names) for f in self.undetected],
+        }
+
+
+def simulate(nl: Netlist,
+             vectors: Sequence[Vector],
+             fault_list: Optional[Sequence[Fault]] = None,
+             observe: Optional[Sequence[Union[Wire, str, int]]] = None,
+             lanes: int = 64) -> Coverage:
+    """
+    Grade a sequence of input vectors by the stuck-at faults they detect.
+
+    Faults are simulated `lanes - 1` at a time in the lanes of a
+    VectorNetlist, with the fault free circuit in lane 0. Each vector is
+    applied in turn, so sequential circuits work as well as combinational
+    ones, and after each one a fault is detected if one of the `observe`
+    nets (by default, `outputs(nl)`) is at a different level, LO or HI, to
+    the fault free circuit. Detected faults are dropped: their lanes are left
+    out of the rest of the vectors, and a batch finishes early once every
+    fault in it has been found.
+
+    The netlist itself is only used as the starting state and isn't changed.
+    """
+
+    if lanes < 2:
+        raise ValueError('need a lane for the good circuit and one fault')
+
+    if fault_list is None:
+        fault_list = faults(nl)
+    cov = Coverage(nl, list(fault_list), len(vectors))
+    obs = outputs(nl) if observe is None else [nl.net(w) for w in observe]
+    drives: List[Dict[Union[Wire, str, int], Union[Level, int]]] = [
+        {nl.net(w): _level(v) for w, v in vec.items()} for vec in vectors]
+
+    width = lanes - 1
+    for start in range(0, len(cov.faults), width):
+        batch = cov.faults[start:start + width]
+        vn = VectorNetlist(nl, len(batch) + 1)
+        for lane, f in enumerate(batch, 1):
+            vn.stick(f.net, f.level, 1 << lane, f.slot)
+
+        live = vn.full & ~1
+        for i, levels in enumerate(drives):
+            vn.apply(levels, live | 1)
+            found = _compare(vn, obs) & live
+            if not found:
+                continue
+            live &= ~found
+            while found:
+                bit = found & -found
+                found ^= bit
+                cov.detected[batch[bit.bit_length() - 2]] = i
+            if not live:
+                break
+
+    return cov
+
+
+def _level(v: Union[Level, int, bool]) -> Level:
+    if isinstance(v, Level):
+        return v
+    return Level.HI if v else Level.LO
+
+
+def _compare(vn: VectorNetlist, obs: List[int]) -> int:
+    """
+    Lanes in which an observed net is LO or HI and differs from lane 0
+    """
+
+    full = vn.full
+    net0 = vn.net0
+    net1 = vn.net1
+    diff = 0
+    for n in obs:
+        b1 = net1[n]
+        if b1 & 1:
+            # Fault free circuit isn't at a definite level
+            continue
+        good = full if net0[n] & 1 else 0
+        diff |= (net0[n] ^ good) & ~b1
+    return diff
+
+
+__all__ = (
+    'Fault',
+    'Coverage',
+    'faults',
+    'outputs',
+    'simulate',
+)
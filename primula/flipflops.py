@@ -3,7 +3,7 @@ from .component import Component, EventGenerator
 
 
 class Latch(Component):
-    pass
+    _tabulate = False
 
 
 class JK(Latch):
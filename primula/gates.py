@@ -4,7 +4,6 @@ from .component import Component, EventGenerator
 
 class Gate(Component):
     __slots__ = ()
-    pass
 
 
 class Nor(Gate):
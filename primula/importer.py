@@ -0,0 +1,735 @@
+from typing import Dict, List, Tuple, Optional, Iterator, Iterable, \
+                   NamedTuple, Type, Union, TextIO
+import os
+import re
+from .base import Level, Pull, ComponentPin
+from .component import Component
+from .wire import Wire
+from .deferred import building
+from . import gates
+from . import latches
+from . import flipflops
+from . import errors
+
+
+# Cell name -> component class and the cell's port names for each of the
+# class's pins. Classes in gates, latches and flipflops can also be used
+# directly by their own names, with their own pin names.
+Cell = Tuple[Type[Component], Dict[str, str]]
+
+CELLS: Dict[str, Cell] = {
+    'INV': (gates.Inverter, {'A': 'inp', 'Y': 'out'}),
+    'NOT': (gates.Inverter, {'A': 'inp', 'Y': 'out'}),
+    'AND2': (gates.And, {'A': 'a', 'B': 'b', 'Y': 'out'}),
+    'AND3': (gates.And3, {'A': 'a', 'B': 'b', 'C': 'c', 'Y': 'out'}),
+    'OR2': (gates.Or, {'A': 'a', 'B': 'b', 'Y': 'out'}),
+    'OR3': (gates.Or3, {'A': 'a', 'B': 'b', 'C': 'c', 'Y': 'out'}),
+    'NAND2': (gates.Nand, {'A': 'a', 'B': 'b', 'Y': 'out'}),
+    'NOR2': (gates.Nor, {'A': 'a', 'B': 'b', 'Y': 'out'}),
+    'XOR2': (gates.Xor, {'A': 'a', 'B': 'b', 'Y': 'out'}),
+    'SR': (latches.SR, {'S': 's', 'R': 'r', 'Q': 'q', 'QN': 'q_'}),
+    'JK': (flipflops.JK, {'C': 'clk', 'J': 'j', 'K': 'k', 'Q': 'q',
+                          'QN': 'q_'}),
+}
+
+
+class Design(NamedTuple):
+    """
+    An imported circuit. `nets` has every named net, including the inputs
+    and outputs, and nets joined by buffers share the same wire.
+    """
+
+    name: Optional[str]
+    inputs: Dict[str, Wire]
+    outputs: Dict[str, Wire]
+    nets: Dict[str, Wire]
+    components: List[Component]
+
+
+def _library() -> Dict[str, Cell]:
+    cells: Dict[str, Cell] = {}
+    for module in (gates, latches, flipflops):
+        for name, cls in vars(module).items():
+            if isinstance(cls, type) and issubclass(cls, Component) and \
+                    '_pin_names' in cls.__dict__:
+                cells[name] = (cls, {p: p for p in cls._pin_names})
+    cells.update(CELLS)
+    return cells
+
+
+class _Builder:
+    """
+    Collects components and the pins on each named net while a file is
+    read, then creates the wires and connects everything in one go at the
+    end. Buffers just merge two names in to one net.
+    """
+
+    __slots__ = (
+        'cells',
+        'pins',
+        'parent',
+        'pulls',
+        'components',
+        'inverted',
+        '_tmp',
+    )
+
+    pins: Dict[str, List[ComponentPin]]
+    parent: Dict[str, str]
+    pulls: Dict[str, Pull]
+    components: List[Component]
+    inverted: Dict[str, str]
+
+    def __init__(self, cells: Optional[Dict[str, Cell]]):
+        self.cells = _library()
+        if cells is not None:
+            self.cells.update(cells)
+        self.pins = {}
+        self.parent = {}
+        self.pulls = {}
+        self.components = []
+        self.inverted = {}
+        self._tmp = 0
+
+    def tmp(self, base: str) -> str:
+        self._tmp += 1
+        return f'{base}${self._tmp}'
+
+    def find(self, net: str) -> str:
+        parent = self.parent
+        root = net
+        while root in parent:
+            root = parent[root]
+        while net != root:
+            up = parent[net]
+            parent[net] = root
+            net = up
+        return root
+
+    def alias(self, a: str, b: str) -> None:
+        a = self.find(a)
+        b = self.find(b)
+        if a != b:
+            self.parent[b] = a
+
+    def const(self, net: str, level: Level) -> None:
+        self.pulls[net] = Pull.UP if level is Level.HI else Pull.DOWN
+
+    def add(self, cls: Type[Component], nets: Dict[str, str]) -> Component:
+        """
+        Create a component and put its pins, by name, on the named nets
+        """
+
+        comp = cls()
+        for pin, net in nets.items():
+            self.pins.setdefault(net, []).append(getattr(comp.pins, pin))
+        self.components.append(comp)
+        return comp
+
+    def gate(self, cls: Type[Component], ins: List[str], out: str) -> None:
+        """
+        Create a gate, its input pins in order followed by its output pin
+        """
+
+        names = list(cls._pin_names)
+        self.add(cls, dict(zip(names, ins + [out])))
+
+    def invert(self, net: str) -> str:
+        """
+        Net carrying the inverse of net, shared between all users
+        """
+
+        out = self.inverted.get(net)
+        if out is None:
+            out = self.inverted[net] = self.tmp(net)
+            self.gate(gates.Inverter, [net], out)
+        return out
+
+    def reduce(self, op: str, ins: List[str], out: str) -> None:
+        """
+        And, or or xor any number of inputs in to out
+        """
+
+        if len(ins) == 1:
+            self.alias(out, ins[0])
+            return
+
+        if op == 'xor':
+            while len(ins) > 2:
+                t = self.tmp(out)
+                self.gate(gates.Xor, ins[:2], t)
+                ins = [t] + ins[2:]
+            self.gate(gates.Xor, ins, out)
+            return
+
+        two, three = ((gates.And, gates.And3) if op == 'and'
+                      else (gates.Or, gates.Or3))
+        while len(ins) > 3:
+            t = self.tmp(out)
+            self.gate(three, ins[:3], t)
+            ins = [t] + ins[3:]
+        self.gate(two if len(ins) == 2 else three, ins, out)
+
+    def logic(self, op: str, ins: List[str], out: str,
+              invert: bool = False) -> None:
+        if not invert:
+            self.reduce(op, ins, out)
+        elif op == 'and' and len(ins) == 2:
+            self.gate(gates.Nand, ins, out)
+        elif op == 'or' and len(ins) == 2:
+            self.gate(gates.Nor, ins, out)
+        elif len(ins) == 1:
+            self.gate(gates.Inverter, ins, out)
+        else:
+            t = self.tmp(out)
+            self.reduce(op, ins, t)
+            self.gate(gates.Inverter, [t], out)
+
+    def cover(self, ins: List[str], out: str, cubes: List[str],
+              value: str) -> None:
+        """
+        Single output sum of products, as in a BLIF .names block
+        """
+
+        n = len(ins)
+        if not cubes:
+            self.const(out, Level.LO)
+            return
+        invert = value == '0'
+
+        # Cubes with nothing but don't-cares are always true
+        if any(set(c) <= {'-'} for c in cubes):
+            self.const(out, Level.LO if invert else Level.HI)
+            return
+
+        if len(cubes) == 1:
+            c = cubes[0]
+            used = [i for i in range(n) if c[i] != '-']
+            if all(c[i] == '1' for i in used):
+                self.logic('and', [ins[i] for i in used], out, invert)
+                return
+            if all(c[i] == '0' for i in used):
+                self.logic('or', [ins[i] for i in used], out, not invert)
+                return
+
+        if all(c.count('-') == n - 1 for c in cubes):
+            used = [c.index('1') if '1' in c else c.index('0')
+                    for c in cubes]
+            if len(set(used)) == len(used):
+                if all('1' in c for c in cubes):
+                    self.logic('or', [ins[i] for i in used], out, invert)
+                    return
+                if all('0' in c for c in cubes):
+                    self.logic('and', [ins[i] for i in used], out,
+                               not invert)
+                    return
+
+        if n == 2 and sorted(cubes) == ['01', '10']:
+            self.logic('xor', ins, out, invert)
+            return
+        if n == 2 and sorted(cubes) == ['00', '11']:
+            self.logic('xor', ins, out, not invert)
+            return
+
+        # Anything else is built out of and gates in to an or gate
+        terms = []
+        for c in cubes:
+            lits = [ins[i] if c[i] == '1' else self.invert(ins[i])
+                    for i in range(n) if c[i] != '-']
+            if len(lits) == 1:
+                terms.append(lits[0])
+            else:
+                t = self.tmp(out)
+                self.reduce('and', lits, t)
+                terms.append(t)
+        self.logic('or', terms, out, invert)
+
+    def flipflop(self, d: str, q: str, clk: str, edge: str,
+                 init: Optional[Level]) -> None:
+        """
+        D flip-flop on a JK, or a transparent latch on an SR
+        """
+
+        if edge in ('re', 'fe'):
+            if edge == 'fe':
+                clk = self.invert(clk)
+            ff = self.add(flipflops.JK, {'clk': clk, 'j': d,
+                                         'k': self.invert(d), 'q': q})
+        elif edge in ('ah', 'al'):
+            if edge == 'al':
+                clk = self.invert(clk)
+            s = self.tmp(q)
+            r = self.tmp(q)
+            self.gate(gates.And, [d, clk], s)
+            self.gate(gates.And, [self.invert(d), clk], r)
+            ff = self.add(latches.SR, {'s': s, 'r': r, 'q': q})
+        else:
+            raise ValueError(f'unsupported latch type {edge}')
+
+        if init is not None:
+            ff._levels[ff.pins.q.pin] = init.value
+            ff._levels[ff.pins.q_.pin] = 1 - init.value
+
+    def cell(self, name: str, conns: Union[List[str], Dict[str, str]]) \
+            -> None:
+        try:
+            cls, ports = self.cells[name]
+        except KeyError:
+            raise ValueError(f'unknown cell {name}')
+
+        if isinstance(conns, list):
+            if len(conns) > len(ports):
+                raise ValueError(f'too many connections to {name}')
+            self.add(cls, dict(zip(ports.values(), conns)))
+            return
+
+        nets = {}
+        for port, net in conns.items():
+            try:
+                nets[ports[port]] = net
+            except KeyError:
+                raise ValueError(f'{name} has no port {port}')
+        self.add(cls, nets)
+
+    def finish(self, name: Optional[str], inputs: List[str],
+               outputs: List[str]) -> Design:
+        """
+        Create the wires and connect everything up with a single settle
+        """
+
+        wires: Dict[str, Wire] = {}
+        names = set(self.pins) | set(self.pulls) | set(self.parent) | \
+            set(inputs) | set(outputs)
+
+        for net in inputs:
+            self.pulls.setdefault(self.find(net), Pull.DOWN)
+        for net, pull in list(self.pulls.items()):
+            self.pulls[self.find(net)] = pull
+
+        nets: Dict[str, Wire] = {}
+        with building():
+            for net in names:
+                root = self.find(net)
+                w = wires.get(root)
+                if w is None:
+                    w = wires[root] = Wire(root, self.pulls.get(root))
+                nets[net] = w
+
+            for net, pins in self.pins.items():
+                nets[net].connect(*pins)
+            self.pins.clear()
+
+        return Design(name,
+                      {n: nets[n] for n in inputs},
+                      {n: nets[n] for n in outputs},
+                      nets,
+                      self.components)
+
+
+def _lines(file: Union[str, 'os.PathLike[str]', TextIO]) -> Iterator[str]:
+    if isinstance(file, (str, os.PathLike)):
+        with open(file) as f:
+            yield from f
+    else:
+        yield from file
+
+
+def _blif_lines(file) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Logical lines of a BLIF file, split in to words, with comments removed
+    and continuations joined
+    """
+
+    words: List[str] = []
+    start = 0
+    for nr, line in enumerate(_lines(file), 1):
+        line = line.split('#', 1)[0]
+        if not words:
+            start = nr
+        stripped = line.rstrip()
+        if stripped.endswith('\\'):
+            words.extend(stripped[:-1].split())
+            continue
+        words.extend(stripped.split())
+        if words:
+            yield start, words
+            words = []
+    if words:
+        yield start, words
+
+
+def read_blif(file, cells: Optional[Dict[str, Cell]] = None,
+              clock: str = 'clk') -> Design:
+    """
+    Import the first model of a BLIF file.
+
+    The file is read a line at a time. `.names` covers are mapped on to
+    single gates where they match one and built out of and/or gates where
+    not. `.latch` becomes a JK wired as a D flip-flop for edge triggered
+    types or an SR for level sensitive ones, with `clock` as the control for
+    latches which don't name one. `.gate` and `.subckt` instantiate cells
+    from `CELLS`, the primula component classes by name, or `cells`.
+
+    Inputs, and the clock if used, are pulled down so the circuit settles to
+    known levels. Flip-flops start in their initial state, if one is given,
+    but as with any JK a clock which settles HI counts as an edge.
+    """
+
+    b = _Builder(cells)
+    name: Optional[str] = None
+    inputs: List[str] = []
+    outputs: List[str] = []
+    cover: Optional[Tuple[List[str], str]] = None
+    cubes: List[str] = []
+    value = '1'
+    uses_clock = False
+    models = 0
+
+    def end_cover() -> None:
+        nonlocal cover
+        if cover is not None:
+            b.cover(cover[0], cover[1], cubes, value)
+            cover = None
+
+    for nr, words in _blif_lines(file):
+        try:
+            if not words[0].startswith('.'):
+                if cover is None:
+                    raise ValueError('cover line outside of .names')
+                if len(cover[0]) == 0:
+                    cube, out = '', words[0]
+                else:
+                    cube, out = words
+                if len(cube) != len(cover[0]) or \
+                        not set(cube) <= {'0', '1', '-'}:
+                    raise ValueError(f'bad cube {cube}')
+                if cubes and out != value:
+                    raise ValueError('mixed on-set and off-set')
+                value = out
+                cubes.append(cube)
+                continue
+
+            end_cover()
+            cmd = words[0]
+            args = words[1:]
+            if cmd == '.model':
+                models += 1
+                if models > 1:
+                    # Only the first model is imported
+                    break
+                name = args[0] if args else None
+            elif cmd == '.inputs':
+                inputs.extend(args)
+            elif cmd == '.outputs':
+                outputs.extend(args)
+            elif cmd == '.names':
+                cover = (args[:-1], args[-1])
+                cubes = []
+                value = '1'
+            elif cmd == '.latch':
+                init = None
+                if len(args) in (3, 5):
+                    init = {'0': Level.LO, '1': Level.HI}.get(args[-1])
+                    args = args[:-1]
+                if len(args) == 4:
+                    d, q, edge, ctrl = args
+                    if ctrl == 'NIL':
+                        ctrl = clock
+                        uses_clock = True
+                elif len(args) == 2:
+                    d, q = args
+                    edge, ctrl = 're', clock
+                    uses_clock = True
+                else:
+                    raise ValueError('bad .latch')
+                b.flipflop(d, q, ctrl, edge, init)
+            elif cmd in ('.gate', '.subckt'):
+                conns = {}
+                for a in args[1:]:
+                    port, eq, net = a.partition('=')
+                    if not eq:
+                        raise ValueError(f'bad connection {a}')
+                    conns[port] = net
+                b.cell(args[0], conns)
+            elif cmd == '.end':
+                break
+            elif cmd in ('.clock', '.default_input_arrival', '.area',
+                         '.delay', '.wire_load_slope', '.input_arrival'):
+                pass
+            else:
+                raise ValueError(f'unsupported {cmd}')
+        except ValueError as e:
+            raise errors.ParseError(f'line {nr}: {e}', nr)
+
+    end_cover()
+    if uses_clock and clock not in inputs:
+        inputs.append(clock)
+    return b.finish(name, inputs, outputs)
+
+
+_TOKEN = re.compile(r"\s*(?:(\\\S+)|([A-Za-z_][\w$]*)|(\d*'[bB][01xXzZ])"
+                    r"|(\d+)|(\S))")
+
+
+def _verilog_statements(file) -> Iterator[Tuple[int, List[str]]]:
+    """
+    Statements of a Verilog file as lists of tokens, with comments removed.
+    Statements end with a semicolon, which is dropped, or `endmodule`.
+    """
+
+    tokens: List[str] = []
+    start = 0
+    comment = False
+    for nr, line in enumerate(_lines(file), 1):
+        pos = 0
+        end = len(line)
+        while pos < end:
+            if comment:
+                close = line.find('*/', pos)
+                if close < 0:
+                    break
+                comment = False
+                pos = close + 2
+                continue
+
+            m = _TOKEN.match(line, pos)
+            if m is None:
+                break
+            pos = m.end()
+            # Every alternative is a group, so one of them matched
+            assert m.lastindex is not None
+            tok = m.group(m.lastindex)
+            if tok == '/' and line.startswith('/', pos):
+                break
+            if tok == '/' and line.startswith('*', pos):
+                comment = True
+                pos += 1
+                continue
+            if m.group(1) is not None:
+                tok = tok[1:]
+
+            if not tokens:
+                start = nr
+            if tok == ';':
+                yield start, tokens
+                tokens = []
+            elif tok == 'endmodule' and m.group(2) is not None:
+                if tokens:
+                    yield start, tokens
+                yield nr, [tok]
+                tokens = []
+            else:
+                tokens.append(tok)
+    if tokens:
+        raise errors.ParseError(f'line {start}: unterminated statement',
+                                start)
+
+
+class _Tokens:
+    __slots__ = (
+        'toks',
+        'pos',
+    )
+
+    def __init__(self, toks: List[str]):
+        self.toks = toks
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        if self.pos < len(self.toks):
+            return self.toks[self.pos]
+        return None
+
+    def next(self) -> str:
+        tok = self.peek()
+        if tok is None:
+            raise ValueError('unexpected end of statement')
+        self.pos += 1
+        return tok
+
+    def expect(self, tok: str) -> None:
+        got = self.next()
+        if got != tok:
+            raise ValueError(f'expected {tok} got {got}')
+
+    def range(self) -> Optional[Tuple[int, int]]:
+        if self.peek() != '[':
+            return None
+        self.next()
+        msb = int(self.next())
+        self.expect(':')
+        lsb = int(self.next())
+        self.expect(']')
+        return msb, lsb
+
+    def net(self) -> str:
+        tok = self.next()
+        if "'" in tok:
+            return '1\'b' + tok[-1]
+        if self.peek() == '[':
+            self.next()
+            idx = self.next()
+            self.expect(']')
+            return f'{tok}[{idx}]'
+        return tok
+
+
+_PRIMITIVES = {
+    'and': ('and', False),
+    'nand': ('and', True),
+    'or': ('or', False),
+    'nor': ('or', True),
+    'xor': ('xor', False),
+    'xnor': ('xor', True),
+}
+
+_DIRECTIONS = ('input', 'output', 'inout', 'wire')
+
+
+def _declare(names: Iterable[str], rng: Optional[Tuple[int, int]]) \
+        -> List[str]:
+    if rng is None:
+        return list(names)
+    msb, lsb = rng
+    step = -1 if msb >= lsb else 1
+    return [f'{name}[{i}]' for name in names
+            for i in range(msb, lsb + step, step)]
+
+
+def read_verilog(file, cells: Optional[Dict[str, Cell]] = None) -> Design:
+    """
+    Import a single module of structural Verilog.
+
+    The supported subset is port and wire declarations (including vectors,
+    which are expanded to one net per bit named like `a[3]`), the gate
+    primitives, `assign` of a net, a constant or a chain of one of `~ & | ^`
+    and cell instances with named or positional connections. Cells come
+    from `CELLS`, the primula component classes by name, or `cells`.
+
+    The file is read a statement at a time. Inputs are pulled down so the
+    circuit settles to known levels.
+    """
+
+    b = _Builder(cells)
+    name: Optional[str] = None
+    inputs: List[str] = []
+    outputs: List[str] = []
+    consts = {"1'b0": Level.LO, "1'b1": Level.HI}
+
+    for nr, toks in _verilog_statements(file):
+        try:
+            t = _Tokens(toks)
+            kw = t.next()
+            if kw == 'module':
+                if name is not None:
+                    raise ValueError('only one module is supported')
+                name = t.next()
+                if t.peek() == '(':
+                    t.next()
+                    # ANSI style headers declare their ports here
+                    direction = None
+                    rng = None
+                    while t.peek() != ')':
+                        tok = t.next()
+                        if tok in _DIRECTIONS:
+                            direction = tok
+                            rng = t.range()
+                        elif tok == 'wire':
+                            rng = t.range()
+                        elif tok != ',':
+                            bits = _declare([tok], rng)
+                            if direction == 'input':
+                                inputs.extend(bits)
+                            elif direction == 'output':
+                                outputs.extend(bits)
+                    t.next()
+            elif kw in _DIRECTIONS:
+                rng = t.range()
+                names = [tok for tok in t.toks[t.pos:] if tok != ',']
+                bits = _declare(names, rng)
+                if kw == 'input':
+                    inputs.extend(bits)
+                elif kw == 'output':
+                    outputs.extend(bits)
+            elif kw == 'endmodule':
+                break
+            elif kw == 'assign':
+                lhs = t.net()
+                t.expect('=')
+                if t.peek() == '~':
+                    t.next()
+                    b.gate(gates.Inverter, [t.net()], lhs)
+                    continue
+                ins = [t.net()]
+                op = None
+                while t.peek() is not None:
+                    sym = t.next()
+                    if op is not None and sym != op:
+                        raise ValueError('mixed operators in assign')
+                    op = sym
+                    ins.append(t.net())
+                if op is None:
+                    if ins[0] in consts:
+                        b.const(lhs, consts[ins[0]])
+                    else:
+                        b.alias(lhs, ins[0])
+                else:
+                    b.reduce({'&': 'and', '|': 'or', '^': 'xor'}[op],
+                             ins, lhs)
+            elif kw in _PRIMITIVES or kw in ('not', 'buf'):
+                while True:
+                    if t.peek() == '#':
+                        raise ValueError('delays are not supported')
+                    if t.peek() != '(':
+                        t.next()
+                    t.expect('(')
+                    args = [t.net()]
+                    while t.next() == ',':
+                        args.append(t.net())
+                    if kw in ('not', 'buf'):
+                        for out in args[:-1]:
+                            if kw == 'not':
+                                b.gate(gates.Inverter, [args[-1]], out)
+                            else:
+                                b.alias(out, args[-1])
+                    else:
+                        op, invert = _PRIMITIVES[kw]
+                        b.logic(op, args[1:], args[0], invert)
+                    if t.peek() != ',':
+                        break
+                    t.next()
+            else:
+                t.next()
+                t.expect('(')
+                conns: Union[List[str], Dict[str, str]]
+                if t.peek() == '.':
+                    conns = {}
+                    while True:
+                        t.expect('.')
+                        port = t.next()
+                        t.expect('(')
+                        conns[port] = t.net()
+                        t.expect(')')
+                        if t.next() != ',':
+                            break
+                else:
+                    conns = [t.net()]
+                    while t.next() == ',':
+                        conns.append(t.net())
+                b.cell(kw, conns)
+        except (ValueError, KeyError) as e:
+            raise errors.ParseError(f'line {nr}: {e}', nr)
+
+    # Only the constants something is connected to become nets
+    for net, level in consts.items():
+        if net in b.pins or net in b.parent:
+            b.const(net, level)
+    return b.finish(name, inputs, outputs)
+
+
+__all__ = (
+    'CELLS',
+    'Design',
+    'read_blif',
+    'read_verilog',
+)
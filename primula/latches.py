@@ -4,7 +4,7 @@ from .component import Component, EventGenerator
 
 class Latch(Component):
     __slots__ = ()
-    pass
+    _tabulate = False
 
 
 class SR(Latch):
@@ -0,0 +1,166 @@
+from typing import Optional, Union, Tuple, Literal
+from array import array
+import mmap
+import os
+from .base import Pin, Level
+from .bus import BusComponent, Word, SignalGenerator, _bad
+
+
+_HI = Level.HI.value
+
+# Formats to hold words of up to 8, 16, 32 and 64 bits
+_Format = Literal['B', 'H', 'I', 'Q']
+_FORMATS: Tuple[Tuple[int, _Format], ...] = (
+    (8, 'B'),
+    (16, 'H'),
+    (32, 'I'),
+    (64, 'Q'),
+)
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+Path = Union[str, 'os.PathLike[str]']
+
+
+def _format(data_bits: int) -> _Format:
+    for bits, fmt in _FORMATS:
+        if data_bits <= bits:
+            return fmt
+    raise ValueError(f'{data_bits} bit words are too wide, the limit is 64')
+
+
+def _map(path: Path, writable: bool) -> mmap.mmap:
+    """
+    Map a file, copy-on-write if it is to be written so that the file itself
+    is never changed
+    """
+
+    access = mmap.ACCESS_COPY if writable else mmap.ACCESS_READ
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=access)
+
+
+class ROM(BusComponent):
+    """
+    Read only memory of 2 ** addr_bits words of data_bits each.
+
+    The contents are any buffer of words in native byte order, one byte
+    each for up to 8 bit words, two for up to 16 bits and so on. It is used
+    where it is, through a memoryview, so a mapped file (see `from_file`)
+    is never copied. It may be shorter than the address space, addresses
+    past the end of it read as floating.
+
+    dout is the word at addr, looked up whenever addr changes.
+    """
+
+    __slots__ = (
+        'contents',
+        '_mask',
+    )
+    _pin_names: Tuple[str, ...] = (
+        'addr',
+        'dout',
+    )
+
+    # Memoryview of the contents, cast to words
+    contents: memoryview
+    _mask: int
+
+    def __init__(self,
+                 addr_bits: int,
+                 data_bits: int,
+                 contents: Optional[Buffer] = None):
+        self._setup((addr_bits, data_bits), (Pin.IN, Pin.OUT),
+                    addr_bits, data_bits, contents, False)
+
+    def _setup(self, widths, directions, addr_bits: int, data_bits: int,
+               contents: Optional[Buffer], writable: bool) -> None:
+        super().__init__(widths, directions)
+        fmt = _format(data_bits)
+        size = array(fmt).itemsize
+        if contents is None:
+            contents = bytearray(size << addr_bits)
+        view = memoryview(contents).cast('B')
+        if len(view) % size:
+            raise ValueError('contents are not a whole number of words')
+        view = view.cast(fmt)
+        if len(view) > 1 << addr_bits:
+            raise ValueError(f'{len(view)} words of contents is more than '
+                             f'{addr_bits} address bits can reach')
+        if writable and view.readonly:
+            raise ValueError('contents of a memory must be writable')
+        self.contents = view
+        self._mask = (1 << data_bits) - 1
+
+    @classmethod
+    def from_file(cls, path: Path, addr_bits: int, data_bits: int) -> 'ROM':
+        """
+        Create one with the contents of a file, mapped rather than read
+        """
+
+        return cls(addr_bits, data_bits, _map(path, False))
+
+    def _read(self, dout: int) -> SignalGenerator:
+        addr = self.word(0)
+        if not addr.valid:
+            yield from self.output(dout, _bad(self._mask, addr))
+            return
+        contents = self.contents
+        if addr.value >= len(contents):
+            yield from self.output(dout, Word(0, self._mask, 0))
+            return
+        yield from self.output(dout, Word(contents[addr.value] & self._mask))
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        yield from self._read(1)
+
+
+class Memory(ROM):
+    """
+    Read/write memory of 2 ** addr_bits words of data_bits each.
+
+    Reads work as for a `ROM`. The word on din is written to addr whenever
+    HI arrives on we, after which dout shows it. Writes past the end of the
+    contents are dropped. Contents from a file are mapped copy-on-write so
+    writes never reach the file. Without any, the memory starts cleared.
+    """
+
+    __slots__ = ()
+    _pin_names: Tuple[str, ...] = (
+        'addr',
+        'din',
+        'we',
+        'dout',
+    )
+
+    def __init__(self,
+                 addr_bits: int,
+                 data_bits: int,
+                 contents: Optional[Buffer] = None):
+        self._setup((addr_bits, data_bits, 0, data_bits),
+                    (Pin.IN, Pin.IN, Pin.IN, Pin.OUT),
+                    addr_bits, data_bits, contents, True)
+
+    @classmethod
+    def from_file(cls,
+                  path: Path,
+                  addr_bits: int,
+                  data_bits: int) -> 'Memory':
+        return cls(addr_bits, data_bits, _map(path, True))
+
+    def _on_change(self, pin: int) -> SignalGenerator:
+        if pin == 2:
+            if self._levels[2] != _HI:
+                return
+            addr = self.word(0)
+            din = self.word(1)
+            if addr.valid and din.valid and addr.value < len(self.contents):
+                self.contents[addr.value] = din.value
+        elif pin == 1:
+            return
+        yield from self._read(3)
+
+
+__all__ = (
+    'ROM',
+    'Memory',
+)
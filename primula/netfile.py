@@ -0,0 +1,377 @@
+from typing import List, Tuple, Union, Optional, Iterator, BinaryIO, Any, \
+                   Dict, IO, Iterable, Sequence, Type
+from array import array
+from importlib import import_module
+import gc
+import mmap
+import os
+import struct
+from .base import Level, ComponentPin
+from .component import Component
+from .wire import Wire
+from .netlist import Netlist, compile, type_luts, type_opcodes
+from . import errors
+
+
+# A file is laid out as, in native byte order:
+#
+#   header: magic, version, byte order mark, number of sections
+#   section table: (offset, length) of each section in bytes
+#   each section, aligned to 8 bytes
+#
+# The sections are the arrays of a compiled Netlist, plus what it takes to
+# recreate the Wire objects. Component classes are stored by module and
+# qualified name along with the opcode they compiled to.
+MAGIC = b'PRIMNET\0'
+VERSION = 1
+
+_BOM = 0x01020304
+_HEADER = struct.Struct('=8sIII4x')
+_SECTION = struct.Struct('=QQ')
+_ALIGN = 8
+
+# Name and memoryview format of every section, in file order
+_SECTIONS: Tuple[Tuple[str, Any], ...] = (
+    ('types', 'B'),
+    ('comp_type', 'H'),
+    ('opcodes', 'B'),
+    ('comp_base', 'I'),
+    ('pin_levels', 'B'),
+    ('pin_dir', 'B'),
+    ('pin_comp', 'I'),
+    ('pin_net', 'i'),
+    ('pin_local', 'I'),
+    ('levels', 'B'),
+    ('net_driver', 'I'),
+    ('fan_start', 'I'),
+    ('fan_pins', 'I'),
+    ('net_next_id', 'I'),
+    ('net_line', 'B'),
+    ('name_start', 'I'),
+    ('names', 'B'),
+)
+
+# Stands in for a wire with no name, it can't appear in valid UTF-8
+_NO_NAME = b'\xff'
+
+_levels = tuple(Level)
+
+PathOrFile = Union[str, 'os.PathLike[str]', BinaryIO]
+
+
+def _type_name(cls: type) -> str:
+    if '<locals>' in cls.__qualname__:
+        raise errors.NetFileError(f'{cls.__qualname__} can not be imported '
+                                  'so can not be saved')
+    return f'{cls.__module__}:{cls.__qualname__}'
+
+
+def _find_type(name: str) -> Type[Component]:
+    module, sep, qualname = name.partition(':')
+    if not sep:
+        raise errors.NetFileError(f'bad component name {name}')
+    try:
+        obj: Any = import_module(module)
+        for part in qualname.split('.'):
+            obj = getattr(obj, part)
+    except (ImportError, AttributeError) as e:
+        raise errors.NetFileError(f'component {name} not found: {e}')
+
+    # Files may come from anywhere, so never hand back anything else that
+    # happened to be importable
+    if not (isinstance(obj, type) and issubclass(obj, Component)):
+        raise errors.NetFileError(f'{name} is not a component class')
+    return obj
+
+
+def _net_info(nl: Netlist) -> Tuple[array, array, List[Optional[str]]]:
+    """
+    Next pin number, line driver level and name of every net
+    """
+
+    src = nl._source
+    if nl._wires is None:
+        return (array('I', src.net_next_id),
+                array('B', src.net_line),
+                list(src.names()))
+
+    return (array('I', (len(w._pins) for w in nl._wires)),
+            array('B', (w._line._level.value for w in nl._wires)),
+            [w._name for w in nl._wires])
+
+
+def save(file: PathOrFile, *roots: Union[Netlist, Wire, Component]) -> None:
+    """
+    Write a circuit to file. Pass either a Netlist or some of the wires and
+    components of a circuit, as for `netlist.compile`.
+    """
+
+    if len(roots) == 1 and isinstance(roots[0], Netlist):
+        nl = roots[0]
+        nl.refresh()
+    else:
+        parts = [r for r in roots if not isinstance(r, Netlist)]
+        if len(parts) != len(roots):
+            raise errors.NetFileError('a Netlist can only be saved alone')
+        nl = compile(*parts)
+
+    next_id, line, names = _net_info(nl)
+
+    types = ''.join(f'{_type_name(cls)} {op}\n'
+                    for cls, op in zip(nl.types,
+                                       type_opcodes(nl.types, nl.luts)))
+
+    name_start = array('I', [0])
+    blob = bytearray()
+    for name in names:
+        blob += _NO_NAME if name is None else name.encode()
+        name_start.append(len(blob))
+
+    sections = {
+        'types': types.encode(),
+        'comp_type': array('H', nl.comp_type),
+        'opcodes': bytes(nl.opcodes),
+        'comp_base': array('I', nl.comp_base),
+        'pin_levels': bytes(nl.pin_levels),
+        'pin_dir': bytes(nl.pin_dir),
+        'pin_comp': array('I', nl.pin_comp),
+        'pin_net': array('i', nl.pin_net),
+        'pin_local': array('I', nl.pin_local),
+        'levels': bytes(nl.levels),
+        'net_driver': array('I', nl.net_driver),
+        'fan_start': array('I', nl.fan_start),
+        'fan_pins': array('I', nl.fan_pins),
+        'net_next_id': next_id,
+        'net_line': line,
+        'name_start': name_start,
+        'names': bytes(blob),
+    }
+
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'wb') as f:
+            _write(f, sections)
+    else:
+        _write(file, sections)
+
+
+def _write(f: IO[bytes], sections: Dict[str, Any]) -> None:
+    offset = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    table = []
+    for name, fmt in _SECTIONS:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        size = memoryview(sections[name]).nbytes
+        table.append((offset, size))
+        offset += size
+
+    f.write(_HEADER.pack(MAGIC, VERSION, _BOM, len(_SECTIONS)))
+    for entry in table:
+        f.write(_SECTION.pack(*entry))
+    pos = _HEADER.size + _SECTION.size * len(_SECTIONS)
+    for (name, fmt), (offset, size) in zip(_SECTIONS, table):
+        f.write(bytes(offset - pos))
+        f.write(memoryview(sections[name]).cast('B'))
+        pos = offset + size
+
+
+class NetFile:
+    """
+    A mapped netlist file.
+
+    The netlist made from it points straight at the mapped arrays, so
+    opening a design costs the same however many gates it has. Pages are
+    mapped copy-on-write, simulating never changes the file. The mapping
+    stays open for as long as the netlist is alive and creates the object
+    graph if it is asked for.
+
+    Component classes must be importable by the same name as when the file
+    was written.
+    """
+
+    __slots__ = (
+        '_map',
+        '_views',
+    )
+
+    _map: mmap.mmap
+    _views: Dict[str, memoryview]
+
+    def __init__(self, file: PathOrFile):
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        buf = memoryview(self._map)
+        if len(buf) < _HEADER.size:
+            raise errors.NetFileError('truncated netlist file')
+        magic, version, bom, nr_sections = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise errors.NetFileError('not a netlist file')
+        if version != VERSION:
+            raise errors.NetFileError(f'netlist file version {version}, '
+                                      f'only {VERSION} is supported')
+        if bom != _BOM:
+            raise errors.NetFileError('netlist file has wrong byte order')
+        if nr_sections != len(_SECTIONS):
+            raise errors.NetFileError('netlist file is corrupt')
+
+        self._views = {}
+        pos = _HEADER.size
+        for name, fmt in _SECTIONS:
+            offset, size = _SECTION.unpack_from(buf, pos)
+            pos += _SECTION.size
+            if offset + size > len(buf):
+                raise errors.NetFileError('truncated netlist file')
+            self._views[name] = buf[offset:offset + size].cast(fmt)
+
+    def __getattr__(self, name: str) -> memoryview:
+        try:
+            return self._views[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def netlist(self) -> Netlist:
+        v = self._views
+
+        types = []
+        stored = bytearray()
+        for line in bytes(v['types']).decode().splitlines():
+            name, op = line.split(' ')
+            types.append(_find_type(name))
+            stored.append(int(op))
+        luts = type_luts(types, v['comp_type'], v['comp_base'],
+                         v['pin_dir'], v['pin_levels'])
+        ops = type_opcodes(types, luts)
+
+        nl = Netlist.__new__(Netlist)
+        nl._wires = None
+        nl._components = None
+        nl._source = self
+        nl._net_index = {}
+        nl._name_index = None
+        nl.types = types
+        nl.luts = luts
+        nl.comp_type = v['comp_type']
+        if ops == stored:
+            nl.opcodes = v['opcodes']
+        else:
+            # Classes have changed since the file was written
+            nl.opcodes = bytearray(ops[t] for t in v['comp_type'])
+        nl.comp_base = v['comp_base']
+        nl.pin_levels = v['pin_levels']
+        nl.pin_dir = v['pin_dir']
+        nl.pin_comp = v['pin_comp']
+        nl.pin_net = v['pin_net']
+        nl.pin_local = v['pin_local']
+        nl.levels = v['levels']
+        nl.net_driver = v['net_driver']
+        nl.fan_start = v['fan_start']
+        nl.fan_pins = v['fan_pins']
+        nl._setup()
+        return nl
+
+    def names(self) -> Iterator[Optional[str]]:
+        start = self._views['name_start']
+        blob = bytes(self._views['names'])
+        for n in range(len(start) - 1):
+            raw = blob[start[n]:start[n + 1]]
+            yield None if raw == _NO_NAME else raw.decode()
+
+    def objects(self, nl: Netlist) -> Tuple[List[Wire], List[Component]]:
+        """
+        Create the wires and components of a netlist loaded from this file,
+        in their current state
+        """
+
+        return materialize(nl, self._views['net_line'], self.names())
+
+
+def materialize(nl: Netlist,
+                line: Sequence[int],
+                names: Iterable[Optional[str]]) \
+        -> Tuple[List[Wire], List[Component]]:
+    """
+    Create the wires and components of a netlist which has only its arrays,
+    given the level of each net's line driver and the net names
+    """
+
+    # None of these objects are garbage, so don't keep scanning them
+    # while there are millions being created
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _objects(nl, line, names)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _objects(nl: Netlist,
+             line: Sequence[int],
+             names: Iterable[Optional[str]]) \
+        -> Tuple[List[Wire], List[Component]]:
+
+    comp_base = nl.comp_base
+    comp_type = nl.comp_type
+    pin_dir = nl.pin_dir
+    pin_levels = nl.pin_levels
+    types = nl.types
+
+    comps = []
+    for c in range(len(comp_type)):
+        b = comp_base[c]
+        e = comp_base[c + 1]
+        comps.append(types[comp_type[c]]._restore(
+            array('B', pin_dir[b:e]),
+            array('B', pin_levels[b:e])))
+
+    nr_nets = len(nl.levels)
+    by_net: List[List[Tuple[int, int]]] = [[] for n in range(nr_nets)]
+    pin_local = nl.pin_local
+    for slot, n in enumerate(nl.pin_net):
+        if n >= 0:
+            by_net[n].append((pin_local[slot], slot))
+
+    pin_comp = nl.pin_comp
+    wires = []
+    for n, name in enumerate(names):
+        w = Wire(name)
+        w._level = _levels[nl.levels[n]]
+        d = nl.net_driver[n]
+        w._driver = pin_local[d - 1] if d else 0
+        w._line._level = _levels[line[n]]
+        pins = w._pins
+        handles = w._handles
+        for local, slot in sorted(by_net[n]):
+            c = pin_comp[slot]
+            p = slot - comp_base[c]
+            me = ComponentPin(w, local)
+            pins.append(comps[c]._handles[p])
+            handles.append(me)
+            comps[c]._conns[p] = me
+        wires.append(w)
+
+    return wires, comps
+
+
+def load(file: PathOrFile, objects: bool = False) -> Netlist:
+    """
+    Map a netlist file. The Wire and Component objects are created the first
+    time they are asked for, or straight away if `objects` is set.
+    """
+
+    nl = NetFile(file).netlist()
+    if objects:
+        nl.wires
+    return nl
+
+
+__all__ = (
+    'MAGIC',
+    'VERSION',
+    'NetFile',
+    'save',
+    'load',
+    'materialize',
+)
@@ -0,0 +1,751 @@
+from typing import List, Dict, Deque, Union, Tuple, Type, Mapping, Optional, \
+                   Iterable, Any, Callable, Sequence
+from array import array
+from collections import deque
+from .base import Level, Pin, MergeStep
+from .component import Component
+from .truthtable import TruthTable, tabulate
+from .wire import Wire
+from . import gates
+from . import latches
+from . import flipflops
+from . import errors
+
+
+# Arrays of bytes and of wider ints, as created or as memoryviews of a
+# mapped file
+ByteArray = Union[bytearray, memoryview]
+IntArray = Union[array, memoryview]
+
+# Opcodes for the components which the compiled engine knows how to evaluate
+# without calling back in to Python objects. Other components with a truth
+# table are OP_LUT, anything else is OP_GENERIC and goes through the
+# component's own `_on_change` method.
+OP_GENERIC = 0
+OP_INV = 1
+OP_NOR = 2
+OP_NAND = 3
+OP_AND = 4
+OP_AND3 = 5
+OP_OR = 6
+OP_OR3 = 7
+OP_XOR = 8
+OP_SR = 9
+OP_JK = 10
+OP_LUT = 11
+# Gates evaluated by generated code for their whole cone, see `levelize`
+OP_CONE = 12
+
+_opcodes: Dict[Type[Component], int] = {
+    gates.Inverter: OP_INV,
+    gates.Nor: OP_NOR,
+    gates.Nand: OP_NAND,
+    gates.And: OP_AND,
+    gates.And3: OP_AND3,
+    gates.Or: OP_OR,
+    gates.Or3: OP_OR3,
+    gates.Xor: OP_XOR,
+    latches.SR: OP_SR,
+    flipflops.JK: OP_JK,
+}
+
+_levels = tuple(Level)
+
+_LO = Level.LO.value
+_HI = Level.HI.value
+_FLT = Level.FLT.value
+_ERR = Level.ERR.value
+_IN = Pin.IN.value
+
+# Events are packed in to a single int so that the queue holds nothing but
+# small integers:
+#
+#   bits 0-1: level
+#   bit 2: set for net -> pin events, clear for pin -> net events
+#   bits 3+: pin slot (pin events) or (driver << net_bits | net) (net events)
+#
+# The driver of a net event is the slot of the driving pin plus one, with zero
+# meaning the wire's own line driver (ie. Wire.drive).
+_PIN_EVENT = 4
+
+# Most times a net can change in one merged settle, after which it is taken
+# to be oscillating
+_MAX_MERGES = MergeStep.max_merges
+
+
+class Netlist:
+    """
+    A circuit flattened in to integer arrays.
+
+    Nets (wires) and component pins are numbered densely. Net levels live in
+    one shared `levels` bytearray and component pin levels in `pin_levels`.
+    Connectivity is held in CSR form: the input pins fed by net `n` are
+    `fan_pins[fan_start[n]:fan_start[n + 1]]`. Components are described by an
+    opcode and the slot of their first pin.
+
+    Running the simulation only touches these arrays, except for components
+    without an opcode which are called back via their `_on_change` method.
+    Levels of any wires and components which changed are written back to the
+    objects at the end of each settle, so `Wire.level` keeps working.
+
+    If the object graph is driven directly, call `refresh()` before using the
+    netlist again.
+
+    A netlist loaded from a file (see `primula.netfile`) has no objects to
+    begin with, the arrays are all there is. Nets can be looked up by name
+    and the `Wire` and `Component` objects are only created, all at once, the
+    first time that `wires` or `components` is used.
+    """
+
+    __slots__ = (
+        'levels',
+        'net_driver',
+        'net_step',
+        'fan_start',
+        'fan_pins',
+        'opcodes',
+        'comp_base',
+        'comp_type',
+        'types',
+        'luts',
+        'pin_levels',
+        'pin_dir',
+        'pin_comp',
+        'pin_net',
+        'pin_local',
+        '_wires',
+        '_components',
+        '_source',
+        '_net_index',
+        '_name_index',
+        '_net_bits',
+        '_step',
+        '_net_dirty',
+        '_comp_dirty',
+        '_dirty_nets',
+        '_dirty_comps',
+        '_run_ops',
+        '_cones',
+        '_comp_cone',
+        '_cone_dirty',
+        '_dirty_cones',
+    )
+
+    # Arrays may be any writable buffer of ints, for example memoryviews of
+    # a mapped file, not just the types they are created as here
+    levels: ByteArray
+    net_driver: IntArray
+    net_step: array
+    fan_start: IntArray
+    fan_pins: IntArray
+    opcodes: ByteArray
+    comp_base: IntArray
+    comp_type: IntArray
+    types: List[Type[Component]]
+    luts: List[Optional[TruthTable]]
+    pin_levels: ByteArray
+    pin_dir: ByteArray
+    pin_comp: IntArray
+    pin_net: IntArray
+    pin_local: IntArray
+
+    _wires: Optional[List[Wire]]
+    _components: Optional[List[Component]]
+    _source: Any
+    _name_index: Optional[Dict[str, int]]
+
+    def __init__(self,
+                 wires: List[Wire],
+                 components: List[Component]):
+        self._wires = wires
+        self._components = components
+        self._source = None
+        self._net_index = {id(w): n for n, w in enumerate(wires)}
+        self._name_index = None
+
+        comp_index = {id(c): i for i, c in enumerate(components)}
+
+        type_index: Dict[Type[Component], int] = {}
+        self.types = []
+        self.comp_type = array('H')
+        for c in components:
+            t = type_index.get(type(c))
+            if t is None:
+                t = type_index[type(c)] = len(self.types)
+                self.types.append(type(c))
+            self.comp_type.append(t)
+
+        self.comp_base = array('L')
+        self.pin_levels = bytearray()
+        self.pin_dir = bytearray()
+        self.pin_comp = array('L')
+        for i, c in enumerate(components):
+            self.comp_base.append(len(self.pin_levels))
+            self.pin_levels.extend(c._levels)
+            self.pin_dir.extend(c._directions)
+            self.pin_comp.extend(i for x in c._levels)
+        self.comp_base.append(len(self.pin_levels))
+
+        self.luts = type_luts(self.types, self.comp_type, self.comp_base,
+                              self.pin_dir, self.pin_levels)
+        ops = type_opcodes(self.types, self.luts)
+        self.opcodes = bytearray(ops[t] for t in self.comp_type)
+
+        nr_pins = len(self.pin_levels)
+        self.pin_net = array('l', (-1 for x in range(nr_pins)))
+        self.pin_local = array('L', (0 for x in range(nr_pins)))
+
+        self.fan_start = array('L')
+        self.fan_pins = array('L')
+        for n, w in enumerate(wires):
+            self.fan_start.append(len(self.fan_pins))
+            for local, cp in enumerate(w._pins):
+                if local == 0:
+                    continue
+                slot = self.comp_base[comp_index[id(cp.component)]] + cp.pin
+                self.pin_net[slot] = n
+                self.pin_local[slot] = local
+                if self.pin_dir[slot] == _IN:
+                    self.fan_pins.append(slot)
+        self.fan_start.append(len(self.fan_pins))
+
+        self.levels = bytearray(len(wires))
+        self.net_driver = _zeros('L', len(wires))
+
+        self._setup()
+        self.refresh()
+
+    def _setup(self) -> None:
+        """
+        Initialise the simulation state which isn't part of the circuit
+        """
+
+        nr_nets = len(self.levels)
+        self._net_bits = max(nr_nets, 1).bit_length()
+        self._step = 0
+        self.net_step = _zeros('L', nr_nets)
+        self._net_dirty = bytearray(nr_nets)
+        self._comp_dirty = bytearray(len(self.opcodes))
+        self._dirty_nets: List[int] = []
+        self._dirty_comps: List[int] = []
+        self._run_ops = bytearray(self.opcodes)
+        self._cones: List[Callable[..., None]] = []
+        self._comp_cone = array('l')
+        self._cone_dirty = bytearray()
+        self._dirty_cones: List[int] = []
+
+    @property
+    def nr_nets(self) -> int:
+        return len(self.levels)
+
+    @property
+    def nr_components(self) -> int:
+        return len(self.opcodes)
+
+    @property
+    def wires(self) -> List[Wire]:
+        if self._wires is None:
+            self._materialize()
+            assert self._wires is not None
+        return self._wires
+
+    @property
+    def components(self) -> List[Component]:
+        if self._components is None:
+            self._materialize()
+            assert self._components is not None
+        return self._components
+
+    def _materialize(self) -> None:
+        self._wires, self._components = self._source.objects(self)
+        self._net_index = {id(w): n for n, w in enumerate(self._wires)}
+
+    def _names(self) -> Iterable[Optional[str]]:
+        if self._wires is None:
+            return self._source.names()
+        return (w._name for w in self._wires)
+
+    def refresh(self) -> None:
+        """
+        Reload all levels from the object graph.
+        """
+
+        if self._wires is None:
+            # There's no object graph yet, nothing can have changed
+            return
+
+        for n, w in enumerate(self.wires):
+            self.levels[n] = w._level.value
+            self.net_driver[n] = 0
+
+        for slot, n in enumerate(self.pin_net):
+            if n >= 0 and self.wires[n]._driver == self.pin_local[slot]:
+                self.net_driver[n] = slot + 1
+
+        for i, c in enumerate(self.components):
+            b = self.comp_base[i]
+            self.pin_levels[b:self.comp_base[i + 1]] = c._levels
+
+    def snapshot(self) -> bytes:
+        """
+        Net levels, pin levels and net drivers in one buffer, for `restore`.
+        Pin directions are fixed when the netlist is compiled, so they are
+        not part of it.
+        """
+
+        return bytes(self.levels) + bytes(self.pin_levels) + \
+            memoryview(self.net_driver).tobytes()
+
+    def restore(self, state: bytes) -> None:
+        """
+        Put the simulation back in to a state from `snapshot`. The arrays
+        are copied straight in, the objects are then brought up to date as
+        `refresh` would have it.
+        """
+
+        nr_nets = len(self.levels)
+        nr_pins = len(self.pin_levels)
+        mv = memoryview(state)
+        self.levels[:] = mv[:nr_nets]
+        self.pin_levels[:] = mv[nr_nets:nr_nets + nr_pins]
+        memoryview(self.net_driver).cast('B')[:] = mv[nr_nets + nr_pins:]
+
+        if self._wires is None:
+            return
+
+        # Nothing is dirty between settles, so this writes back everything
+        self._dirty_nets[:] = range(nr_nets)
+        self._dirty_comps[:] = range(len(self.opcodes))
+        self._write_back()
+
+    def net(self, wire: Union[Wire, str, int]) -> int:
+        """
+        Number of a net, given its Wire, the name of the wire or the number
+        """
+
+        if isinstance(wire, int):
+            if not 0 <= wire < len(self.levels):
+                raise errors.NetNotFoundError(f'no net number {wire}')
+            return wire
+
+        if isinstance(wire, str):
+            if self._name_index is None:
+                self._name_index = {name: n
+                                    for n, name in enumerate(self._names())
+                                    if name is not None}
+            try:
+                return self._name_index[wire]
+            except KeyError:
+                raise errors.NetNotFoundError(f'no net named {wire}')
+
+        try:
+            return self._net_index[id(wire)]
+        except KeyError:
+            raise errors.NetNotFoundError(f'{wire} is not in this netlist')
+
+    def level(self, wire: Union[Wire, str, int]) -> Level:
+        return _levels[self.levels[self.net(wire)]]
+
+    def drive(self, wire: Union[Wire, str, int], level: Level) -> None:
+        """
+        Compiled equivalent of `Wire.drive`
+        """
+
+        self._settle(self._seed({wire: level}))
+
+    def apply(self,
+              levels: Mapping[Union[Wire, str, int], Level]) -> None:
+        """
+        Compiled equivalent of `Simulation.apply`, where a net may change
+        more than once on the way to the fix-point
+        """
+
+        self._settle(self._seed(levels), merge=True)
+
+    def _seed(self,
+              levels: Mapping[Union[Wire, str, int], Level]) -> Deque[int]:
+        """
+        Float each net and queue the event which drives it to its level
+        """
+
+        q: Deque[int] = deque()
+        for wire, level in levels.items():
+            n = self.net(wire)
+            self.levels[n] = _FLT
+            self._mark_net(n)
+            q.append((n << 3) | level.value)
+        return q
+
+    def pulse(self, wire: Union[Wire, str, int]) -> None:
+        self.drive(wire, Level.HI)
+        self.drive(wire, Level.LO)
+
+    def levelize(self) -> int:
+        """
+        Replace event processing for acyclic cones of gates with generated
+        code, returning the number of cones.
+
+        Every gate which isn't on or after a feedback loop, and whose output
+        net has no other driver, goes in a cone. When an input of a cone
+        changes the whole cone is evaluated once, in topological order, by
+        a straight-line function made by `primula.codegen`, once there are
+        no more events. Their code is cached by the shape of each cone,
+        wherever it is in the netlist, so repeated blocks and building the
+        same circuit again reuse it.
+
+        Unlike events, this never sees the glitches of reconvergent logic,
+        so a gate inside a cone never goes to ERR for being driven twice.
+        Nets inside a cone should not be driven directly.
+        """
+
+        from . import codegen
+
+        self._run_ops = bytearray(self.opcodes)
+        self._cones = []
+        self._comp_cone = array('l', (-1 for x in range(len(self.opcodes))))
+        for cone in codegen.cones(self):
+            i = len(self._cones)
+            self._cones.append(codegen.compile_cone(self, cone))
+            for c in cone:
+                self._run_ops[c] = OP_CONE
+                self._comp_cone[c] = i
+        self._cone_dirty = bytearray(len(self._cones))
+        self._dirty_cones.clear()
+        return len(self._cones)
+
+    def _run_cones(self, push) -> None:
+        args = (self.levels, self.pin_levels, self.net_driver,
+                self._net_dirty, self._dirty_nets, self._comp_dirty,
+                self._dirty_comps, push)
+        cones = self._cones
+        cone_dirty = self._cone_dirty
+        dirty_cones = self._dirty_cones
+        for i in dirty_cones:
+            cone_dirty[i] = 0
+            cones[i](*args)
+        dirty_cones.clear()
+
+    def _mark_net(self, n: int) -> None:
+        if not self._net_dirty[n]:
+            self._net_dirty[n] = 1
+            self._dirty_nets.append(n)
+
+    def _settle(self, q: Deque[int], merge: bool = False) -> None:
+        """
+        Run events until the circuit settles. With merge, a net which
+        changes again in the same step takes the new level rather than
+        going to ERR, up to `_MAX_MERGES` times, for the first settle of a
+        circuit where everything changes at once.
+        """
+
+        self._step += 1
+        step = self._step
+
+        levels = self.levels
+        net_driver = self.net_driver
+        net_step = self.net_step
+        fan_start = self.fan_start
+        fan_pins = self.fan_pins
+        opcodes = self._run_ops
+        comp_base = self.comp_base
+        pin_levels = self.pin_levels
+        pin_comp = self.pin_comp
+        pin_net = self.pin_net
+        net_dirty = self._net_dirty
+        comp_dirty = self._comp_dirty
+        dirty_nets = self._dirty_nets
+        dirty_comps = self._dirty_comps
+        net_bits = self._net_bits
+        net_mask = (1 << net_bits) - 1
+        comp_cone = self._comp_cone
+        cone_dirty = self._cone_dirty
+        dirty_cones = self._dirty_cones
+        merges = bytearray(len(levels)) if merge else None
+        popleft = q.popleft
+        push = q.append
+
+        while q or dirty_cones:
+            if not q:
+                # Cones only run once everything else has settled, so that
+                # each is evaluated as few times as possible
+                self._run_cones(push)
+                continue
+
+            ev = popleft()
+            level = ev & 3
+
+            if not ev & _PIN_EVENT:
+                # Pin -> net, the equivalent of Wire.propagate
+                ev >>= 3
+                n = ev & net_mask
+
+                # We reached a fix-point
+                if levels[n] == level:
+                    continue
+
+                if not net_dirty[n]:
+                    net_dirty[n] = 1
+                    dirty_nets.append(n)
+
+                # Driven twice this step
+                if net_step[n] == step:
+                    if merges is None or merges[n] == _MAX_MERGES:
+                        levels[n] = _ERR
+                        continue
+                    merges[n] += 1
+
+                levels[n] = level
+                net_driver[n] = ev >> net_bits
+                net_step[n] = step
+
+                if level > _HI:
+                    continue
+
+                pin_ev = _PIN_EVENT | level
+                for i in range(fan_start[n], fan_start[n + 1]):
+                    push((fan_pins[i] << 3) | pin_ev)
+                continue
+
+            # Net -> pin, the equivalent of Component.propagate
+            slot = ev >> 3
+            pin_levels[slot] = level
+            c = pin_comp[slot]
+            if not comp_dirty[c]:
+                comp_dirty[c] = 1
+                dirty_comps.append(c)
+
+            op = opcodes[c]
+            b = comp_base[c]
+
+            if op == OP_NOR:
+                out = b + 2
+                v = 0 if (pin_levels[b] or pin_levels[b + 1]) else 1
+            elif op == OP_NAND:
+                out = b + 2
+                v = 0 if (pin_levels[b] and pin_levels[b + 1]) else 1
+            elif op == OP_AND:
+                out = b + 2
+                v = pin_levels[b] and pin_levels[b + 1]
+            elif op == OP_AND3:
+                out = b + 3
+                v = (pin_levels[b] and pin_levels[b + 1]
+                     and pin_levels[b + 2])
+            elif op == OP_OR:
+                out = b + 2
+                v = pin_levels[b] or pin_levels[b + 1]
+            elif op == OP_OR3:
+                out = b + 3
+                v = (pin_levels[b] or pin_levels[b + 1]
+                     or pin_levels[b + 2])
+            elif op == OP_XOR:
+                out = b + 2
+                v = 1 if (not pin_levels[b]) != (not pin_levels[b + 1]) else 0
+            elif op == OP_INV:
+                out = b + 1
+                v = 0 if pin_levels[b] else 1
+            elif op == OP_CONE:
+                i = comp_cone[c]
+                if not cone_dirty[i]:
+                    cone_dirty[i] = 1
+                    dirty_cones.append(i)
+                continue
+            elif op == OP_SR or op == OP_JK:
+                self._sequential(op, b, slot - b, push)
+                continue
+            elif op == OP_LUT:
+                self._table(c, b, push)
+                continue
+            else:
+                self._generic(c, b, slot - b, level, push)
+                continue
+
+            if pin_levels[out] == v:
+                continue
+            pin_levels[out] = v
+            n = pin_net[out]
+            if n >= 0:
+                push((((out + 1) << net_bits | n) << 3) | v)
+
+        self._write_back()
+
+    def _assert(self, out: int, v: int, push) -> None:
+        pin_levels = self.pin_levels
+        if pin_levels[out] == v:
+            return
+        pin_levels[out] = v
+        n = self.pin_net[out]
+        if n >= 0:
+            push((((out + 1) << self._net_bits | n) << 3) | v)
+
+    def _sequential(self, op: int, b: int, pin: int, push) -> None:
+        pin_levels = self.pin_levels
+
+        if op == OP_SR:
+            if pin_levels[b + pin] != _HI:
+                return
+            s = pin_levels[b]
+            r = pin_levels[b + 1]
+            q = b + 2
+        else:
+            if pin != 0 or pin_levels[b] != _HI:
+                return
+            s = pin_levels[b + 1]
+            r = pin_levels[b + 2]
+            q = b + 3
+
+        if s and r:
+            if op == OP_SR:
+                self._assert(q, _FLT, push)
+                self._assert(q + 1, _FLT, push)
+            else:
+                self._assert(q, 0 if pin_levels[q] else 1, push)
+                self._assert(q + 1, 0 if pin_levels[q + 1] else 1, push)
+        elif s:
+            self._assert(q, _HI, push)
+            self._assert(q + 1, _LO, push)
+        elif r:
+            self._assert(q, _LO, push)
+            self._assert(q + 1, _HI, push)
+
+    def _table(self, c: int, b: int, push) -> None:
+        lut = self.luts[self.comp_type[c]]
+        assert lut is not None
+        pin_levels = self.pin_levels
+        idx = 0
+        for p in lut.inputs:
+            idx = (idx << 2) | pin_levels[b + p]
+
+        outputs = lut.outputs
+        n = len(outputs)
+        for k, p in enumerate(outputs):
+            self._assert(b + p, lut.table[idx * n + k], push)
+
+    def _generic(self, c: int, b: int, pin: int, level: int, push) -> None:
+        comp = self.components[c]
+        pin_net = self.pin_net
+        net_bits = self._net_bits
+
+        comp._levels[pin] = level
+        for src, dst, lvl in comp._on_change(pin):
+            assert src is not None
+            out = b + src.pin
+            push((((out + 1) << net_bits | pin_net[out]) << 3) | lvl.value)
+        self.pin_levels[b:self.comp_base[c + 1]] = comp._levels
+
+    def _write_back(self) -> None:
+        if self._wires is None:
+            # Nothing to write back to, the arrays are all there is
+            for n in self._dirty_nets:
+                self._net_dirty[n] = 0
+            self._dirty_nets.clear()
+            for c in self._dirty_comps:
+                self._comp_dirty[c] = 0
+            self._dirty_comps.clear()
+            return
+
+        levels = self.levels
+        net_driver = self.net_driver
+        pin_local = self.pin_local
+        pin_levels = self.pin_levels
+        comp_base = self.comp_base
+
+        for n in self._dirty_nets:
+            w = self.wires[n]
+            w._level = _levels[levels[n]]
+            d = net_driver[n]
+            w._driver = pin_local[d - 1] if d else 0
+            self._net_dirty[n] = 0
+        self._dirty_nets.clear()
+
+        for c in self._dirty_comps:
+            b = comp_base[c]
+            self.components[c]._levels[:] = \
+                array('B', pin_levels[b:comp_base[c + 1]])
+            self._comp_dirty[c] = 0
+        self._dirty_comps.clear()
+
+
+def _zeros(typecode: str, n: int) -> array:
+    return array(typecode, bytes(n * array(typecode).itemsize))
+
+
+def type_luts(types: List[Type[Component]],
+              comp_type: Sequence[int],
+              comp_base: Sequence[int],
+              pin_dir: Sequence[int],
+              pin_levels: Sequence[int]) -> List[Optional[TruthTable]]:
+    """
+    Truth table used for each component class in a netlist
+
+    Tables are normally built when the first instance of a class is
+    constructed. If all of a class's instances were restored rather than
+    constructed, an unconnected copy of its first component is tabulated.
+    """
+
+    luts: List[Optional[TruthTable]] = []
+    for t, cls in enumerate(types):
+        if cls in _opcodes:
+            luts.append(None)
+            continue
+        if '_lut' not in cls.__dict__:
+            c = next(i for i, x in enumerate(comp_type) if x == t)
+            b, e = comp_base[c], comp_base[c + 1]
+            cls._lut = tabulate(cls._restore(array('B', pin_dir[b:e]),
+                                             array('B', pin_levels[b:e])))
+        luts.append(cls._lut)
+    return luts
+
+
+def type_opcodes(types: List[Type[Component]],
+                 luts: List[Optional[TruthTable]]) -> bytes:
+    """
+    Opcode of each component class, given their truth tables
+    """
+
+    return bytes(_opcodes.get(cls, OP_GENERIC if lut is None else OP_LUT)
+                 for cls, lut in zip(types, luts))
+
+
+def _walk(roots: Tuple[Union[Wire, Component], ...]) \
+        -> Tuple[List[Wire], List[Component]]:
+    wires: List[Wire] = []
+    components: List[Component] = []
+    seen = set()
+    stack: List[object] = list(roots)
+
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        if isinstance(obj, Wire):
+            wires.append(obj)
+            for local, cp in enumerate(obj._pins):
+                if local:
+                    stack.append(cp.component)
+        elif isinstance(obj, Component):
+            components.append(obj)
+            for conn in obj._conns:
+                if conn is not None:
+                    stack.append(conn.component)
+        else:
+            raise errors.PrimulaError(f'{obj} cannot be compiled')
+
+    return wires, components
+
+
+def compile(*roots: Union[Wire, Component]) -> Netlist:
+    """
+    Flatten every wire and component reachable from `roots` in to a Netlist.
+    Only wires and Components can be compiled, reaching anything else such
+    as a `Bus` raises PrimulaError.
+    """
+
+    return Netlist(*_walk(roots))
+
+
+__all__ = (
+    'Netlist',
+    'compile',
+)
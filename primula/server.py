@@ -0,0 +1,347 @@
+from typing import Dict, List, Sequence, Tuple, Union, Set
+import asyncio
+import os
+import struct
+from .base import Level
+from .wire import Wire
+from .netlist import Netlist, compile
+from . import errors
+
+
+# Every message, in both directions, is a frame of:
+#
+#   u8 opcode, u32 payload length, payload
+#
+# in network byte order. Nets are addressed by number, which LOOKUP gives
+# for names. The payloads are:
+#
+#   LOOKUP    request: names, each followed by a zero byte
+#             reply: i32 net number of each, -1 for no such net
+#   DRIVE     request: (u32 net, u8 level) for each net, LO or HI
+#             no reply
+#   READ      request: u32 net for each net
+#             reply: u8 level of each
+#   SUBSCRIBE request: u32 net for each net, no reply
+#             CHANGES is then sent after every settle which changes any
+#             of them, from this client or another
+#   UNSUBSCRIBE request: u32 net for each net, no reply
+#   CHANGES   (u32 net, u8 level) for each subscribed net which changed
+#   SYNC      request: empty
+#             reply: empty, once everything before it has been done
+#   ERROR     reply: u8 opcode of a bad request and a UTF-8 message, in
+#             place of its reply if it has one
+#
+# Requests are handled strictly in order and replies come back in the same
+# order, so a client can pipeline as many as it likes. Each DRIVE frame is
+# settled on its own, as one Netlist.apply, so the nets in one frame change
+# together and those in the next change after them.
+LOOKUP = 1
+DRIVE = 2
+READ = 3
+SUBSCRIBE = 4
+UNSUBSCRIBE = 5
+CHANGES = 6
+SYNC = 7
+ERROR = 0xff
+
+_FRAME = struct.Struct('!BI')
+_NET = struct.Struct('!I')
+_DRIVE = struct.Struct('!IB')
+
+_levels = tuple(Level)
+
+
+def frame(op: int, payload: bytes = b'') -> bytes:
+    return _FRAME.pack(op, len(payload)) + payload
+
+
+class _Connection:
+    __slots__ = (
+        'writer',
+        'subs',
+        'out',
+    )
+
+    writer: asyncio.StreamWriter
+    subs: Dict[int, int]
+    out: List[bytes]
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subs = {}
+        self.out = []
+
+
+class Server:
+    """
+    Serve a compiled circuit to clients on a Unix domain socket, see the
+    protocol above. Every client shares the one circuit.
+    """
+
+    __slots__ = (
+        'netlist',
+        '_conns',
+    )
+
+    netlist: Netlist
+    _conns: Set[_Connection]
+
+    def __init__(self, nl: Netlist):
+        self.netlist = nl
+        self._conns = set()
+
+    async def start(self, path: str) -> asyncio.AbstractServer:
+        return await asyncio.start_unix_server(self._serve, path)
+
+    async def serve_forever(self, path: str) -> None:
+        server = await self.start(path)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve(self,
+                     reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        conn = _Connection(writer)
+        self._conns.add(conn)
+        buf = bytearray()
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                buf += data
+                used = self._frames(conn, buf)
+                del buf[:used]
+                await self._send()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._conns.discard(conn)
+            writer.close()
+
+    def _frames(self, conn: _Connection, buf: bytearray) -> int:
+        """
+        Handle every complete frame in buf, returning the bytes used
+        """
+
+        pos = 0
+        end = len(buf)
+        mv = memoryview(buf)
+        while end - pos >= _FRAME.size:
+            op, size = _FRAME.unpack_from(buf, pos)
+            start = pos + _FRAME.size
+            if end - start < size:
+                break
+            pos = start + size
+            payload = mv[start:pos]
+            try:
+                self._request(conn, op, payload)
+            except (errors.PrimulaError, ValueError, struct.error) as e:
+                conn.out.append(frame(ERROR, bytes((op, )) +
+                                      str(e).encode()))
+        mv.release()
+        return pos
+
+    def _request(self, conn: _Connection, op: int, payload: memoryview):
+        nl = self.netlist
+        if op == DRIVE:
+            levels: Dict[Union[Wire, str, int], Level] = {}
+            for n, v in _DRIVE.iter_unpack(payload):
+                if v > 1:
+                    raise ValueError(f'can only drive LO or HI, not {v}')
+                levels[nl.net(n)] = _levels[v]
+            self._settle(levels)
+        elif op == READ:
+            nets = [nl.net(n) for n, in _NET.iter_unpack(payload)]
+            lv = nl.levels
+            conn.out.append(frame(READ, bytes(lv[n] for n in nets)))
+        elif op == LOOKUP:
+            out = bytearray()
+            for name in bytes(payload).split(b'\0')[:-1]:
+                try:
+                    n = nl.net(name.decode())
+                except errors.NetNotFoundError:
+                    n = -1
+                out += struct.pack('!i', n)
+            conn.out.append(frame(LOOKUP, bytes(out)))
+        elif op == SUBSCRIBE:
+            lv = nl.levels
+            for n, in _NET.iter_unpack(payload):
+                conn.subs[nl.net(n)] = lv[n]
+        elif op == UNSUBSCRIBE:
+            for n, in _NET.iter_unpack(payload):
+                conn.subs.pop(n, None)
+        elif op == SYNC:
+            conn.out.append(frame(SYNC))
+        else:
+            raise ValueError(f'unknown request {op}')
+
+    def _settle(self, levels: Dict[Union[Wire, str, int], Level]) -> None:
+        """
+        Settle the drives of one frame and queue up the changes for
+        subscribers
+        """
+
+        self.netlist.apply(levels)
+
+        lv = self.netlist.levels
+        for conn in self._conns:
+            subs = conn.subs
+            changed = [(n, lv[n]) for n, v in subs.items() if lv[n] != v]
+            if not changed:
+                continue
+            out = bytearray()
+            for n, v in changed:
+                subs[n] = v
+                out += _DRIVE.pack(n, v)
+            conn.out.append(frame(CHANGES, bytes(out)))
+
+    async def _send(self) -> None:
+        for conn in list(self._conns):
+            if not conn.out:
+                continue
+            conn.writer.write(b''.join(conn.out))
+            conn.out.clear()
+        for conn in list(self._conns):
+            try:
+                await conn.writer.drain()
+            except ConnectionError:
+                self._conns.discard(conn)
+
+
+class Client:
+    """
+    Client end of the protocol, mostly for testing. Requests which have a
+    reply wait for it, others are only buffered until the next one which
+    does, or `sync`.
+    """
+
+    __slots__ = (
+        '_reader',
+        '_writer',
+        'changes',
+    )
+
+    _reader: asyncio.StreamReader
+    _writer: asyncio.StreamWriter
+
+    # Every CHANGES notification received, in order
+    changes: List[List[Tuple[int, Level]]]
+
+    def __init__(self, reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self.changes = []
+
+    @classmethod
+    async def connect(cls, path: str) -> 'Client':
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def close(self) -> None:
+        self._writer.close()
+        await self._writer.wait_closed()
+
+    async def _reply(self, op: int) -> bytes:
+        """
+        Wait for the reply to a request. An error from an earlier request
+        without a reply is raised once the reply has come.
+        """
+
+        await self._writer.drain()
+        error = None
+        while True:
+            hdr = await self._reader.readexactly(_FRAME.size)
+            got, size = _FRAME.unpack(hdr)
+            payload = await self._reader.readexactly(size)
+            if got == CHANGES:
+                self.changes.append([(n, _levels[v]) for n, v
+                                     in _DRIVE.iter_unpack(payload)])
+            elif got == ERROR:
+                error = errors.PrimulaError(bytes(payload[1:]).decode())
+                if payload[0] == op:
+                    raise error
+            elif got == op:
+                if error is not None:
+                    raise error
+                return payload
+            else:
+                raise errors.PrimulaError(f'unexpected reply {got}')
+
+    async def lookup(self, *names: str) -> List[int]:
+        payload = b''.join(name.encode() + b'\0' for name in names)
+        self._writer.write(frame(LOOKUP, payload))
+        reply = await self._reply(LOOKUP)
+        return [n for n, in struct.iter_unpack('!i', reply)]
+
+    def drive(self, levels: Union[Dict[int, Level],
+                                  Sequence[Tuple[int, Level]]]) -> None:
+        items = levels.items() if isinstance(levels, dict) else levels
+        self._writer.write(frame(DRIVE, b''.join(_DRIVE.pack(n, v.value)
+                                                 for n, v in items)))
+
+    async def read(self, nets: Sequence[int]) -> List[Level]:
+        self._writer.write(frame(READ, b''.join(_NET.pack(n)
+                                                for n in nets)))
+        return [_levels[v] for v in await self._reply(READ)]
+
+    def subscribe(self, nets: Sequence[int]) -> None:
+        self._writer.write(frame(SUBSCRIBE, b''.join(_NET.pack(n)
+                                                     for n in nets)))
+
+    def unsubscribe(self, nets: Sequence[int]) -> None:
+        self._writer.write(frame(UNSUBSCRIBE, b''.join(_NET.pack(n)
+                                                       for n in nets)))
+
+    async def sync(self) -> None:
+        self._writer.write(frame(SYNC))
+        await self._reply(SYNC)
+
+
+def load(path: str) -> Netlist:
+    """
+    Compile a circuit from a netlist file, BLIF or structural Verilog,
+    going by the file extension
+    """
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.blif':
+        from .importer import read_blif
+        design = read_blif(path)
+    elif ext == '.v':
+        from .importer import read_verilog
+        design = read_verilog(path)
+    else:
+        from .netfile import load as load_netfile
+        return load_netfile(path)
+    return compile(*design.nets.values())
+
+
+def serve(nl: Netlist, path: str) -> None:
+    """
+    Serve a circuit on a socket until interrupted
+    """
+
+    try:
+        asyncio.run(Server(nl).serve_forever(path))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+__all__ = (
+    'LOOKUP',
+    'DRIVE',
+    'READ',
+    'SUBSCRIBE',
+    'UNSUBSCRIBE',
+    'CHANGES',
+    'SYNC',
+    'ERROR',
+    'frame',
+    'Server',
+    'Client',
+    'load',
+    'serve',
+)
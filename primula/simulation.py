@@ -1,27 +1,159 @@
-from typing import Deque
+from typing import Deque, Iterable, Mapping, Tuple, ClassVar, Optional, \
+                   Dict, List, TYPE_CHECKING
 from collections import deque
-import logging
 from .base import Level, \
                   Event, \
                   ComponentPin, \
-                  SimStep
+                  SimStep, \
+                  MergeStep
+from .timing import Timeline, nets_of
+from . import errors
+from . import trace
+from . import activity
+from .trace import Kind, Record
 
-
-sim = logging.getLogger('sim')
+if TYPE_CHECKING:
+    from .wire import Wire
 
 
 class Simulation:
     __slots__ = ()
 
+    # Events scheduled at absolute times by Wire.drive/Wire.pulse go here
+    timeline: ClassVar[Timeline] = Timeline()
+
+    # Upper bound on the number of events in one settle, None for no limit
+    max_events: ClassVar[Optional[int]] = 10_000_000
+
+    # Pins connected inside primula.building(), by wire, waiting for the
+    # initial settle. None when connections are simulated straight away.
+    deferred: ClassVar[Optional[Dict['Wire', List[ComponentPin]]]] = None
+
+    # Running total of events processed by run_all, for benchmarking
+    events: ClassVar[int] = 0
+
     @staticmethod
     def run(seed: ComponentPin, level: Level) -> None:
-        epoch = SimStep()
+        Simulation.run_all(((seed, level),))
+
+    @staticmethod
+    def run_all(seeds: Iterable[Tuple[ComponentPin, Level]],
+                merge: bool = False) -> None:
+        """
+        Propagate several seeds through the circuit in a single step.
+
+        All of the seed events are queued before any of them are processed,
+        so they are treated as simultaneous: a wire which ends up being driven
+        to different levels by two of them goes in to the error state. With
+        merge the step is a `MergeStep` instead, where it takes the last of
+        them.
+        """
+
+        epoch = MergeStep() if merge else SimStep()
         q: Deque[Event] = deque()
-        sim.debug(f'Simulation seed is {seed}')
-        q.extend(seed.propagate(level, epoch))
+        sink = trace.sink
+
+        for seed, level in seeds:
+            if sink is not None:
+                sink.record(Record(Kind.SEED, None, seed, level, epoch))
+            q.extend(seed.propagate(level, epoch))
+
+        popleft = q.popleft
+        extend = q.extend
+        budget = Simulation.max_events
+        if budget is None:
+            budget = -1
+        start = budget
+
+        prof = activity.profiler
+        if sink is None and prof is None:
+            while q:
+                if not budget:
+                    Simulation._overrun(q)
+                budget -= 1
+                src, dst, level = popleft()
+                extend(dst.component.propagate(dst.pin, level, epoch))
+            Simulation.events += start - budget
+            return
+
+        budget = Simulation._instrumented(q, epoch, budget, sink, prof)
+        Simulation.events += start - budget
+        if sink is not None:
+            sink.record(Record(Kind.SETTLED, None, None, None, epoch))
+
+    @staticmethod
+    def _instrumented(q: Deque[Event],
+                      epoch: SimStep,
+                      budget: int,
+                      sink: Optional[trace.Sink],
+                      prof: Optional['activity.Profiler']) -> int:
+        """
+        The run_all loop, recording events to the trace sink and counting
+        them in to the profiler, either of which may be None. Returns what
+        is left of the budget.
+        """
+
+        popleft = q.popleft
+        extend = q.extend
+        total = len(q)
+        wave = total
+        depth = 1 if q else 0
+        if prof is not None:
+            received = prof.received
+            emitted = prof.emitted
+
         while q:
-            evt = q.popleft()
-            sim.debug(f'pop {evt}')
-            sim.debug(f'driving {evt.dst} to {evt.level}')
-            q.extend(evt.dst.propagate(evt.level, epoch=epoch))
-        sim.debug('---')
+            if not budget:
+                Simulation._overrun(q)
+            budget -= 1
+
+            src, dst, level = popleft()
+            if sink is not None:
+                sink.record(Record(Kind.EVENT, src, dst, level, epoch))
+            comp = dst.component
+            if prof is None:
+                extend(comp.propagate(dst.pin, level, epoch))
+                continue
+
+            # Everything queued by the previous wave is the next wave
+            if not wave:
+                depth += 1
+                wave = len(q) + 1
+            wave -= 1
+
+            try:
+                i = comp._activity
+            except AttributeError:
+                i = prof._add(comp)
+            n = len(q)
+            extend(comp.propagate(dst.pin, level, epoch))
+            n = len(q) - n
+            received[i] += 1
+            emitted[i] += n
+            total += n
+
+        if prof is not None:
+            prof.depths.append(depth)
+            prof.sizes.append(total)
+        return budget
+
+    @staticmethod
+    def _overrun(q: Deque[Event]) -> None:
+        nets = nets_of(dst for src, dst, level in q)
+        raise errors.OscillationError(f'no fix-point after '
+                                      f'{Simulation.max_events} events',
+                                      nets)
+
+    @staticmethod
+    def apply(levels: Mapping['Wire', Level]) -> None:
+        """
+        Drive several wires at once and settle the circuit only once.
+
+        The changes are simultaneous, so logic which sees more than one of
+        them may change its output more than once on the way to the
+        fix-point. The step is a `MergeStep`, in which that takes the last
+        level rather than going in to error.
+        """
+
+        seeds = [(wire._release(), level) for wire, level in levels.items()]
+        Simulation.run_all(seeds, merge=True)
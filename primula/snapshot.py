@@ -0,0 +1,117 @@
+from typing import List, Union
+from array import array
+from .base import Level
+from .wire import Wire
+from .component import Component
+from .netlist import _walk
+
+
+_levels = tuple(Level)
+
+# Layout of the buffer, for n wires and p component pins in total:
+#
+#   [0, 4n): driving pin number of each wire, as native uint32
+#   [4n, 5n): level of each wire
+#   [5n, 6n): level of each wire's line driver
+#   [6n, 6n + p): levels of every component pin, component by component
+#   [6n + p, 6n + 2p): directions of the same pins
+#
+# The driver numbers go first so that they are aligned for the cast.
+_DRIVER = array('I').itemsize
+
+
+class Snapshot:
+    """
+    The state of a circuit, captured in to one buffer so that it can be put
+    back later, eg. to start each test from the reset state, to try several
+    things from a shared prefix or to checkpoint a long run.
+
+    That is the level and driver of every wire and the pin levels and
+    directions of every component, which is where the built-in components
+    keep all of their sequential state. Components which keep state
+    anywhere else aren't fully restored. Neither are events scheduled on
+    `Simulation.timeline`.
+    """
+
+    __slots__ = (
+        'wires',
+        'components',
+        'buffer',
+        '_base',
+    )
+
+    wires: List[Wire]
+    components: List[Component]
+    buffer: bytearray
+    _base: array
+
+    def __init__(self, wires: List[Wire], components: List[Component]):
+        self.wires = wires
+        self.components = components
+        n = len(wires)
+        self._base = array('L', (6 * n, ))
+        for c in components:
+            self._base.append(self._base[-1] + len(c._levels))
+        self.buffer = bytearray(2 * self._base[-1] - 6 * n)
+        self.take()
+
+    def take(self) -> None:
+        """
+        Capture the current state, replacing whatever was captured before
+        """
+
+        n = len(self.wires)
+        mv = memoryview(self.buffer)
+        drivers = mv[:_DRIVER * n].cast('I')
+        levels = mv[_DRIVER * n:]
+        for i, w in enumerate(self.wires):
+            drivers[i] = w._driver
+            levels[i] = w._level.value
+            levels[n + i] = w._line._level.value
+
+        base = self._base
+        dirs = mv[base[-1] - 6 * n:]
+        for i, c in enumerate(self.components):
+            mv[base[i]:base[i + 1]] = c._levels
+            dirs[base[i]:base[i + 1]] = c._directions
+
+    def restore(self) -> None:
+        """
+        Put the circuit back in to the captured state. The snapshot can be
+        restored any number of times.
+        """
+
+        n = len(self.wires)
+        mv = memoryview(self.buffer)
+        drivers = mv[:_DRIVER * n].cast('I')
+        levels = mv[_DRIVER * n:]
+        for i, w in enumerate(self.wires):
+            w._driver = drivers[i]
+            w._level = _levels[levels[i]]
+            w._epoch = None
+            w._line._level = _levels[levels[n + i]]
+
+        base = self._base
+        dirs = mv[base[-1] - 6 * n:]
+        for i, c in enumerate(self.components):
+            memoryview(c._levels)[:] = mv[base[i]:base[i + 1]]
+            memoryview(c._directions)[:] = dirs[base[i]:base[i + 1]]
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+
+def snapshot(*roots: Union[Wire, Component]) -> Snapshot:
+    """
+    Capture the state of every wire and component connected to roots. Like
+    `netlist.compile` it raises PrimulaError on reaching a `Bus`.
+    """
+
+    wires, comps = _walk(roots)
+    return Snapshot(wires, comps)
+
+
+__all__ = (
+    'Snapshot',
+    'snapshot',
+)
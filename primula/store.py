@@ -0,0 +1,240 @@
+from typing import Dict, List, Optional, Tuple, Type, Iterator
+from array import array
+from collections import deque
+from .base import Level, Pin, Pull
+from .component import Component
+from .wire import Wire
+from .netlist import Netlist, type_luts, type_opcodes, _zeros
+from .netfile import materialize
+from . import errors
+
+
+_FLT = Level.FLT.value
+_IN = Pin.IN.value
+
+# Pin directions and levels of a new instance of each class, by class
+_templates: Dict[Type[Component], Tuple[bytes, bytes]] = {}
+
+
+def _template(cls: Type[Component]) -> Tuple[bytes, bytes]:
+    t = _templates.get(cls)
+    if t is None:
+        if not (isinstance(cls, type) and issubclass(cls, Component)):
+            raise TypeError(f'{cls} is not a component class')
+        obj = cls()
+        t = _templates[cls] = (bytes(obj._directions), bytes(obj._levels))
+    return t
+
+
+class Store:
+    """
+    Column store for building large circuits without any objects.
+
+    A circuit is held as the typed arrays of a `Netlist`, which grow as nets
+    and components are added. A net or a component is just its index in
+    to them, so a three pin gate costs around 60 bytes rather than the
+    several hundred that the objects take. Pin directions and starting
+    levels of each class come from one instance made the first time the
+    class is added, so only classes which can be constructed without
+    arguments can be stored.
+
+    `netlist()` then gives the compiled circuit, using the same arrays.
+    The `Wire` and `Component` objects are only created, all at once, if
+    the netlist's `wires` or `components` are used, as for a netlist loaded
+    from a file. The arrays are flat so whole-circuit operations, such as
+    counting the nets in error, are single calls on them.
+    """
+
+    __slots__ = (
+        'types',
+        'comp_type',
+        'comp_base',
+        'pin_levels',
+        'pin_dir',
+        'pin_comp',
+        'pin_net',
+        'pin_local',
+        'net_next_id',
+        'net_line',
+        '_names',
+        '_type_index',
+        '_netlist',
+    )
+
+    types: List[Type[Component]]
+    comp_type: array
+    comp_base: array
+    pin_levels: bytearray
+    pin_dir: bytearray
+    pin_comp: array
+    pin_net: array
+    pin_local: array
+
+    # Number of the next pin to be connected to each net, and the level of
+    # its line driver
+    net_next_id: array
+    net_line: bytearray
+
+    _names: List[Optional[str]]
+    _type_index: Dict[Type[Component], int]
+    _netlist: Optional[Netlist]
+
+    def __init__(self):
+        self.types = []
+        self.comp_type = array('H')
+        self.comp_base = array('I', [0])
+        self.pin_levels = bytearray()
+        self.pin_dir = bytearray()
+        self.pin_comp = array('I')
+        self.pin_net = array('i')
+        self.pin_local = array('I')
+        self.net_next_id = array('I')
+        self.net_line = bytearray()
+        self._names = []
+        self._type_index = {}
+        self._netlist = None
+
+    @property
+    def nr_nets(self) -> int:
+        return len(self.net_line)
+
+    @property
+    def nr_components(self) -> int:
+        return len(self.comp_type)
+
+    def _check(self) -> None:
+        if self._netlist is not None:
+            raise errors.PrimulaError('store has already been compiled')
+
+    def wire(self,
+             name: Optional[str] = None,
+             pull: Optional[Pull] = None) -> int:
+        """
+        Add a net, the equivalent of a new `Wire`, returning its number
+        """
+
+        self._check()
+        self._names.append(name)
+        self.net_next_id.append(1)
+        self.net_line.append(_FLT if pull is None else pull.value)
+        return len(self.net_line) - 1
+
+    def add(self,
+            cls: Type[Component],
+            *nets: Optional[int],
+            **named: Optional[int]) -> int:
+        """
+        Add a component of class `cls`, returning its number. Its pins are
+        connected to the nets given in the order of its pin names, or by
+        name, with None leaving a pin unconnected.
+        """
+
+        self._check()
+        dirs, levels = _template(cls)
+        names = list(cls._pin_names)
+        if len(nets) > len(names):
+            raise errors.PinNotFoundError(f'{cls.__name__} only has '
+                                          f'{len(names)} pins')
+        pins: List[Optional[int]] = list(nets)
+        pins += [None] * (len(names) - len(pins))
+        for name, n in named.items():
+            try:
+                pins[names.index(name)] = n
+            except ValueError:
+                raise errors.PinNotFoundError(f'{cls.__name__} has no pin '
+                                              f'{name}')
+
+        t = self._type_index.get(cls)
+        if t is None:
+            t = self._type_index[cls] = len(self.types)
+            self.types.append(cls)
+
+        c = len(self.comp_type)
+        nr_nets = len(self.net_line)
+        next_id = self.net_next_id
+        self.comp_type.append(t)
+        self.pin_levels += levels
+        self.pin_dir += dirs
+        for n in pins:
+            if n is None:
+                self.pin_net.append(-1)
+                self.pin_local.append(0)
+            elif 0 <= n < nr_nets:
+                self.pin_net.append(n)
+                self.pin_local.append(next_id[n])
+                next_id[n] += 1
+            else:
+                raise errors.NetNotFoundError(f'no net number {n}')
+        self.pin_comp.extend([c] * len(pins))
+        self.comp_base.append(len(self.pin_levels))
+        return c
+
+    def netlist(self) -> Netlist:
+        """
+        Compile the circuit, after which nothing more can be added. Every
+        pulled net is driven to its level first, all together, and the
+        circuit settled with the glitches on the way merged, as for
+        `building()`. A loop which never settles, such as an SR latch with
+        neither input set, is left in ERR.
+        """
+
+        if self._netlist is not None:
+            return self._netlist
+
+        nr_nets = len(self.net_line)
+        fan: List[List[int]] = [[] for n in range(nr_nets)]
+        pin_dir = self.pin_dir
+        for slot, n in enumerate(self.pin_net):
+            if n >= 0 and pin_dir[slot] == _IN:
+                fan[n].append(slot)
+        fan_start = array('I', [0])
+        fan_pins = array('I')
+        for slots in fan:
+            fan_pins.extend(slots)
+            fan_start.append(len(fan_pins))
+
+        luts = type_luts(self.types, self.comp_type, self.comp_base,
+                         self.pin_dir, self.pin_levels)
+        ops = type_opcodes(self.types, luts)
+
+        nl = Netlist.__new__(Netlist)
+        nl._wires = None
+        nl._components = None
+        nl._source = self
+        nl._net_index = {}
+        nl._name_index = None
+        nl.types = self.types
+        nl.luts = luts
+        nl.comp_type = self.comp_type
+        nl.opcodes = bytearray(ops[t] for t in self.comp_type)
+        nl.comp_base = self.comp_base
+        nl.pin_levels = self.pin_levels
+        nl.pin_dir = self.pin_dir
+        nl.pin_comp = self.pin_comp
+        nl.pin_net = self.pin_net
+        nl.pin_local = self.pin_local
+        nl.levels = bytearray([_FLT]) * nr_nets
+        nl.net_driver = _zeros('I', nr_nets)
+        nl.fan_start = fan_start
+        nl.fan_pins = fan_pins
+        nl._setup()
+        self._netlist = nl
+
+        # Everything changes at once, so glitches on the way to the
+        # fix-point are merged rather than going to ERR
+        nl._settle(deque((n << 3) | v for n, v in enumerate(self.net_line)
+                         if v != _FLT), True)
+        return nl
+
+    # The rest is what a Netlist needs of its source, as for a file
+
+    def names(self) -> Iterator[Optional[str]]:
+        return iter(self._names)
+
+    def objects(self, nl: Netlist) -> Tuple[List[Wire], List[Component]]:
+        return materialize(nl, self.net_line, self._names)
+
+
+__all__ = (
+    'Store',
+)
@@ -0,0 +1,199 @@
+from typing import Dict, List, Tuple, Type, Optional, NamedTuple, Any
+from array import array
+from abc import ABC, abstractmethod
+from .base import Level, Pin, ComponentPin
+from .component import Component
+from .wire import Wire
+from .netlist import _walk
+from . import errors
+
+
+class _Net(NamedTuple):
+    """
+    A settled wire in a template. `pins` are the wire's own pin numbers with
+    the index of the component and the pin on it that each one goes to.
+    """
+
+    name: Optional[str]
+    level: Level
+    line: Level
+    driver: int
+    pins: Tuple[Tuple[int, int, int], ...]
+    driven: bool
+
+
+class _Template:
+    """
+    Flattened copy of a subcircuit: the class, pin directions and pin levels
+    of every component and the state and connections of every wire.
+    """
+
+    __slots__ = (
+        'components',
+        'nets',
+        'ports',
+    )
+
+    components: List[Tuple[Type[Component], array, array]]
+    nets: List[_Net]
+    ports: Dict[str, int]
+
+    def __init__(self, ports: Dict[str, Wire]):
+        wires, comps = _walk(tuple(ports.values()))
+        comp_index = {id(c): i for i, c in enumerate(comps)}
+        net_index = {id(w): i for i, w in enumerate(wires)}
+        out = Pin.OUT.value
+        flt = Level.FLT.value
+
+        self.components = [(type(c), c._directions[:], c._levels[:])
+                           for c in comps]
+
+        self.nets = []
+        for w in wires:
+            pins = []
+            driven = False
+            for local, cp in enumerate(w._pins):
+                if not local:
+                    continue
+                c = cp.component
+                assert isinstance(c, Component)
+                pins.append((local, comp_index[id(c)], cp.pin))
+                if c._directions[cp.pin] == out and \
+                        c._levels[cp.pin] != flt:
+                    driven = True
+            self.nets.append(_Net(w._name,
+                                  w._level,
+                                  w._line._level,
+                                  w._driver,
+                                  tuple(pins),
+                                  driven))
+
+        self.ports = {name: net_index[id(w)] for name, w in ports.items()}
+
+
+class Subcircuit(ABC):
+    """
+    Base class for reusable blocks built out of components and wires.
+
+    Subclasses list the names of their exported nets in `_port_names` and
+    provide a `_build` static method which constructs the circuit with the
+    normal Wire/Component API and returns the port wires by name. That is
+    only ever run once per class: the settled result is flattened in to a
+    template and each instance is stamped out of it by copying directions,
+    levels and connections, without any simulation.
+
+    Keyword arguments bind ports to wires of an enclosing circuit, in which
+    case the template's pins on that net are connected to the given wire
+    instead of a copy of the internal one. That only runs a simulation if the
+    port is driven from inside or the outer wire is at a different level to
+    the template. Either way `ports.NAME` is the wire of a port.
+
+    Components are copied by pin directions and levels alone, so they must
+    keep all of their state in those as the built-in ones do.
+    """
+
+    __slots__ = (
+        'ports',
+        'components',
+        'wires',
+    )
+
+    ports: Any
+    components: List[Component]
+    wires: List[Wire]
+
+    # class variables
+    _port_names: Tuple[str, ...]
+    _ports: type
+    _template: Optional[_Template] = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._template = None
+        names = cls.__dict__.get('_port_names')
+        if names is not None:
+            cls._ports = type(f'{cls.__name__}Ports',
+                              (),
+                              {'__slots__': tuple(names), })
+
+    @staticmethod
+    @abstractmethod
+    def _build() -> Dict[str, Wire]:
+        pass
+
+    @classmethod
+    def template(cls) -> _Template:
+        """
+        Return the flattened template, building it on first use
+        """
+
+        tpl = cls._template
+        if tpl is None:
+            ports = cls._build()
+            if set(ports) != set(cls._port_names):
+                raise errors.PrimulaError(f'{cls.__name__}._build returned '
+                                          f'ports {sorted(ports)}')
+            tpl = _Template(ports)
+            cls._template = tpl
+        return tpl
+
+    def __init__(self, **bindings: Wire):
+        tpl = self.template()
+        for name in bindings:
+            if name not in tpl.ports:
+                raise errors.PinNotFoundError(f'{type(self).__name__} has '
+                                              f'no port {name}')
+        bound = {tpl.ports[name]: w for name, w in bindings.items()}
+
+        comps = []
+        for cls, dirs, levels in tpl.components:
+            comps.append(cls._restore(dirs[:], levels[:]))
+
+        wires = []
+        for i, net in enumerate(tpl.nets):
+            outer = bound.get(i)
+            if outer is not None:
+                wires.append(outer)
+                continue
+
+            w = Wire(net.name)
+            w._level = net.level
+            w._driver = net.driver
+            pins = w._pins
+            handles = w._handles
+            w._line._level = net.line
+            for local, ci, p in net.pins:
+                c = comps[ci]
+                me = ComponentPin(w, local)
+                pins.append(c._handles[p])
+                handles.append(me)
+                c._conns[p] = me
+            wires.append(w)
+
+        for i, outer in bound.items():
+            net = tpl.nets[i]
+            cps = [comps[ci]._handles[p] for local, ci, p in net.pins]
+            if net.driven or outer._level is not net.level:
+                outer.connect(*cps)
+            else:
+                for cp in cps:
+                    outer._attach(cp)
+
+        ports = self._ports()
+        for name, i in tpl.ports.items():
+            setattr(ports, name, wires[i])
+
+        self.ports = ports
+        self.components = comps
+        self.wires = wires
+
+    def __str__(self):
+        return type(self).__name__
+
+    def __repr__(self):
+        return type(self).__name__
+
+
+__all__ = (
+    'Subcircuit',
+)
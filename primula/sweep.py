@@ -0,0 +1,189 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, \
+                   Optional, Sequence, Tuple, Union
+from array import array
+from itertools import islice
+import multiprocessing
+from .base import Level
+from .wire import Wire
+from .subcircuit import Subcircuit
+from .netlist import Netlist, compile, OP_GENERIC
+
+
+# A step drives some nets, by name, to a level. True/False and 1/0 are
+# accepted for HI/LO. A stimulus is a sequence of steps, applied in order to
+# the circuit in its initial state.
+Step = Mapping[str, Union[Level, int, bool]]
+Stimulus = Sequence[Step]
+
+_levels = tuple(Level)
+
+
+def _ports(obj: Any) -> Dict[str, Wire]:
+    """
+    Named wires of whatever a circuit factory returned
+    """
+
+    if isinstance(obj, Subcircuit):
+        return {name: getattr(obj.ports, name) for name in obj._port_names}
+    nets = getattr(obj, 'nets', None)
+    if isinstance(nets, dict):
+        return nets
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    raise TypeError(f'circuit factory returned {type(obj).__name__}, '
+                    'expected a mapping of names to wires')
+
+
+class _Runner:
+    """
+    One copy of the circuit, compiled, which can be put back in to its
+    initial state between stimuli
+    """
+
+    __slots__ = (
+        'netlist',
+        'nets',
+        'observe',
+        '_levels',
+        '_pin_levels',
+        '_net_driver',
+        '_generic',
+    )
+
+    netlist: Netlist
+    nets: Dict[str, int]
+    observe: List[int]
+
+    def __init__(self, factory: Callable[[], Any],
+                 observe: Optional[Sequence[str]]):
+        ports = _ports(factory())
+        wires = list(ports.values())
+        nl = compile(*wires)
+        self.netlist = nl
+        self.nets = {name: nl.net(w) for name, w in ports.items()}
+        names = list(ports) if observe is None else observe
+        self.observe = [self.net(name) for name in names]
+
+        self._levels = bytes(nl.levels)
+        self._pin_levels = bytes(nl.pin_levels)
+        self._net_driver = memoryview(nl.net_driver).tobytes()
+        self._generic = [c for c, op in enumerate(nl.opcodes)
+                         if op == OP_GENERIC]
+
+    def net(self, name: str) -> int:
+        n = self.nets.get(name)
+        if n is None:
+            n = self.nets[name] = self.netlist.net(name)
+        return n
+
+    def reset(self) -> None:
+        nl = self.netlist
+        nl.levels[:] = self._levels
+        nl.pin_levels[:] = self._pin_levels
+        memoryview(nl.net_driver).cast('B')[:] = self._net_driver
+        for c in self._generic:
+            b = nl.comp_base[c]
+            e = nl.comp_base[c + 1]
+            nl.components[c]._levels[:] = array('B', nl.pin_levels[b:e])
+
+    def run(self, stimulus: Stimulus) -> List[bytes]:
+        self.reset()
+        nl = self.netlist
+        levels = nl.levels
+        observe = self.observe
+        out = []
+        for step in stimulus:
+            nl.apply({self.net(name): _level(v)
+                      for name, v in step.items()})
+            out.append(bytes(levels[n] for n in observe))
+        return out
+
+
+def _level(v: Union[Level, int, bool]) -> Level:
+    if isinstance(v, Level):
+        return v
+    return Level.HI if v else Level.LO
+
+
+# The circuit of a worker process, built once by _init
+_runner: Optional[_Runner] = None
+
+
+def _init(factory: Callable[[], Any],
+          observe: Optional[Sequence[str]]) -> None:
+    global _runner
+    _runner = _Runner(factory, observe)
+
+
+def _run_chunk(chunk: List[Stimulus]) -> List[List[bytes]]:
+    assert _runner is not None
+    return [_runner.run(stim) for stim in chunk]
+
+
+def _chunks(stimuli: Iterable[Stimulus], size: int) \
+        -> Iterator[List[Stimulus]]:
+    it = iter(stimuli)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def sweep(circuit_factory: Callable[[], Any],
+          stimuli: Iterable[Stimulus],
+          workers: Optional[int] = None,
+          observe: Optional[Sequence[str]] = None,
+          chunk: int = 64) -> List[List[Tuple[Level, ...]]]:
+    """
+    Run independent stimuli on copies of a circuit in a pool of processes.
+
+    `circuit_factory` builds the circuit and returns its nets by name: a
+    mapping of names to wires, a Subcircuit or an imported design. It is
+    called once in each worker, which then compiles the circuit and runs
+    every stimulus it is given from the circuit's initial state. With
+    anything other than the fork start method the factory must be
+    picklable, ie. a module level function.
+
+    Stimuli are sent to the workers `chunk` at a time and the results come
+    back a chunk at a time too, so that passing them between processes is
+    cheap next to simulating them. The result has, for each stimulus in
+    order, the levels of the `observe` nets (by default, those returned by
+    the factory) after each of its steps.
+
+    `workers` defaults to the number of CPUs. With one worker everything runs
+    in this process.
+    """
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError('need at least one worker')
+    if chunk < 1:
+        raise ValueError('chunk size must be at least one')
+
+    if workers == 1:
+        runner = _Runner(circuit_factory, observe)
+        raw: Iterable[List[List[bytes]]] = \
+            ([runner.run(stim) for stim in c]
+             for c in _chunks(stimuli, chunk))
+        return _decode(raw)
+
+    with multiprocessing.Pool(workers,
+                              _init,
+                              (circuit_factory, observe)) as pool:
+        return _decode(pool.imap(_run_chunk, _chunks(stimuli, chunk)))
+
+
+def _decode(chunks: Iterable[List[List[bytes]]]) \
+        -> List[List[Tuple[Level, ...]]]:
+    levels = _levels
+    return [[tuple(levels[v] for v in step) for step in result]
+            for c in chunks for result in c]
+
+
+__all__ = (
+    'Step',
+    'Stimulus',
+    'sweep',
+)
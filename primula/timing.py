@@ -0,0 +1,306 @@
+from typing import List, Tuple, Optional, Deque, Any, Dict, Iterable, \
+                   TYPE_CHECKING
+from collections import deque
+from heapq import heappush, heappop
+from .base import Level, \
+                  ComponentPin, \
+                  SimStep, \
+                  Event
+from . import errors
+from . import trace
+from .trace import Kind, Record
+
+if TYPE_CHECKING:
+    from .wire import Wire
+
+
+class TimingWheel:
+    """
+    Calendar queue of items keyed by absolute integer time.
+
+    Items less than `size` ticks in the future go straight in to a bucket,
+    further out ones wait in an overflow heap until the wheel comes round to
+    them. Scheduling and popping are O(1) amortised as long as most delays are
+    shorter than the wheel.
+    """
+
+    __slots__ = (
+        '_buckets',
+        '_mask',
+        '_time',
+        '_count',
+        '_overflow',
+        '_seq',
+    )
+
+    _buckets: List[List[Any]]
+    _overflow: List[Tuple[int, int, Any]]
+
+    def __init__(self, size: int = 256, time: int = 0):
+        if size < 1 or size & (size - 1):
+            raise ValueError('wheel size must be a power of two')
+        self._buckets = [[] for x in range(size)]
+        self._mask = size - 1
+        self._time = time
+        self._count = 0
+        self._overflow = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return self._count + len(self._overflow)
+
+    @property
+    def time(self) -> int:
+        return self._time
+
+    def push(self, at: int, item: Any) -> None:
+        if at < self._time:
+            raise ValueError(f'time {at} is in the past, now is {self._time}')
+        if at - self._time <= self._mask:
+            self._buckets[at & self._mask].append(item)
+            self._count += 1
+        else:
+            # The sequence number keeps items in FIFO order within a tick
+            heappush(self._overflow, (at, self._seq, item))
+            self._seq += 1
+
+    def next_time(self) -> Optional[int]:
+        """
+        Return the earliest scheduled tick, or None if nothing is scheduled
+        """
+
+        if not self._count:
+            if not self._overflow:
+                return None
+            # Nothing in the wheel, so the overflow is next
+            return self._overflow[0][0]
+
+        # Everything in the overflow is beyond the last bucket, so the first
+        # non-empty bucket is always the earliest
+        buckets = self._buckets
+        mask = self._mask
+        t = self._time
+        while not buckets[t & mask]:
+            t += 1
+        return t
+
+    def pop(self) -> Tuple[int, List[Any]]:
+        """
+        Remove and return everything due at the earliest scheduled tick
+        """
+
+        t = self.next_time()
+        if t is None:
+            raise IndexError('pop from an empty wheel')
+        self._time = t
+        self._refill()
+        i = t & self._mask
+        items = self._buckets[i]
+        self._buckets[i] = []
+        self._count -= len(items)
+        return t, items
+
+    def advance(self, time: int) -> None:
+        """
+        Move the current time forwards to a tick with nothing due before it
+        """
+
+        t = self.next_time()
+        if t is not None and t < time:
+            raise ValueError(f'events pending at {t}')
+        self._time = max(self._time, time)
+        self._refill()
+
+    def signature(self) -> Tuple[Tuple[int, int, Any], ...]:
+        """
+        Everything pending as (ticks from now, sequence, item) so that two
+        schedules which only differ by a shift in time compare equal
+        """
+
+        now = self._time
+        mask = self._mask
+        sig = []
+        if self._count:
+            for dt in range(mask + 1):
+                for i, item in enumerate(self._buckets[(now + dt) & mask]):
+                    sig.append((dt, i, item))
+        for at, seq, item in sorted(self._overflow):
+            sig.append((at - now, 0, item))
+        return tuple(sig)
+
+    def _refill(self) -> None:
+        horizon = self._time + self._mask
+        overflow = self._overflow
+        while overflow and overflow[0][0] <= horizon:
+            at, seq, item = heappop(overflow)
+            self._buckets[at & self._mask].append(item)
+            self._count += 1
+
+
+def nets_of(pins: Iterable[ComponentPin]) -> List['Wire']:
+    """
+    Wires which the given pins belong to, or are connected to
+    """
+
+    from .wire import Wire
+
+    nets: Dict[Wire, None] = {}
+    for cp in pins:
+        c = cp.component
+        if not isinstance(c, Wire):
+            conns = getattr(c, '_conns', None)
+            if conns is None or conns[cp.pin] is None:
+                continue
+            c = conns[cp.pin].component
+        nets[c] = None
+    return list(nets)
+
+
+# Events in to a run after which it starts looking for repeating states.
+# Until then, checking costs more than it's likely to find.
+_WATCH_AFTER = 10_000
+
+
+class _Watch:
+    """
+    Cycle detector for a timeline which is taking too long to settle.
+
+    At the end of each tick the levels of every wire changed since watching
+    started (the active region) plus everything still scheduled, relative to
+    the current tick, make up the state. If a state repeats then the circuit
+    is oscillating.
+    """
+
+    __slots__ = (
+        'changed',
+        'seen',
+    )
+
+    changed: Dict['Wire', int]
+    seen: Dict[Tuple[Any, ...], int]
+
+    def __init__(self):
+        self.changed = {}
+        self.seen = {}
+
+    def touch(self, pin: ComponentPin, now: int) -> None:
+        for w in nets_of((pin,)):
+            self.changed[w] = now
+
+    def check(self, now: int, wheel: TimingWheel) -> None:
+        pending = tuple((dt, i, id(dst), level)
+                        for dt, i, (src, dst, level) in wheel.signature())
+        state = (tuple(w._level for w in self.changed), pending)
+        prev = self.seen.setdefault(state, now)
+        if prev == now:
+            return
+
+        period = now - prev
+        nets = [w for w, t in self.changed.items() if t > now - period]
+        raise errors.OscillationError(f'oscillating with period {period} '
+                                      f'at tick {now}', nets, period)
+
+
+class Timeline:
+    """
+    Time-ordered simulation with per-component propagation delays.
+
+    Components declare their delay in ticks with a `_delay` class variable
+    next to `_pin_names`. Output changes of a component with a non-zero delay
+    reach the wire that many ticks later, everything else (wires and
+    zero-delay components) settles within the current tick. Each tick is its
+    own SimStep, so a wire driven to two levels within one tick still goes in
+    to the error state but one which changes on successive ticks does not.
+
+    The immediate-mode Simulation.run ignores delays altogether.
+
+    A run is limited to `max_events` events. After `_WATCH_AFTER` of them,
+    or half the budget if that is less, the timeline starts looking for
+    repeating states. So a free-running oscillator is reported within a few
+    of its periods of that, with the nets that make it up, and
+    OscillationError is raised either way if the budget runs out.
+    """
+
+    __slots__ = (
+        '_wheel',
+        'max_events',
+    )
+
+    _wheel: TimingWheel
+    max_events: int
+
+    def __init__(self, size: int = 256, max_events: int = 10_000_000):
+        self._wheel = TimingWheel(size)
+        self.max_events = max_events
+
+    @property
+    def now(self) -> int:
+        return self._wheel.time
+
+    @property
+    def pending(self) -> int:
+        return len(self._wheel)
+
+    def schedule(self, at: int, dst: ComponentPin, level: Level) -> None:
+        self._wheel.push(at, (None, dst, level))
+
+    def run(self, until: Optional[int] = None) -> None:
+        """
+        Process events in time order, up to and including tick `until`.
+        Without `until`, run until nothing more is scheduled.
+        """
+
+        wheel = self._wheel
+        sink = trace.sink
+        budget = self.max_events
+        watch_at = budget - min(_WATCH_AFTER, budget // 2)
+        watch: Optional[_Watch] = None
+
+        while True:
+            t = wheel.next_time()
+            if t is None or (until is not None and t > until):
+                break
+
+            t, items = wheel.pop()
+            epoch = SimStep()
+            q: Deque[Event] = deque(items)
+            popleft = q.popleft
+            extend = q.extend
+
+            while q:
+                if not budget:
+                    raise errors.OscillationError(
+                        f'no fix-point after {self.max_events} events',
+                        nets_of(dst for src, dst, level in q))
+                budget -= 1
+
+                src, dst, level = popleft()
+                if sink is not None:
+                    sink.record(Record(Kind.EVENT, src, dst, level, epoch))
+                if watch is not None:
+                    watch.touch(dst, t)
+                comp = dst.component
+                evts = comp.propagate(dst.pin, level, epoch)
+                delay = comp._delay
+                if delay:
+                    for evt in evts:
+                        wheel.push(t + delay, evt)
+                else:
+                    extend(evts)
+
+            if sink is not None:
+                sink.record(Record(Kind.SETTLED, None, None, None, epoch))
+
+            if budget < watch_at:
+                if watch is None:
+                    watch = _Watch()
+                watch.check(t, wheel)
+
+        if until is not None:
+            wheel.advance(until)
+
+
+__all__ = (
+    'TimingWheel',
+    'Timeline',
+)
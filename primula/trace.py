@@ -0,0 +1,123 @@
+from typing import Optional, List, NamedTuple, Iterator
+from contextlib import contextmanager
+from abc import ABC, abstractmethod
+from enum import Enum
+import logging
+from .base import Level, SimStep
+
+
+class Kind(Enum):
+    """
+    What happened in a trace record
+    """
+
+    SEED = 0  # an event was injected in to the simulation
+    EVENT = 1  # an event was taken off the queue
+    ASSERT = 2  # a component output pin changed level
+    PROPAGATE = 3  # a component input pin changed level
+    IGNORE = 4  # a level was dropped at a pin (floating, error, hi-z)
+    CONNECT = 5  # a pin was connected to a wire
+    DRIVE = 6  # a wire was driven from outside the simulation
+    SETTLED = 7  # the simulation reached a fix-point
+
+
+class Record(NamedTuple):
+    kind: Kind
+    src: object
+    dst: object
+    level: Optional[Level]
+    step: Optional[SimStep]
+
+    def __str__(self) -> str:
+        level = '' if self.level is None else f' {self.level.name}'
+        if self.dst is None:
+            return self.kind.name
+        if self.src is None:
+            return f'{self.kind.name} {self.dst}{level}'
+        return f'{self.kind.name} {self.src} -> {self.dst}{level}'
+
+
+class Sink(ABC):
+    """
+    Somewhere to send trace records.
+
+    Records are only built when a sink is attached, so the simulation pays
+    for nothing more than an `is None` test when tracing is off.
+    """
+
+    __slots__ = ()
+
+    @abstractmethod
+    def record(self, rec: Record) -> None:
+        pass
+
+
+class ListSink(Sink):
+    """
+    Collect trace records in to a list
+    """
+
+    __slots__ = (
+        'records',
+    )
+
+    records: List[Record]
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, rec: Record) -> None:
+        self.records.append(rec)
+
+
+class LoggingSink(Sink):
+    """
+    Format trace records on to the 'sim' logger
+    """
+
+    __slots__ = (
+        '_log',
+    )
+
+    _debug = frozenset({Kind.SEED, Kind.EVENT, Kind.CONNECT, Kind.SETTLED})
+
+    def __init__(self, log: Optional[logging.Logger] = None):
+        self._log = logging.getLogger('sim') if log is None else log
+
+    def record(self, rec: Record) -> None:
+        lvl = logging.DEBUG if rec.kind in self._debug else logging.INFO
+        self._log.log(lvl, '%s', rec)
+
+
+sink: Optional[Sink] = None
+
+
+def attach(new: Optional[Sink]) -> Optional[Sink]:
+    """
+    Attach a trace sink, or detach with None. Returns the previous sink.
+    """
+
+    global sink
+    old = sink
+    sink = new
+    return old
+
+
+@contextmanager
+def tracing(new: Sink) -> Iterator[Sink]:
+    old = attach(new)
+    try:
+        yield new
+    finally:
+        attach(old)
+
+
+__all__ = (
+    'Kind',
+    'Record',
+    'Sink',
+    'ListSink',
+    'LoggingSink',
+    'attach',
+    'tracing',
+)
@@ -0,0 +1,139 @@
+from typing import Tuple, Optional, TYPE_CHECKING
+from array import array
+from inspect import signature
+from .base import Level, Pin, EventGenerator
+
+if TYPE_CHECKING:
+    from .component import Component
+
+
+_PROBES = (Level.FLT.value, Level.LO.value, Level.HI.value)
+
+
+class TruthTable:
+    """
+    Lookup table of a stateless component's outputs for every combination of
+    its input levels, including FLT and ERR.
+
+    The index is the input levels packed two bits each, first input pin in the
+    most significant position. Each entry is one byte per output pin.
+    """
+
+    __slots__ = (
+        'inputs',
+        'outputs',
+        'table',
+    )
+
+    inputs: Tuple[int, ...]
+    outputs: Tuple[int, ...]
+    table: bytes
+
+    def __init__(self,
+                 inputs: Tuple[int, ...],
+                 outputs: Tuple[int, ...],
+                 table: bytes):
+        self.inputs = inputs
+        self.outputs = outputs
+        self.table = table
+
+    def index(self, levels) -> int:
+        idx = 0
+        for p in self.inputs:
+            idx = (idx << 2) | levels[p]
+        return idx
+
+    def lookup(self, levels) -> bytes:
+        n = len(self.outputs)
+        idx = self.index(levels) * n
+        return self.table[idx:idx + n]
+
+    def evaluate(self, comp: 'Component') -> EventGenerator:
+        levels = comp._levels
+        idx = 0
+        for p in self.inputs:
+            idx = (idx << 2) | levels[p]
+
+        outputs = self.outputs
+        if len(outputs) == 1:
+            yield from comp._set_output_level(outputs[0], self.table[idx])
+            return
+
+        n = len(outputs)
+        for k, p in enumerate(outputs):
+            yield from comp._set_output_level(p, self.table[idx * n + k])
+
+
+def tabulate(comp: 'Component', max_inputs: int = 5) -> Optional[TruthTable]:
+    """
+    Build the truth table of comp by running its `_on_change` over every
+    combination of input levels.
+
+    The table is shared by every instance of the class, so only classes
+    which haven't opted out with `_tabulate = False` and whose constructor
+    takes no arguments are tabulated. Returns None otherwise, if the
+    component has too many inputs, or if it turns out to depend on anything
+    other than its current inputs: which pin changed, the previous state of
+    its outputs, or anything which raises. It also gives up if `_on_change`
+    changes a pin direction. The component must not be connected to
+    anything yet.
+    """
+
+    cls = type(comp)
+    if not cls._tabulate:
+        return None
+    if len(signature(cls.__init__).parameters) > 1:
+        return None
+
+    dirs = comp._directions
+    ins = tuple(p for p, d in enumerate(dirs) if d == Pin.IN.value)
+    outs = tuple(p for p, d in enumerate(dirs) if d == Pin.OUT.value)
+    if not ins or not outs or len(ins) > max_inputs:
+        return None
+    if any(c is not None for c in comp._conns):
+        return None
+
+    levels = comp._levels
+    saved = array('B', levels)
+    saved_dirs = array('B', dirs)
+    table = bytearray()
+    nr_in = len(ins)
+
+    try:
+        for idx in range(4 ** nr_in):
+            for k, p in enumerate(ins):
+                levels[p] = (idx >> (2 * (nr_in - 1 - k))) & 3
+            inputs = bytes(levels[p] for p in ins)
+
+            result = None
+            for changed in ins:
+                for prior in _PROBES:
+                    for p in outs:
+                        levels[p] = prior
+                    for evt in comp._on_change(changed):
+                        pass
+                    if dirs != saved_dirs:
+                        return None
+                    got = bytes(levels[p] for p in outs)
+                    if result is None:
+                        result = got
+                    elif got != result:
+                        return None
+                    if bytes(levels[p] for p in ins) != inputs:
+                        return None
+
+            assert result is not None
+            table += result
+    except Exception:
+        return None
+    finally:
+        levels[:] = saved
+        dirs[:] = saved_dirs
+
+    return TruthTable(ins, outs, bytes(table))
+
+
+__all__ = (
+    'TruthTable',
+    'tabulate',
+)
@@ -0,0 +1,236 @@
+from typing import Optional, List, Dict, Tuple, Callable, Union, TextIO, \
+                   Iterable, Any
+import os
+from .base import Level, SimStep
+from .wire import Wire
+from . import errors
+
+
+_VALUES = {
+    Level.LO: '0',
+    Level.HI: '1',
+    Level.FLT: 'z',
+    Level.ERR: 'x',
+}
+
+# Identifier codes are made from the printable ASCII characters
+_FIRST = ord('!')
+_RADIX = ord('~') - _FIRST + 1
+
+
+def _code(n: int) -> str:
+    chars = []
+    while True:
+        n, r = divmod(n, _RADIX)
+        chars.append(chr(_FIRST + r))
+        if not n:
+            return ''.join(chars)
+        n -= 1
+
+
+def _named(obj: Any) -> Iterable[Tuple[str, Wire]]:
+    """
+    Names and wires of something to watch: a wire, a subcircuit, an imported
+    design or a mapping of names to wires
+    """
+
+    if isinstance(obj, Wire):
+        yield obj._name or 'net', obj
+        return
+
+    nets = getattr(obj, 'nets', None)
+    if isinstance(nets, dict):
+        yield from nets.items()
+        return
+
+    wires = getattr(obj, 'wires', None)
+    if wires is not None:
+        for n, w in enumerate(wires):
+            yield w._name or f'net{n}', w
+        return
+
+    if isinstance(obj, dict):
+        yield from obj.items()
+        return
+
+    raise TypeError(f'can not watch {type(obj).__name__}')
+
+
+class VCDWriter:
+    """
+    Record level changes of chosen wires as a Value Change Dump.
+
+    Wires are chosen with `watch`, one at a time or a whole subcircuit or
+    imported design at once, each under a dotted scope name. Only watched
+    wires call back in to the writer when they change, so the cost to the
+    rest of a simulation is one `is None` test per wire level change.
+
+    All of the changes in one simulation step are recorded at the same time,
+    as their final values. By default each step which changes a watched wire
+    takes the next tick; pass `clock` to take times from somewhere else, such
+    as `lambda: Simulation.timeline.now` for timed simulations.
+
+    Output is collected in memory and written `chunk` lines at a time, and
+    when the writer is flushed or closed. Closing stops watching the wires.
+    """
+
+    __slots__ = (
+        '_file',
+        '_owned',
+        '_timescale',
+        '_clock',
+        '_codes',
+        '_vars',
+        '_started',
+        '_time',
+        '_epoch',
+        '_pending',
+        '_last',
+        '_buf',
+        'chunk',
+    )
+
+    _file: TextIO
+    _codes: Dict[Wire, str]
+    _vars: List[Tuple[str, str, str]]
+    _pending: Dict[Wire, Level]
+    _last: Dict[str, str]
+    _buf: List[str]
+
+    def __init__(self,
+                 file: Union[str, 'os.PathLike[str]', TextIO],
+                 timescale: str = '1 ns',
+                 clock: Optional[Callable[[], int]] = None,
+                 chunk: int = 4096):
+        if isinstance(file, (str, os.PathLike)):
+            self._file = open(file, 'w')
+            self._owned = True
+        else:
+            self._file = file
+            self._owned = False
+        self._timescale = timescale
+        self._clock = clock
+        self._codes = {}
+        self._vars = []
+        self._started = False
+        self._time = 0
+        self._epoch: Optional[SimStep] = None
+        self._pending = {}
+        self._last = {}
+        self._buf = []
+        self.chunk = chunk
+
+    def watch(self, *objs: Any, scope: str = 'top') -> None:
+        """
+        Record the given wires, subcircuits, imported designs or mappings of
+        names to wires. Must be called before the first change is recorded.
+        """
+
+        if self._started:
+            raise errors.PrimulaError('wires must be watched before '
+                                      'recording starts')
+        if not self._codes and self._clock is not None:
+            self._time = self._clock()
+
+        for obj in objs:
+            for name, w in _named(obj):
+                code = self._codes.get(w)
+                if code is None:
+                    if w._probe is not None:
+                        raise errors.PrimulaError(f'{w} is already being '
+                                                  'recorded')
+                    code = self._codes[w] = _code(len(self._codes))
+                    self._last[code] = _VALUES[w._level]
+                    w._probe = self._change
+                self._vars.append((scope, name.replace(' ', '_'), code))
+
+    def _start(self) -> None:
+        self._started = True
+        out = [f'$timescale {self._timescale} $end\n']
+        path: List[str] = []
+        for scope, name, code in sorted(self._vars):
+            parts = scope.split('.')
+            common = 0
+            while common < min(len(path), len(parts)) and \
+                    path[common] == parts[common]:
+                common += 1
+            out.extend('$upscope $end\n' for x in path[common:])
+            out.extend(f'$scope module {p} $end\n' for p in parts[common:])
+            path = parts
+            out.append(f'$var wire 1 {code} {name} $end\n')
+        out.extend('$upscope $end\n' for x in path)
+        out.append('$enddefinitions $end\n')
+
+        # Levels from when each wire started being watched
+        out.append(f'#{self._time}\n$dumpvars\n')
+        out.extend(f'{v}{code}\n' for code, v in self._last.items())
+        out.append('$end\n')
+        self._buf.extend(out)
+
+    def _change(self, wire: Wire, epoch: SimStep) -> None:
+        if epoch is not self._epoch:
+            if not self._started:
+                self._start()
+            self._epoch = epoch
+            clock = self._clock
+            t = self._time + 1 if clock is None else clock()
+            if t != self._time:
+                self._emit()
+                self._time = t
+        self._pending[wire] = wire._level
+
+    def _emit(self) -> None:
+        pending = self._pending
+        if not pending:
+            return
+
+        buf = self._buf
+        codes = self._codes
+        last = self._last
+        stamped = False
+        for w, level in pending.items():
+            code = codes[w]
+            v = _VALUES[level]
+            if last[code] == v:
+                # It changed back again within the step
+                continue
+            last[code] = v
+            if not stamped:
+                buf.append(f'#{self._time}\n')
+                stamped = True
+            buf.append(f'{v}{code}\n')
+        pending.clear()
+
+        if len(buf) >= self.chunk:
+            self._file.write(''.join(buf))
+            buf.clear()
+
+    def flush(self) -> None:
+        """
+        Write out everything recorded so far
+        """
+
+        if not self._started:
+            self._start()
+        self._emit()
+        self._file.write(''.join(self._buf))
+        self._buf.clear()
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for w in self._codes:
+            w._probe = None
+        if self._owned:
+            self._file.close()
+
+    def __enter__(self) -> 'VCDWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+__all__ = (
+    'VCDWriter',
+)
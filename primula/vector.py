@@ -0,0 +1,434 @@
+from typing import List, Deque, Tuple, Union, Optional, Mapping
+from collections import deque
+from array import array
+from .base import Level, MergeStep
+from .wire import Wire
+from .netlist import Netlist, \
+                     OP_INV, \
+                     OP_NOR, \
+                     OP_NAND, \
+                     OP_AND, \
+                     OP_AND3, \
+                     OP_OR, \
+                     OP_OR3, \
+                     OP_XOR, \
+                     OP_SR, \
+                     OP_JK
+
+
+_levels = tuple(Level)
+
+# (is_pin, index, mask, bit0, bit1)
+VectorEvent = Tuple[bool, int, int, int, int]
+
+
+def _split(level: int, mask: int) -> Tuple[int, int]:
+    """
+    Broadcast a scalar level to the lanes in mask and return its bit-planes
+    """
+
+    return (mask if level & 1 else 0), (mask if level & 2 else 0)
+
+
+class VectorNetlist:
+    """
+    Simulate many copies of a compiled netlist at once, one per bit-lane.
+
+    Every net and pin holds two integer words: bit-plane 0 and bit-plane 1
+    of the `Level` value in each lane. So LO is (0, 0), HI is (1, 0), FLT is
+    (0, 1) and ERR is (1, 1). Gates are evaluated with bitwise operations on
+    whole words and events carry a mask of the lanes which they apply to.
+    Restricted to any single lane, the order of events is exactly that of the
+    scalar `Netlist`, so every lane settles to the same state as if that
+    stimulus had been run on its own.
+
+    The number of lanes is not limited to the machine word size, Python
+    integers will grow as required.
+    """
+
+    __slots__ = (
+        'netlist',
+        'lanes',
+        'full',
+        'net0',
+        'net1',
+        'pin0',
+        'pin1',
+        '_driven',
+        '_net_step',
+        '_step',
+        '_stuck',
+        '_stuck_hi',
+        '_pin_stuck',
+        '_pin_stuck_hi',
+    )
+
+    netlist: Netlist
+    lanes: int
+    full: int
+    net0: List[int]
+    net1: List[int]
+    pin0: List[int]
+    pin1: List[int]
+
+    def __init__(self, netlist: Netlist, lanes: int = 64):
+        if lanes < 1:
+            raise ValueError('need at least one lane')
+
+        self.netlist = netlist
+        self.lanes = lanes
+        self.full = (1 << lanes) - 1
+
+        # Start every lane in the current state of the scalar netlist
+        full = self.full
+        self.net0 = []
+        self.net1 = []
+        for level in netlist.levels:
+            b0, b1 = _split(level, full)
+            self.net0.append(b0)
+            self.net1.append(b1)
+
+        self.pin0 = []
+        self.pin1 = []
+        for level in netlist.pin_levels:
+            b0, b1 = _split(level, full)
+            self.pin0.append(b0)
+            self.pin1.append(b1)
+
+        self._driven = [0 for x in netlist.levels]
+        self._net_step = array('L', (0 for x in netlist.levels))
+        self._step = 0
+
+        # Lanes in which a net or pin is held at a level, see stick()
+        self._stuck = [0 for x in netlist.levels]
+        self._stuck_hi = [0 for x in netlist.levels]
+        self._pin_stuck = [0 for x in netlist.pin_levels]
+        self._pin_stuck_hi = [0 for x in netlist.pin_levels]
+
+    def level(self, wire: Union[Wire, str, int], lane: int) -> Level:
+        n = self.netlist.net(wire)
+        v = ((self.net0[n] >> lane) & 1) | (((self.net1[n] >> lane) & 1) << 1)
+        return _levels[v]
+
+    def levels(self, wire: Union[Wire, str, int]) -> List[Level]:
+        return [self.level(wire, lane) for lane in range(self.lanes)]
+
+    def lanes_at(self, wire: Union[Wire, str, int], level: Level) -> int:
+        """
+        Return a mask of all the lanes in which wire is at level
+        """
+
+        n = self.netlist.net(wire)
+        b0 = self.net0[n] if level.value & 1 else ~self.net0[n]
+        b1 = self.net1[n] if level.value & 2 else ~self.net1[n]
+        return b0 & b1 & self.full
+
+    def drive(self,
+              wire: Union[Wire, str, int],
+              value: Union[Level, int],
+              mask: Optional[int] = None) -> None:
+        """
+        Bit-parallel equivalent of `Wire.drive`.
+
+        value is either a Level to drive in every lane, or an integer with a
+        bit set for each lane which is to be driven HI and clear for those to
+        be driven LO. Only the lanes in mask are driven.
+        """
+
+        self._settle(self._seed({wire: value}, mask))
+
+    def apply(self,
+              values: Mapping[Union[Wire, str, int], Union[Level, int]],
+              mask: Optional[int] = None) -> None:
+        """
+        Bit-parallel equivalent of `Simulation.apply`, values are as for
+        `drive`. As there, a net may change more than once in the settle.
+        """
+
+        self._settle(self._seed(values, mask), merge=True)
+
+    def _seed(self,
+              values: Mapping[Union[Wire, str, int], Union[Level, int]],
+              mask: Optional[int]) -> Deque[VectorEvent]:
+        """
+        Float each net in the lanes of mask and queue the events which
+        drive it to its values
+        """
+
+        if mask is None:
+            mask = self.full
+        else:
+            mask &= self.full
+
+        q: Deque[VectorEvent] = deque()
+        for wire, value in values.items():
+            n = self.netlist.net(wire)
+            if isinstance(value, Level):
+                b0, b1 = _split(value.value, mask)
+            else:
+                b0, b1 = value & mask, 0
+
+            # Wire.drive floats the wire first, then drives it
+            self.net0[n] &= ~mask
+            self.net1[n] = (self.net1[n] & ~mask) | mask
+            q.append((False, n, mask, b0, b1))
+        return q
+
+    def pulse(self,
+              wire: Union[Wire, str, int],
+              mask: Optional[int] = None) -> None:
+        self.drive(wire, Level.HI, mask)
+        self.drive(wire, Level.LO, mask)
+
+    def stick(self,
+              net: int,
+              level: Level,
+              lanes: int,
+              slot: Optional[int] = None) -> None:
+        """
+        Hold net number `net`, or only the input pin with slot number `slot`
+        on it, at level LO or HI in the given lanes from now on, and settle.
+        This is how stuck-at faults are modelled: whatever drives the net or
+        pin in those lanes is ignored.
+        """
+
+        lanes &= self.full
+        hi = lanes if level is Level.HI else 0
+        if slot is None:
+            self._stuck[net] |= lanes
+            self._stuck_hi[net] = (self._stuck_hi[net] & ~lanes) | hi
+            ev = (False, net, lanes, hi, 0)
+        else:
+            if self.netlist.pin_net[slot] != net:
+                raise ValueError(f'pin {slot} is not on net {net}')
+            self._pin_stuck[slot] |= lanes
+            self._pin_stuck_hi[slot] = (self._pin_stuck_hi[slot] & ~lanes) | hi
+            ev = (True, slot, lanes, hi, 0)
+        self._settle(deque((ev,)))
+
+    def _settle(self, q: Deque[VectorEvent], merge: bool = False) -> None:
+        """
+        Run events until every lane settles. With merge, lanes of a net
+        which change again in the same step take the new level rather than
+        going to ERR, up to `MergeStep.max_merges` times per net.
+        """
+
+        self._step += 1
+        step = self._step
+
+        nl = self.netlist
+        fan_start = nl.fan_start
+        fan_pins = nl.fan_pins
+        pin_comp = nl.pin_comp
+        comp_base = nl.comp_base
+        opcodes = nl.opcodes
+        net0 = self.net0
+        net1 = self.net1
+        pin0 = self.pin0
+        pin1 = self.pin1
+        driven = self._driven
+        net_step = self._net_step
+        stuck = self._stuck
+        stuck_hi = self._stuck_hi
+        pin_stuck = self._pin_stuck
+        pin_stuck_hi = self._pin_stuck_hi
+        full = self.full
+        popleft = q.popleft
+        push = q.append
+        out_assert = self._assert
+        merges = bytearray(len(net0)) if merge else None
+        max_merges = MergeStep.max_merges
+
+        while q:
+            is_pin, i, mask, b0, b1 = popleft()
+
+            if not is_pin:
+                # Stuck lanes stay where they are
+                s = stuck[i]
+                if s:
+                    b0 = (b0 & ~s) | (stuck_hi[i] & mask)
+                    b1 &= ~s
+
+                # Pin -> net, drop the lanes which reached a fix-point
+                o0 = net0[i]
+                o1 = net1[i]
+                mask &= (o0 ^ b0) | (o1 ^ b1)
+                if not mask:
+                    continue
+
+                if net_step[i] != step:
+                    net_step[i] = step
+                    driven[i] = 0
+
+                # Lanes driven twice this step go in to the error state
+                twice = mask & driven[i]
+                if twice and merges is not None and \
+                        merges[i] < max_merges:
+                    merges[i] += 1
+                elif twice:
+                    o0 |= twice
+                    o1 |= twice
+                    mask &= ~twice
+                    b0 &= mask
+                    b1 &= mask
+
+                net0[i] = (o0 & ~mask) | b0
+                net1[i] = (o1 & ~mask) | b1
+                driven[i] |= mask
+
+                # FLT and ERR don't propagate
+                mask &= ~b1
+                if not mask:
+                    continue
+
+                b0 &= mask
+                for j in range(fan_start[i], fan_start[i + 1]):
+                    push((True, fan_pins[j], mask, b0, 0))
+                continue
+
+            # Net -> pin
+            s = pin_stuck[i]
+            if s:
+                b0 = (b0 & ~s) | (pin_stuck_hi[i] & mask)
+                b1 &= ~s
+            pin0[i] = (pin0[i] & ~mask) | b0
+            pin1[i] = (pin1[i] & ~mask) | b1
+            c = pin_comp[i]
+            op = opcodes[c]
+            b = comp_base[c]
+
+            if op == OP_NOR:
+                t = (pin0[b] | pin1[b]) | (pin0[b + 1] | pin1[b + 1])
+                out_assert(b + 2, full & ~t, 0, mask, push)
+            elif op == OP_NAND:
+                t = (pin0[b] | pin1[b]) & (pin0[b + 1] | pin1[b + 1])
+                out_assert(b + 2, full & ~t, 0, mask, push)
+            elif op == OP_XOR:
+                t = (pin0[b] | pin1[b]) ^ (pin0[b + 1] | pin1[b + 1])
+                out_assert(b + 2, t, 0, mask, push)
+            elif op == OP_INV:
+                t = pin0[b] | pin1[b]
+                out_assert(b + 1, full & ~t, 0, mask, push)
+            elif op == OP_AND or op == OP_AND3:
+                # `a and b`: b where a is truthy, otherwise a
+                v0 = pin0[b]
+                v1 = pin1[b]
+                nr_in = 2 if op == OP_AND else 3
+                for k in range(b + 1, b + nr_in):
+                    t = v0 | v1
+                    v0 = (t & pin0[k]) | (v0 & ~t)
+                    v1 = (t & pin1[k]) | (v1 & ~t)
+                out_assert(b + nr_in, v0, v1, mask, push)
+            elif op == OP_OR or op == OP_OR3:
+                # `a or b`: a where a is truthy, otherwise b
+                v0 = pin0[b]
+                v1 = pin1[b]
+                nr_in = 2 if op == OP_OR else 3
+                for k in range(b + 1, b + nr_in):
+                    t = v0 | v1
+                    v0 = (t & v0) | (pin0[k] & ~t)
+                    v1 = (t & v1) | (pin1[k] & ~t)
+                out_assert(b + nr_in, v0, v1, mask, push)
+            elif op == OP_SR or op == OP_JK:
+                self._sequential(op, b, i, mask, push)
+            else:
+                self._generic(c, b, i, mask, push)
+
+    def _assert(self,
+                out: int,
+                v0: int,
+                v1: int,
+                mask: int,
+                push) -> None:
+        """
+        Set an output pin to (v0, v1) in the lanes given by mask and queue an
+        event for the lanes in which it changed.
+        """
+
+        pin0 = self.pin0
+        pin1 = self.pin1
+        o0 = pin0[out]
+        o1 = pin1[out]
+        mask &= (o0 ^ v0) | (o1 ^ v1)
+        if not mask:
+            return
+
+        v0 &= mask
+        v1 &= mask
+        pin0[out] = (o0 & ~mask) | v0
+        pin1[out] = (o1 & ~mask) | v1
+
+        n = self.netlist.pin_net[out]
+        if n >= 0:
+            push((False, n, mask, v0, v1))
+
+    def _sequential(self, op: int, b: int, slot: int, mask: int, push) -> None:
+        pin0 = self.pin0
+        pin1 = self.pin1
+
+        if op == OP_JK:
+            if slot != b:
+                return
+            s = pin0[b + 1] | pin1[b + 1]
+            r = pin0[b + 2] | pin1[b + 2]
+            q = b + 3
+        else:
+            s = pin0[b] | pin1[b]
+            r = pin0[b + 1] | pin1[b + 1]
+            q = b + 2
+
+        # Masked update of only the lanes where the triggering pin went HI
+        act = mask & pin0[slot] & ~pin1[slot]
+        both = act & s & r
+        set_ = act & s & ~r
+        reset = act & r & ~s
+
+        if op == OP_JK:
+            nq = both & ~(pin0[q] | pin1[q])
+            nq_ = both & ~(pin0[q + 1] | pin1[q + 1])
+            self._assert(q, nq | set_, 0, both | set_ | reset, push)
+            self._assert(q + 1, nq_ | reset, 0, both | set_ | reset, push)
+        else:
+            self._assert(q, set_, both, both | set_ | reset, push)
+            self._assert(q + 1, reset, both, both | set_ | reset, push)
+
+    def _generic(self, c: int, b: int, slot: int, mask: int, push) -> None:
+        """
+        Components without a bit-parallel model are run one lane at a time
+        through their own `_on_change` method.
+        """
+
+        nl = self.netlist
+        comp = nl.components[c]
+        pin0 = self.pin0
+        pin1 = self.pin1
+        pins = range(b, nl.comp_base[c + 1])
+        saved = array('B', comp._levels)
+
+        try:
+            while mask:
+                bit = mask & -mask
+                mask ^= bit
+                lane = bit.bit_length() - 1
+
+                for k in pins:
+                    comp._levels[k - b] = (((pin0[k] >> lane) & 1)
+                                           | (((pin1[k] >> lane) & 1) << 1))
+
+                for src, dst, level in comp._on_change(slot - b):
+                    assert src is not None
+                    n = nl.pin_net[b + src.pin]
+                    b0, b1 = _split(level.value, bit)
+                    push((False, n, bit, b0, b1))
+
+                for k in pins:
+                    v = comp._levels[k - b]
+                    pin0[k] = (pin0[k] & ~bit) | (bit if v & 1 else 0)
+                    pin1[k] = (pin1[k] & ~bit) | (bit if v & 2 else 0)
+        finally:
+            comp._levels[:] = saved
+
+
+__all__ = (
+    'VectorNetlist',
+)
@@ -1,16 +1,19 @@
-from typing import Optional, Dict
+from typing import Optional, List, Callable
+from itertools import islice
 from weakref import ref, ReferenceType
 import logging
 from .base import Pull, \
                   Pin, \
                   Level, \
-                  Event, \
                   EventGenerator, \
                   ComponentBase, \
                   ComponentPin, \
-                  SimStep
+                  SimStep, \
+                  MergeStep
 from .simulation import Simulation
 from . import errors
+from . import trace
+from .trace import Kind, Record
 
 
 sim = logging.getLogger('sim')
@@ -31,7 +34,7 @@ class LineDriver(ComponentBase):
                   level: Level,
                   epoch: SimStep) -> EventGenerator:
         self._level = level
-        yield Event(self.pin(0), self._target, level)
+        yield None, self._target, level
 
     def connected_pin(self, pin: int, other: ComponentPin):
         raise NotImplementedError
@@ -54,32 +57,40 @@ class Wire(ComponentBase):
         '_name',
         '_level',
         '_pins',
-        '_next_id',
+        '_handles',
+        '_line',
         '_driver',
         '_epoch',
+        '_probe',
     )
 
     _name: Optional[str]
     _level: Level
-    _pins: Dict[int, ComponentPin]
+    _pins: List[ComponentPin]
+    _handles: List[ComponentPin]
+    _line: LineDriver
     _driver: int
-    _next_id: int
+    _probe: Optional[Callable[['Wire', SimStep], None]]
 
     def __init__(self,
                  name: Optional[str] = None,
                  pull: Optional[Pull] = None):
         self._name = name
-        self._next_id = 1
         self._driver = 0
         self._epoch: Optional[ReferenceType[SimStep]] = None
+        self._probe = None
         if pull is None:
             self._level = Level.FLT
         else:
             self._level = pull.level
 
+        # Pins are numbered in the order they were connected, so the pin
+        # number of a connection is its index in both lists. Pin 0 is the
+        # line driver, which is also kept as `_line` for its level.
         me = ComponentPin(self, 0)
-        sim = ComponentPin(LineDriver(me, self._level), 0)
-        self._pins = {0: sim, }
+        self._line = LineDriver(me, self._level)
+        self._pins = [ComponentPin(self._line, 0)]
+        self._handles = [me]
 
     def get_level(self, pin: int) -> Level:
         # Level is the same at all pins
@@ -89,8 +100,8 @@ class Wire(ComponentBase):
         raise errors.PrimulaError('Wires are not directional')
 
     def pin(self, pin: int) -> ComponentPin:
-        if pin in self._pins:
-            return super().pin(pin)
+        if 0 <= pin < len(self._handles):
+            return self._handles[pin]
         raise errors.PinNotFoundError(f'{self}#{pin} no such pin')
 
     def propagate(self,
@@ -104,63 +115,102 @@ class Wire(ComponentBase):
 
         # Apply the change to this wire
         if self._epoch is not None and epoch == self._epoch():
-            sim.warning(f'{self} driven twice this step')
-            self._level = Level.ERR
-            return
+            merged = False
+            if isinstance(epoch, MergeStep):
+                if pin == 0 and self._driver != 0:
+                    # The line driver echoing a level the wire has since
+                    # left
+                    return
+                merged = pin == self._driver and \
+                    self._level is not Level.ERR and epoch.merge(self)
+            if not merged:
+                sim.warning('%s driven twice this step', self)
+                self._level = Level.ERR
+                if self._probe is not None:
+                    self._probe(self, epoch)
+                return
 
         self._level = level
         self._driver = pin
         self._epoch = ref(epoch)
+        if self._probe is not None:
+            self._probe(self, epoch)
 
         # Wires don't propagate errors. We will want to color them red to make
         # the location of the error obvious. That's made more difficult if we
         # propagate red all over the place!
-        if level in {Level.FLT, Level.ERR}:
+        if level is Level.FLT or level is Level.ERR:
             return
 
-        # Now to all pins
-        driver = self.pin(pin)
-        for pin, cp in self._pins.items():
-            # Don't drive current back in to the pin which is driving current
-            # in to this wire
-            if self._driver == pin:
-                continue
+        # Now to all pins, except for the one which is driving current in to
+        # this wire. Most wires have only a few pins, for which yielding
+        # them one by one beats building a list without that one.
+        src = self._handles[pin]
+        pins = iter(self._pins)
+        for other in islice(pins, pin):
+            yield src, other, level
+        next(pins)
+        for other in pins:
+            yield src, other, level
+
+    def _release(self) -> ComponentPin:
+        """
+        Float the wire and return its line driver so that it can be driven.
+        """
 
-            yield Event(driver, cp, self._level)
-
-    def drive(self, level: Level):
         self._level = Level.FLT
-        seed = self._pins[0]
-        Simulation.run(seed, level)
+        return self._pins[0]
+
+    def drive(self, level: Level, at: Optional[int] = None):
+        """
+        Drive the wire to level and settle the circuit immediately or, if at
+        is given, schedule the change on Simulation.timeline for that tick.
+        A scheduled drive only has an effect if it changes the level.
+        """
+
+        if trace.sink is not None:
+            trace.sink.record(Record(Kind.DRIVE, None, self, level, None))
+        if at is None:
+            Simulation.run(self._release(), level)
+        else:
+            Simulation.timeline.schedule(at, self._pins[0], level)
 
-    def pulse(self):
-        sim.debug('rising edge')
-        self.drive(Level.HI)
-        sim.debug('falling edge')
-        self.drive(Level.LO)
+    def pulse(self, at: Optional[int] = None, width: int = 1):
+        if at is None:
+            self.drive(Level.HI)
+            self.drive(Level.LO)
+        else:
+            self.drive(Level.HI, at)
+            self.drive(Level.LO, at + width)
 
     def new_pin(self) -> ComponentPin:
-        this_id = self._next_id
-        self._next_id += 1
-        return self.pin(this_id)
+        return self.pin(len(self._pins))
 
     def connected_pin(self, pin: int, other: ComponentPin):
         raise NotImplementedError
 
+    def _attach(self, cp: ComponentPin) -> ComponentPin:
+        """
+        Add a pin to the wire without simulating anything. Returns the wire's
+        handle for the new connection.
+        """
+
+        this_id = len(self._pins)
+        self._pins.append(cp)
+
+        # Register back-pointers
+        me = ComponentPin(self, this_id)
+        self._handles.append(me)
+        if trace.sink is not None:
+            trace.sink.record(Record(Kind.CONNECT, me, cp, None, None))
+        cp.connected_pin(me)
+        return me
+
     def connect(self, *args: ComponentPin):
         driver = None
 
         for cp in args:
-            this_id = self._next_id
-            self._next_id += 1
-            self._pins[this_id] = cp
-
-            c, p = cp
-
-            # Register back-pointers
-            me = ComponentPin(self, this_id)
-            sim.debug(f'connect {me} to {cp}')
-            cp.connected_pin(me)
+            self._attach(cp)
 
             # Now we'll check if the pin we're adding is an output pin which is
             # either sourcing or sinking a current and then remember about it
@@ -174,19 +224,24 @@ class Wire(ComponentBase):
 
             if driver is not None:
                 self._level = Level.ERR
-                sim.warning(f'Conflicting signals on {self}')
+                sim.warning('Conflicting signals on %s', self)
                 return
 
             driver = cp
 
+        pending = Simulation.deferred
+        if pending is not None:
+            pending.setdefault(self, []).extend(args)
+            return
+
         if driver is None:
             # So all that's left to do is drive wire level in to the newly
-            # connected pins
+            # connected pins, all together as if the wire had just changed.
+            # Where they reconverge, the nets in between may change more
+            # than once on the way to the fix-point.
             level = self._level
-            for cp in args:
-                Simulation.run(cp, level)
+            Simulation.run_all([(cp, level) for cp in args], merge=True)
         else:
-            sim.info(f'connection drove {self} to {driver.level}')
             self.drive(driver.level)
 
     @property
@@ -0,0 +1,83 @@
+import unittest
+from primula import activity, gates, Pull, Wire, Level
+
+
+class Test_Activity(unittest.TestCase):
+    def build(self):
+        a = Wire('a', Pull.DOWN)
+        mid = Wire('mid')
+        outs = [Wire(f'out{i}') for i in range(3)]
+        g = gates.Inverter()
+        a.connect(g.pins.inp)
+        mid.connect(g.pins.out)
+        invs = []
+        for out in outs:
+            inv = gates.Inverter()
+            mid.connect(inv.pins.inp)
+            out.connect(inv.pins.out)
+            invs.append(inv)
+        return a, mid, g, invs
+
+    def test_detached(self):
+        self.assertIsNone(activity.profiler)
+
+    def test_counts(self):
+        a, mid, g, invs = self.build()
+        with activity.profiling() as prof:
+            a.drive(Level.HI)
+            a.drive(Level.LO)
+        self.assertIsNone(activity.profiler)
+
+        self.assertEqual(len(prof.depths), 2)
+        self.assertEqual(prof.received[prof.index(g)], 2)
+        for inv in invs:
+            self.assertEqual(prof.received[prof.index(inv)], 2)
+
+        # mid gets a change from the inverter and passes it to three more
+        # and to its line driver, which echoes it back
+        m = prof.index(mid)
+        self.assertEqual(prof.received[m], 4)
+        self.assertEqual(prof.emitted[m], 8)
+
+        # a, inverter, mid, inverters and line driver, outs and echo, line
+        # drivers, echoes
+        self.assertEqual(list(prof.depths), [7, 7])
+
+        rep = prof.report(top=2)
+        self.assertEqual(rep['settles'], 2)
+        self.assertEqual(rep['events'], sum(prof.sizes))
+        self.assertEqual(rep['depth_max'], 7)
+        self.assertEqual(rep['nets'], 5)
+        self.assertEqual(rep['components'], 4)
+        self.assertEqual(len(rep['hot_nets']), 2)
+        self.assertEqual(rep['amplifiers'][0]['name'], 'mid')
+        self.assertEqual(rep['amplifiers'][0]['fanout'], 2.0)
+
+    def test_reset(self):
+        a, mid, g, invs = self.build()
+        prof = activity.Profiler()
+        old = activity.attach(prof)
+        try:
+            a.drive(Level.HI)
+        finally:
+            activity.attach(old)
+        prof.reset()
+        self.assertEqual(len(prof.received), 0)
+        self.assertEqual(prof.report()['events'], 0)
+
+    def test_nested(self):
+        a, mid, g, invs = self.build()
+        with activity.profiling() as outer:
+            a.drive(Level.HI)
+            with activity.profiling() as inner:
+                a.drive(Level.LO)
+            a.drive(Level.HI)
+
+        # Each one counts what happened while it was attached, by its own
+        # indices
+        self.assertEqual(outer.received[outer.index(g)], 2)
+        self.assertEqual(inner.received[inner.index(g)], 1)
+        self.assertEqual(len(outer.depths), 2)
+        self.assertEqual(len(inner.depths), 1)
+        self.assertEqual(outer.received[outer.index(mid)], 4)
+        self.assertEqual(inner.received[inner.index(mid)], 2)
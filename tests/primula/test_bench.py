@@ -0,0 +1,42 @@
+import json
+import unittest
+from primula import bench, Level
+
+
+class Test_Bench(unittest.TestCase):
+    def test_circuits(self):
+        for name in bench.CIRCUITS:
+            for size in (1, 5, 16):
+                c = bench.CIRCUITS[name](size)
+                for i in range(20):
+                    c.step(i)
+                    self.assertTrue(c.check(), (name, size, i))
+
+    def test_adders(self):
+        for name in ('ripple_adder', 'lookahead_adder'):
+            c = bench.CIRCUITS[name](8)
+            self.assertEqual(len(c.inputs), 16)
+            self.assertEqual(len(c.outputs), 9)
+
+            # One bit at a time settles without any glitches
+            a = c.inputs[:8]
+            for i in (0, 3, 7):
+                a[i].drive(Level.HI)
+            self.assertEqual([w.level for w in c.outputs],
+                             [Level.HI if i in (0, 3, 7) else Level.LO
+                              for i in range(9)])
+
+    def test_run(self):
+        res = bench.run(['inverter_chain', 'counter'], [4, 8], steps=5)
+        res = json.loads(json.dumps(res))
+        self.assertEqual(len(res['results']), 4)
+        for r in res['results']:
+            self.assertGreater(r['events'], 0)
+            self.assertGreater(r['peak_bytes'], 0)
+            self.assertEqual(r['failures'], 0)
+        chain = res['results'][1]
+        self.assertEqual(chain['components'], 8)
+
+        ratios = bench.compare(res, res)
+        self.assertEqual(len(ratios), 4)
+        self.assertTrue(all(r['ratio'] == 1.0 for r in ratios))
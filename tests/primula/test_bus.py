@@ -0,0 +1,121 @@
+import unittest
+from primula import bus, building, gates, netlist, snapshot, Bus, Pull, \
+    Simulation, Wire, Level
+from primula.errors import PrimulaError
+from primula.bus import Word
+
+
+class Test_Bus(unittest.TestCase):
+    def test_drive(self):
+        b = Bus(8, 'b')
+        self.assertEqual(b.word, Word(0, 0xff, 0))
+        self.assertIsNone(b.value)
+        b.drive(0x5a)
+        self.assertEqual(b.value, 0x5a)
+        with self.assertRaises(ValueError):
+            b.drive(0x100)
+
+    def test_adder(self):
+        a = Bus(32, 'a', 0)
+        b = Bus(32, 'b', 0)
+        s = Bus(32, 's')
+        cout = Wire('cout')
+        add = bus.Adder(32)
+        a.connect(add.pins.a)
+        b.connect(add.pins.b)
+        s.connect(add.pins.s)
+        cout.connect(add.pins.cout)
+        self.assertEqual(s.value, 0)
+        self.assertIs(cout.level, Level.LO)
+
+        events = Simulation.events
+        a.drive(0xffffffff)
+        b.drive(2)
+        self.assertEqual(s.value, 1)
+        self.assertIs(cout.level, Level.HI)
+
+        # A whole 32 bit add is a handful of events
+        self.assertLess(Simulation.events - events, 20)
+
+        # Bits from the lowest unknown one up are unknown too
+        b.drive(Word(0, 0x10, 0))
+        self.assertIsNone(s.value)
+        self.assertEqual(s.word, Word(0xf, 0xfffffff0, 0))
+        self.assertIs(cout.level, Level.FLT)
+
+    def test_comparator_mux(self):
+        a = Bus(4, 'a', 3)
+        b = Bus(4, 'b', 9)
+        sel = Wire('sel', Pull.DOWN)
+        eq = Wire('eq')
+        lt = Wire('lt')
+        out = Bus(4, 'out')
+
+        cmp = bus.Comparator(4)
+        a.connect(cmp.pins.a)
+        b.connect(cmp.pins.b)
+        eq.connect(cmp.pins.eq)
+        lt.connect(cmp.pins.lt)
+        mux = bus.Mux(4)
+        a.connect(mux.pins.a)
+        b.connect(mux.pins.b)
+        sel.connect(mux.pins.sel)
+        out.connect(mux.pins.out)
+
+        self.assertIs(eq.level, Level.LO)
+        self.assertIs(lt.level, Level.HI)
+        self.assertEqual(out.value, 3)
+
+        sel.drive(Level.HI)
+        self.assertEqual(out.value, 9)
+        a.drive(9)
+        self.assertIs(eq.level, Level.HI)
+        self.assertIs(lt.level, Level.LO)
+
+    def test_register_taps(self):
+        clk = Wire('clk', Pull.DOWN)
+        ins = [Wire(f'd{i}', Pull.DOWN) for i in range(4)]
+        with building():
+            d = bus.join(ins, 'd')
+            q = Bus(4, 'q')
+            reg = bus.Register(4)
+            clk.connect(reg.pins.clk)
+            d.connect(reg.pins.d)
+            q.connect(reg.pins.q)
+            outs = bus.taps(q)
+        self.assertEqual(d.value, 0)
+        self.assertEqual(outs[0].name, 'q[0]')
+
+        ins[0].drive(Level.HI)
+        ins[3].drive(Level.HI)
+        self.assertEqual(d.value, 9)
+        self.assertIsNone(q.value)
+        self.assertIs(outs[3].level, Level.FLT)
+
+        clk.pulse()
+        self.assertEqual(q.value, 9)
+        self.assertEqual([w.level for w in outs],
+                         [Level.HI, Level.LO, Level.LO, Level.HI])
+
+        # Taps drive ordinary gates
+        inv = gates.Inverter()
+        nq0 = Wire('nq0')
+        outs[0].connect(inv.pins.inp)
+        nq0.connect(inv.pins.out)
+        self.assertIs(nq0.level, Level.LO)
+
+    def test_width_mismatch(self):
+        with self.assertRaises(Exception):
+            Bus(8).connect(bus.Adder(16).pins.a)
+        with self.assertRaises(Exception):
+            Bus(1).connect(gates.Inverter().pins.inp)
+
+    def test_not_compiled(self):
+        b = Bus(4, 'b', 0)
+        w = Wire('w')
+        w.connect(bus.Register(4).pins.clk)
+        b.connect(w._pins[1].component.pins.d)
+        with self.assertRaises(PrimulaError):
+            netlist.compile(w)
+        with self.assertRaises(PrimulaError):
+            snapshot(w)
@@ -0,0 +1,76 @@
+import unittest
+from primula import flipflops, trace, Clock, Pull, Simulation, Wire, Level
+
+
+class Test_Clock(unittest.TestCase):
+    @staticmethod
+    def construct_counter(bits):
+        hi = Wire('hi', Pull.UP)
+        clk = Wire('clk', Pull.DOWN)
+        q = []
+        t = clk
+        for i in range(bits):
+            ff = flipflops.JK()
+            ff._levels[ff.pins.q.pin] = Level.LO.value
+            ff._levels[ff.pins.q_.pin] = Level.HI.value
+            hi.connect(ff.pins.j, ff.pins.k)
+            t.connect(ff.pins.clk)
+            out = Wire(f'q{i}')
+            out.connect(ff.pins.q)
+            t = Wire(f'q{i}_')
+            t.connect(ff.pins.q_)
+            q.append(out)
+        return clk, q
+
+    @staticmethod
+    def value(q):
+        return sum(1 << i for i, w in enumerate(q) if w.level is Level.HI)
+
+    def test_same_as_pulse(self):
+        clk, q = self.construct_counter(4)
+        start = self.value(q)
+        for i in range(5):
+            clk.pulse()
+        pulsed = self.value(q)
+        self.assertEqual(pulsed, (start + 5) & 15)
+
+        clk, q = self.construct_counter(4)
+        events = Simulation.events
+        Clock(clk).run(5)
+        self.assertEqual(self.value(q), pulsed)
+        self.assertGreater(Simulation.events, events)
+
+    def test_sample(self):
+        clk, q = self.construct_counter(3)
+        start = self.value(q)
+        clock = Clock(clk)
+        out = clock.run(20, sample=q)
+        self.assertEqual(sorted(out), ['q0', 'q1', 'q2'])
+        self.assertEqual(len(out['q0']), 20)
+        for i in range(20):
+            v = sum(out[f'q{b}'][i] << b for b in range(3))
+            self.assertEqual(v, (start + i + 1) & 7)
+        self.assertEqual(clock.cycles, 20)
+
+    def test_on_cycle(self):
+        clk, q = self.construct_counter(3)
+        seen = []
+
+        def on_cycle(i):
+            seen.append(i)
+            return i == 6
+
+        clock = Clock(clk)
+        out = clock.run(100, on_cycle, {'bit0': q[0]})
+        self.assertEqual(seen, list(range(7)))
+        self.assertEqual(len(out['bit0']), 7)
+        self.assertEqual(clock.cycles, 7)
+
+    def test_trace(self):
+        # With a sink attached it goes through the normal path
+        clk, q = self.construct_counter(2)
+        start = self.value(q)
+        with trace.tracing(trace.ListSink()) as t:
+            Clock(clk).run(3)
+        self.assertTrue(t.records)
+        self.assertEqual(self.value(q), (start + 3) & 3)
@@ -0,0 +1,140 @@
+import unittest
+from unittest import mock
+from random import Random
+from primula import bench, codegen, gates, netlist, Level, Pull, Wire
+
+
+def adder(size):
+    c = bench.CIRCUITS['ripple_adder'](size)
+    return c, netlist.compile(*c.inputs, *c.outputs)
+
+
+def value(nl, wires):
+    return sum(1 << i for i, w in enumerate(wires)
+               if nl.level(w) is Level.HI)
+
+
+class Test_Codegen(unittest.TestCase):
+    def test_cones(self):
+        c, nl = adder(4)
+        self.assertEqual(nl.levelize(), 1)
+        self.assertTrue(all(op == netlist.OP_CONE for op in nl._run_ops))
+        self.assertEqual(bytes(nl.opcodes).count(netlist.OP_CONE), 0)
+
+    def test_single_bits(self):
+        """
+        Changing one input at a time, where events can already glitch on
+        the reconvergent carries
+        """
+
+        c, nl = adder(6)
+        nl.levelize()
+
+        bits = 0
+        rng = Random(3)
+        for k in range(100):
+            i = rng.randrange(len(c.inputs))
+            level = rng.choice((Level.LO, Level.HI))
+            nl.drive(c.inputs[i], level)
+            bits = bits & ~(1 << i) | level.value << i
+            self.assertEqual(value(nl, c.outputs), (bits & 63) + (bits >> 6))
+            for w in c.outputs:
+                self.assertIs(w.level, nl.level(w))
+
+    def test_glitch_free(self):
+        c, nl = adder(8)
+        nl.levelize()
+        a, b = c.inputs[:8], c.inputs[8:]
+
+        rng = Random(5)
+        for k in range(50):
+            x = rng.getrandbits(8)
+            y = rng.getrandbits(8)
+            levels = {w: Level.HI if x >> i & 1 else Level.LO
+                      for i, w in enumerate(a)}
+            levels.update({w: Level.HI if y >> i & 1 else Level.LO
+                           for i, w in enumerate(b)})
+            nl.apply(levels)
+            self.assertEqual(value(nl, c.outputs), x + y)
+
+    def test_cache(self):
+        c, nl = adder(5)
+        nl.levelize()
+        cached = len(codegen._cache)
+        c, nl2 = adder(5)
+        nl2.levelize()
+        self.assertEqual(len(codegen._cache), cached)
+        self.assertEqual(nl2._cones[0].__code__.co_code,
+                         nl._cones[0].__code__.co_code)
+
+    def test_cache_offset(self):
+        """
+        The same cone further along in a netlist shares the code
+        """
+
+        c, nl = adder(5)
+        nl.levelize()
+        cached = len(codegen._cache)
+
+        c, _ = adder(5)
+        inp = Wire('inp', Pull.DOWN)
+        inv = gates.Inverter()
+        inp.connect(inv.pins.inp)
+        Wire('out').connect(inv.pins.out)
+        nl2 = netlist.compile(*c.inputs, *c.outputs, inp)
+        self.assertEqual(nl2.levelize(), 2)
+        self.assertEqual(len(codegen._cache), cached + 1)
+
+        # Everything in the adder is numbered after the inverter
+        self.assertEqual(nl2.components.index(inv), 0)
+
+        nl2.apply({w: Level.HI for w in c.inputs[:5]})
+        nl2.drive(c.inputs[5], Level.HI)
+        self.assertEqual(value(nl2, c.outputs), 31 + 1)
+
+    def test_cache_bound(self):
+        c, nl = adder(3)
+        nl.levelize()
+        with mock.patch.object(codegen, '_CACHE_SIZE', len(codegen._cache)):
+            for size in (7, 9):
+                c, nl = adder(size)
+                nl.levelize()
+                self.assertEqual(len(codegen._cache), codegen._CACHE_SIZE)
+                self.assertIn(nl._cones[0].__code__.co_filename,
+                              [f'<cone {k.hex()}>' for k in codegen._cache])
+
+    def test_feedback(self):
+        """
+        Gates on a loop and after it stay event driven
+        """
+
+        s = Wire('S', Pull.DOWN)
+        r = Wire('R', Pull.DOWN)
+        q = Wire('Q')
+        qc = Wire('Qc')
+        out = Wire('out')
+        nor1 = gates.Nor()
+        nor2 = gates.Nor()
+        inv1 = gates.Inverter()
+        inv2 = gates.Inverter()
+        mid = Wire('mid')
+        r.connect(nor1.pins.a)
+        s.connect(nor2.pins.b, inv1.pins.inp)
+        q.connect(nor1.pins.out, nor2.pins.a, inv2.pins.inp)
+        qc.connect(nor2.pins.out, nor1.pins.b)
+        mid.connect(inv1.pins.out)
+        out.connect(inv2.pins.out)
+
+        nl = netlist.compile(s)
+        self.assertEqual(nl.levelize(), 1)
+        self.assertEqual(nl._run_ops.count(netlist.OP_CONE), 1)
+        self.assertEqual(nl._run_ops[nl.components.index(inv1)],
+                         netlist.OP_CONE)
+
+        nl.pulse(s)
+        self.assertIs(nl.level(q), Level.HI)
+        self.assertIs(nl.level(out), Level.LO)
+        self.assertIs(mid.level, Level.HI)
+        nl.pulse(r)
+        self.assertIs(nl.level(q), Level.LO)
+        self.assertIs(out.level, Level.HI)
@@ -0,0 +1,146 @@
+import unittest
+import random
+import primula
+from primula import gates, trace, Pull, Wire, Level, Simulation
+from primula.trace import Kind, ListSink
+from . import test_gates_sr, test_gates_jk
+
+
+class Test_Building(unittest.TestCase):
+    @staticmethod
+    def construct_jk_latch():
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return j, k, clk, s, r, q, qc
+
+    @staticmethod
+    def construct_nands(n, reverse=False, seed=1):
+        rng = random.Random(seed)
+        wires = [Wire(f'i{i}', Pull.DOWN) for i in range(8)]
+        pins = {}
+        for i in range(n):
+            g = gates.Nand()
+            a, b = rng.sample(wires, 2)
+            out = Wire(f'n{i}')
+            pins.setdefault(a, []).append(g.pins.a)
+            pins.setdefault(b, []).append(g.pins.b)
+            pins[out] = [g.pins.out]
+            wires.append(out)
+
+        for w in reversed(wires) if reverse else wires:
+            w.connect(*pins.get(w, ()))
+        return wires
+
+    def test_jk_latch(self):
+        with primula.building():
+            j, k, clk, s, r, q, qc = self.construct_jk_latch()
+
+        # The latch comes up the same way round as when it's built one
+        # connection at a time
+        ref = self.construct_jk_latch()
+        self.assertEqual([w.level for w in (j, k, clk, s, r, q, qc)],
+                         [w.level for w in ref])
+        self.assertEqual({q.level, qc.level}, {Level.LO, Level.HI})
+        self.assertEqual(s.level, Level.LO)
+        self.assertEqual(r.level, Level.LO)
+
+        k.drive(Level.HI)
+        clk.pulse()
+        k.drive(Level.LO)
+        self.assertEqual(q.level, Level.HI)
+        self.assertEqual(qc.level, Level.LO)
+
+    def test_loops(self):
+        """
+        Feedback loops are broken where they were closed, so latches which
+        neither input sets come up as they would have without building()
+        """
+
+        sr = test_gates_sr.Test_SRLatchCircuit
+        jk = test_gates_jk.Test_JKLatchCircuit
+        for construct in (sr.construct_sr_latch, jk.construct_jk_latch):
+            ref = construct()
+            with primula.building():
+                got = construct()
+            self.assertEqual([w.level for w in got], [w.level for w in ref])
+
+    def test_reconvergent(self):
+        # Building inputs first settles every gate in order, so there are no
+        # glitches. Settling at the end has to get the same answer regardless
+        # of the order the wires were connected in.
+        ref = self.construct_nands(300)
+        self.assertNotIn(Level.ERR, {w.level for w in ref})
+        with primula.building():
+            got = self.construct_nands(300, reverse=True)
+        self.assertEqual([w.level for w in got], [w.level for w in ref])
+
+    def test_deferred(self):
+        sink = ListSink()
+        with trace.tracing(sink):
+            with primula.building():
+                a = Wire('a', Pull.UP)
+                b = Wire('b')
+                inv = gates.Inverter()
+                a.connect(inv.pins.inp)
+                b.connect(inv.pins.out)
+                self.assertEqual(b.level, Level.FLT)
+                kinds = {r.kind for r in sink.records}
+                self.assertEqual(kinds, {Kind.CONNECT})
+        self.assertEqual(b.level, Level.LO)
+        self.assertIn(Kind.SEED, {r.kind for r in sink.records})
+
+    def test_conflict(self):
+        with primula.building():
+            a = Wire('a', Pull.UP)
+            b = Wire('b', Pull.DOWN)
+            out = Wire('out')
+            i1 = gates.Inverter()
+            i2 = gates.Inverter()
+            a.connect(i1.pins.inp)
+            b.connect(i2.pins.inp)
+            out.connect(i1.pins.out)
+            out.connect(i2.pins.out)
+        self.assertEqual(out.level, Level.ERR)
+
+    def test_nested(self):
+        with primula.building():
+            a = Wire('a', Pull.UP)
+            b = Wire('b')
+            inv = gates.Inverter()
+            with primula.building():
+                a.connect(inv.pins.inp)
+                b.connect(inv.pins.out)
+            self.assertEqual(b.level, Level.FLT)
+        self.assertEqual(b.level, Level.LO)
+
+    def test_raises(self):
+        a = Wire('a', Pull.UP)
+        inv = gates.Inverter()
+        with self.assertRaises(RuntimeError):
+            with primula.building():
+                a.connect(inv.pins.inp)
+                raise RuntimeError
+        self.assertIsNone(Simulation.deferred)
+        self.assertEqual(inv.pins.out.level, Level.FLT)
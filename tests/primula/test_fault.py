@@ -0,0 +1,92 @@
+import unittest
+from primula import fault, gates, latches, netlist, Pull, Wire, Level
+
+
+def gate(cls, out, *ins):
+    g = cls()
+    names = cls._pin_names
+    for name, w in zip(names, ins):
+        w.connect(getattr(g.pins, name))
+    out.connect(getattr(g.pins, names[len(ins)]))
+    return g
+
+
+class Test_Fault(unittest.TestCase):
+    def construct(self):
+        # y = a | (a & b) has redundant logic, z = ~(a & b) ^ c doesn't
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b', Pull.DOWN)
+        c = Wire('c', Pull.DOWN)
+        ab = Wire('ab')
+        y = Wire('y')
+        n = Wire('n')
+        z = Wire('z')
+        gate(gates.And, ab, a, b)
+        gate(gates.Or, y, a, ab)
+        gate(gates.Inverter, n, ab)
+        gate(gates.Xor, z, n, c)
+        return netlist.compile(a)
+
+    def test_faults(self):
+        nl = self.construct()
+        fs = fault.faults(nl)
+        stems = [f for f in fs if f.slot is None]
+        self.assertEqual(len(stems), 2 * nl.nr_nets)
+
+        # a and ab fan out to two pins each
+        self.assertEqual(len(fs) - len(stems), 8)
+        self.assertEqual(len(fault.faults(nl, branches=False)), len(stems))
+        self.assertEqual(sorted(nl.net(n) for n in ('y', 'z')),
+                         fault.outputs(nl))
+
+    def test_exhaustive(self):
+        nl = self.construct()
+        # In counting order, which changes several inputs at once
+        vectors = [{'a': i & 1, 'b': i >> 1 & 1, 'c': i >> 2 & 1}
+                   for i in range(8)]
+        cov = fault.simulate(nl, vectors)
+        self.assertLess(cov.coverage, 1.0)
+
+        # The only undetectable fault is ab stuck-at-0 on the or gate's input
+        rep = cov.report()
+        self.assertEqual(rep['faults'], len(fault.faults(nl)))
+        self.assertEqual(sorted(rep['undetected']), ['ab->Or[0].b sa0'])
+        self.assertEqual(sum(rep['detected_by_vector']), rep['detected'])
+
+        # Vectors don't touch the netlist
+        self.assertEqual(nl.level('a'), Level.LO)
+
+    def test_parallel(self):
+        # Packing many faults together finds the same as one at a time
+        nl = self.construct()
+        vectors = [{'a': 1, 'b': 1}, {'c': 1}, {'a': 0}, {'b': 0, 'a': 1}]
+        packed = fault.simulate(nl, vectors)
+        single = fault.simulate(nl, vectors, lanes=2)
+        self.assertEqual(packed.detected, single.detected)
+        self.assertGreater(len(packed.detected), 0)
+
+    def test_sequential(self):
+        s = Wire('s', Pull.DOWN)
+        r = Wire('r', Pull.DOWN)
+        q = Wire('q')
+        q_ = Wire('q_')
+        latch = latches.SR()
+        latch._levels[latch.pins.q.pin] = Level.LO.value
+        latch._levels[latch.pins.q_.pin] = Level.HI.value
+        s.connect(latch.pins.s)
+        r.connect(latch.pins.r)
+        q.connect(latch.pins.q)
+        q_.connect(latch.pins.q_)
+        nl = netlist.compile(s)
+
+        vectors = [{'s': 1}, {'s': 0}, {'r': 1}, {'r': 0}]
+        cov = fault.simulate(nl, vectors)
+
+        # Stuck-at-1 on s or r only makes the outputs float when the other
+        # is set, which isn't a definite difference
+        self.assertEqual(sorted(cov.report()['undetected']),
+                         ['r sa1', 's sa1'])
+
+        # Only the first vector is needed to find s stuck-at-0
+        f = fault.Fault(nl.net('s'), None, Level.LO)
+        self.assertEqual(cov.detected[f], 0)
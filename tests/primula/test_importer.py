@@ -0,0 +1,155 @@
+import io
+import unittest
+from itertools import product
+from primula import importer, gates, flipflops, Level
+from primula.errors import ParseError
+
+
+ADDER_BLIF = '''
+# full adder
+.model adder
+.inputs a b \\
+    cin
+.outputs s cout
+.names a b t
+01 1
+10 1
+.names t cin s
+01 1
+10 1
+.names a b cin cout
+11- 1
+1-1 1
+-11 1
+.end
+'''
+
+ADDER_VERILOG = '''
+module adder(input a, input b, input cin, output s, output cout);
+    wire t, ab, tc;
+    /* sum */
+    xor x1(t, a, b), x2(s, t, cin);
+    and (ab, a, b);
+    AND2 g(.A(t), .B(cin), .Y(tc));  // carry
+    assign cout = ab | tc;
+endmodule
+'''
+
+COUNTER_BLIF = '''
+# ripple counter
+.model count
+.inputs clk
+.outputs q0 q1
+.names q0 d0
+0 1
+.names q1 d1
+0 1
+.latch d0 q0 re clk 0
+.latch d1 q1 fe q0 0
+.end
+'''
+
+
+def _bits(i, n):
+    return [Level.HI if i & (1 << k) else Level.LO for k in range(n)]
+
+
+class Test_Importer(unittest.TestCase):
+    def check_adder(self, d):
+        self.assertEqual(d.name, 'adder')
+        self.assertEqual(sorted(d.inputs), ['a', 'b', 'cin'])
+        for a, b, c in product((0, 1), repeat=3):
+            for name, v in zip('a b cin'.split(), (a, b, c)):
+                d.inputs[name].drive(Level.HI if v else Level.LO)
+            total = a + b + c
+            self.assertEqual(d.outputs['s'].level,
+                             Level.HI if total & 1 else Level.LO)
+            self.assertEqual(d.outputs['cout'].level,
+                             Level.HI if total & 2 else Level.LO)
+
+    def test_blif(self):
+        d = importer.read_blif(io.StringIO(ADDER_BLIF))
+        self.check_adder(d)
+        self.assertEqual(sum(type(c) is gates.Xor for c in d.components), 2)
+
+    def test_verilog(self):
+        self.check_adder(importer.read_verilog(io.StringIO(ADDER_VERILOG)))
+
+    def test_covers(self):
+        cases = {
+            ('11', '1'): lambda a, b: a and b,
+            ('11', '0'): lambda a, b: not (a and b),
+            ('00', '0'): lambda a, b: a or b,
+            ('00', '1'): lambda a, b: not (a or b),
+            ('10', '1'): lambda a, b: a and not b,
+        }
+        for (cube, value), fn in cases.items():
+            src = f'.model m\n.inputs a b\n.outputs y\n' \
+                  f'.names a b y\n{cube} {value}\n.end\n'
+            d = importer.read_blif(io.StringIO(src))
+            for a, b in product((0, 1), repeat=2):
+                d.inputs['a'].drive(_bits(a, 1)[0])
+                d.inputs['b'].drive(_bits(b, 1)[0])
+                self.assertEqual(d.outputs['y'].level,
+                                 Level.HI if fn(a, b) else Level.LO,
+                                 (cube, value, a, b))
+
+    def test_latch(self):
+        d = importer.read_blif(io.StringIO(COUNTER_BLIF))
+        self.assertEqual(sum(type(c) is flipflops.JK for c in d.components),
+                         2)
+        clk = d.inputs['clk']
+        q = [d.outputs['q0'], d.outputs['q1']]
+
+        # The inverted clock of the second stage rises as the circuit
+        # settles, which counts as an edge, so start from wherever it is
+        count = sum(1 << k for k in range(2) if q[k].level is Level.HI)
+        for i in range(1, 6):
+            clk.pulse()
+            self.assertEqual([w.level for w in q], _bits(count + i, 2))
+
+    def test_vectors(self):
+        src = '''
+        module inv(a, y);
+            input [1:0] a;
+            output [1:0] y;
+            not (y[0], a[0]);
+            assign y[1] = ~a[1];
+        endmodule
+        '''
+        d = importer.read_verilog(io.StringIO(src))
+        self.assertEqual(list(d.inputs), ['a[1]', 'a[0]'])
+        d.inputs['a[0]'].drive(Level.HI)
+        self.assertEqual(d.outputs['y[0]'].level, Level.LO)
+        self.assertEqual(d.outputs['y[1]'].level, Level.HI)
+
+    def test_errors(self):
+        with self.assertRaises(ParseError) as cm:
+            importer.read_blif(io.StringIO('.model m\n.inputs a\n11 1\n'))
+        self.assertEqual(cm.exception.line, 3)
+        with self.assertRaises(ParseError):
+            importer.read_blif(io.StringIO('.model m\n.gate FOO a=b\n'))
+        with self.assertRaises(ParseError):
+            importer.read_verilog(io.StringIO('module m(a);\n'
+                                              'assign a = b & c | d;\n'))
+
+    def test_constants(self):
+        d = importer.read_verilog(io.StringIO(ADDER_VERILOG))
+        self.assertNotIn("1'b0", d.nets)
+        self.assertNotIn("1'b1", d.nets)
+
+        src = '''
+        module m(a, y, z);
+            input a;
+            output y, z;
+            and (y, a, 1'b1);
+            assign z = 1'b0;
+        endmodule
+        '''
+        d = importer.read_verilog(io.StringIO(src))
+        self.assertIn("1'b1", d.nets)
+        self.assertNotIn("1'b0", d.nets)
+        self.assertEqual(d.outputs['z'].level, Level.LO)
+        self.assertEqual(d.outputs['y'].level, Level.LO)
+        d.inputs['a'].drive(Level.HI)
+        self.assertEqual(d.outputs['y'].level, Level.HI)
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+from array import array
+from primula import memory, Bus, Pull, Wire
+from primula.bus import Word
+
+
+class Test_Memory(unittest.TestCase):
+    def test_rom(self):
+        data = array('H', (i * 3 for i in range(200)))
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'rom.bin')
+            with open(path, 'wb') as f:
+                f.write(data.tobytes())
+
+            rom = memory.ROM.from_file(path, 8, 12)
+            addr = Bus(8, 'addr', 0)
+            dout = Bus(12, 'dout')
+            addr.connect(rom.pins.addr)
+            dout.connect(rom.pins.dout)
+            self.assertEqual(dout.value, 0)
+
+            addr.drive(100)
+            self.assertEqual(dout.value, 300)
+            self.assertTrue(rom.contents.readonly)
+
+            # Past the end of the file
+            addr.drive(250)
+            self.assertEqual(dout.word, Word(0, 0xfff, 0))
+            del rom
+
+    def test_memory(self):
+        contents = bytearray(16 * 4)
+        mem = memory.Memory(4, 32, contents)
+        addr = Bus(4, 'addr', 3)
+        din = Bus(32, 'din', 0xdeadbeef)
+        we = Wire('we', Pull.DOWN)
+        dout = Bus(32, 'dout')
+        addr.connect(mem.pins.addr)
+        din.connect(mem.pins.din)
+        we.connect(mem.pins.we)
+        dout.connect(mem.pins.dout)
+        self.assertEqual(dout.value, 0)
+
+        we.pulse()
+        self.assertEqual(dout.value, 0xdeadbeef)
+
+        # The memory writes straight in to the buffer it was given
+        self.assertEqual(memoryview(contents).cast('I')[3], 0xdeadbeef)
+
+        addr.drive(4)
+        self.assertEqual(dout.value, 0)
+        addr.drive(Word(0, 1, 0))
+        self.assertIsNone(dout.value)
+
+    def test_contents(self):
+        with self.assertRaises(ValueError):
+            memory.ROM(2, 8, bytes(5))
+        with self.assertRaises(ValueError):
+            memory.ROM(4, 16, bytes(3))
+        with self.assertRaises(ValueError):
+            memory.Memory(4, 8, bytes(16))
+        with self.assertRaises(ValueError):
+            memory.ROM(4, 65)
+        self.assertEqual(len(memory.Memory(10, 16).contents), 1024)
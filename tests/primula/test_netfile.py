@@ -0,0 +1,181 @@
+import unittest
+import os
+import tempfile
+from primula import gates, netlist, netfile, errors, Pin, Pull, Wire, Level
+from primula.component import Component, EventGenerator
+
+
+class Toggle(Component):
+    __slots__ = ()
+    _pin_names = (
+        'clk',
+        'q',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        if self._levels[0] == Level.HI.value:
+            yield from self.assert_pin(1, self._levels[1] != Level.HI.value)
+
+
+class Test_NetFile(unittest.TestCase):
+    @staticmethod
+    def construct_jk_latch():
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return j, k, clk, s, r, q, qc
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.net')
+        os.close(fd)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_round_trip(self):
+        ref = self.construct_jk_latch()
+        netfile.save(self.path, ref[0])
+        nl = netfile.load(self.path)
+        self.assertIsNone(nl._wires)
+
+        for w in ref:
+            self.assertEqual(nl.level(w.name), w.level)
+
+        # Drive both by name, without creating any objects
+        for name, w in (('K', 1), ('CLK', 2)):
+            ref[w].drive(Level.HI)
+            ref[w].drive(Level.LO)
+            nl.pulse(name)
+        for w in ref:
+            self.assertEqual(nl.level(w.name), w.level)
+        self.assertIsNone(nl._wires)
+
+        # Now the objects, which are a working circuit in their own right
+        wires = nl.wires
+        self.assertEqual(sorted(w.name for w in wires),
+                         sorted(w.name for w in ref))
+        got = {w.name: w for w in wires}
+        for w in ref:
+            self.assertEqual(got[w.name].level, w.level)
+        got['J'].drive(Level.HI)
+        got['CLK'].pulse()
+        self.assertEqual(got['Q'].level, Level.LO)
+        self.assertEqual(got['Qc'].level, Level.HI)
+
+    def test_file_unchanged(self):
+        ref = self.construct_jk_latch()
+        netfile.save(self.path, ref[0])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        nl = netfile.load(self.path)
+        nl.drive('K', Level.HI)
+        nl.pulse('CLK')
+        del nl
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), data)
+
+    def test_save_loaded(self):
+        ref = self.construct_jk_latch()
+        netfile.save(self.path, ref[0])
+        nl = netfile.load(self.path)
+        nl.drive('K', Level.HI)
+        nl.pulse('CLK')
+
+        fd, path = tempfile.mkstemp(suffix='.net')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                netfile.save(f, nl)
+            again = netfile.load(path, objects=True)
+            self.assertIsNotNone(again._wires)
+            for name in ('J', 'K', 'CLK', 'S', 'R', 'Q', 'Qc'):
+                self.assertEqual(again.level(name), nl.level(name))
+        finally:
+            os.unlink(path)
+
+    def test_generic(self):
+        clk = Wire('clk', Pull.DOWN)
+        q = Wire('q')
+        t = Toggle()
+        clk.connect(t.pins.clk)
+        q.connect(t.pins.q)
+        netfile.save(self.path, clk)
+
+        nl = netfile.load(self.path)
+        self.assertEqual(nl.opcodes[0], netlist.OP_GENERIC)
+        nl.pulse('clk')
+        nl.pulse('clk')
+        nl.pulse('clk')
+        clk.pulse()
+        clk.pulse()
+        clk.pulse()
+        self.assertEqual(nl.level('q'), q.level)
+
+    def test_local_class(self):
+        class Local(gates.Inverter):
+            __slots__ = ()
+
+        w = Wire('w')
+        w.connect(Local().pins.inp)
+        with self.assertRaises(errors.NetFileError):
+            netfile.save(self.path, w)
+
+    def test_bad_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a netlist at all')
+        with self.assertRaises(errors.NetFileError):
+            netfile.load(self.path)
+
+    def test_not_component(self):
+        ref = self.construct_jk_latch()
+        netfile.save(self.path, ref[0])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        # Names of the same length, so the layout of the file still works
+        for old, new in ((b'primula.gates:Nor', b'primula.wire:Wire'),
+                         (b'primula.gates:And3', b'primula.netfile:os')):
+            with open(self.path, 'wb') as f:
+                f.write(data.replace(old, new))
+            with self.assertRaises(errors.NetFileError):
+                netfile.load(self.path)
+
+    def test_netlist_alone(self):
+        ref = self.construct_jk_latch()
+        nl = netlist.compile(ref[0])
+        with self.assertRaises(errors.NetFileError):
+            netfile.save(self.path, nl, ref[1])
+
+    def test_not_found(self):
+        ref = self.construct_jk_latch()
+        netfile.save(self.path, ref[0])
+        nl = netfile.load(self.path)
+        with self.assertRaises(KeyError):
+            nl.level('nope')
@@ -0,0 +1,183 @@
+import unittest
+from primula import gates, latches, flipflops, netlist, Pin, Pull, Wire, Level
+from primula.component import Component, EventGenerator
+
+
+class Buffer(Component):
+    __slots__ = ()
+    _pin_names = (
+        'inp',
+        'out',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        yield from self.assert_pin(1, self._levels[0])
+
+
+class Test_Netlist(unittest.TestCase):
+    @staticmethod
+    def construct_sr_latch():
+        nor1 = gates.Nor()
+        nor2 = gates.Nor()
+
+        s = Wire('S', Pull.DOWN)
+        s.connect(nor2.pins.b)
+
+        r = Wire('R', Pull.DOWN)
+        r.connect(nor1.pins.a)
+
+        q = Wire('Q')
+        q.connect(nor1.pins.out, nor2.pins.a)
+
+        qc = Wire('Qc')
+        qc.connect(nor2.pins.out, nor1.pins.b)
+
+        return s, r, q, qc
+
+    @staticmethod
+    def construct_jk_latch():
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return j, k, clk, s, r, q, qc
+
+    @staticmethod
+    def construct_jk_flip_flop():
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S', Pull.DOWN)
+        r = Wire('R', Pull.DOWN)
+        q = Wire('Q')
+        q_ = Wire('Q_')
+
+        flipflop = flipflops.JK()
+        clk.connect(flipflop.pins.clk)
+        s.connect(flipflop.pins.j)
+        r.connect(flipflop.pins.k)
+        q.connect(flipflop.pins.q)
+        q_.connect(flipflop.pins.q_)
+
+        return clk, s, r, q, q_
+
+    @staticmethod
+    def construct_sr_prefab():
+        s = Wire('S', Pull.DOWN)
+        r = Wire('R', Pull.DOWN)
+        q = Wire('Q')
+        q_ = Wire('Q_')
+
+        latch = latches.SR()
+        s.connect(latch.pins.s)
+        r.connect(latch.pins.r)
+        q.connect(latch.pins.q)
+        q_.connect(latch.pins.q_)
+
+        return s, r, q, q_
+
+    def check(self, construct, program):
+        """
+        Run the same stimulus through the object graph and a compiled copy
+        and make sure that every wire ends up in the same state.
+        """
+
+        ref = construct()
+        for i, level in program:
+            if level is None:
+                ref[i].pulse()
+            else:
+                ref[i].drive(level)
+
+        wires = construct()
+        nl = netlist.compile(*wires)
+        for i, level in program:
+            if level is None:
+                nl.pulse(wires[i])
+            else:
+                nl.drive(wires[i], level)
+
+        for a, b in zip(ref, wires):
+            self.assertEqual(a.level, b.level)
+            self.assertEqual(a.level, nl.level(b))
+
+    def test_compile(self):
+        s, r, q, qc = self.construct_sr_latch()
+        nl = netlist.compile(s)
+        self.assertEqual(nl.nr_nets, 4)
+        self.assertEqual(nl.nr_components, 2)
+        self.assertEqual(nl.opcodes[0], netlist.OP_NOR)
+        self.assertEqual(nl.level(qc), qc.level)
+
+    def test_not_found(self):
+        s, r, q, qc = self.construct_sr_latch()
+        nl = netlist.compile(s)
+        with self.assertRaises(KeyError):
+            nl.level(Wire())
+
+    def test_sr_latch(self):
+        self.check(self.construct_sr_latch, ((0, None), (1, None)))
+        self.check(self.construct_sr_latch, ((1, None), (0, None)))
+        self.check(self.construct_sr_latch, ((0, Level.HI), (1, Level.HI)))
+
+    def test_jk_latch(self):
+        self.check(self.construct_jk_latch, ((0, Level.HI), (2, None),
+                                             (0, Level.LO)))
+        self.check(self.construct_jk_latch, ((1, Level.HI), (2, None),
+                                             (1, Level.LO)))
+        self.check(self.construct_jk_latch, ((0, Level.HI), (1, Level.HI),
+                                             (2, None)))
+
+    def test_jk_flip_flop(self):
+        self.check(self.construct_jk_flip_flop, ((1, Level.HI), (0, None),
+                                                 (2, Level.HI), (0, None)))
+        self.check(self.construct_jk_flip_flop, ((2, Level.HI), (0, None),
+                                                 (1, Level.HI), (0, None)))
+
+    def test_sr_prefab(self):
+        self.check(self.construct_sr_prefab, ((0, None), (1, None)))
+        self.check(self.construct_sr_prefab, ((0, Level.HI), (1, Level.HI)))
+
+    def test_inverter_err(self):
+        def construct():
+            n = gates.Inverter()
+            err = Wire('err')
+            err.connect(n.pins.inp, n.pins.out)
+            return err,
+
+        self.check(construct, ((0, None),))
+
+    def test_generic(self):
+        def construct():
+            a = Wire('a', Pull.DOWN)
+            b = Wire('b')
+            buf = Buffer()
+            a.connect(buf.pins.inp)
+            b.connect(buf.pins.out)
+            return a, b
+
+        self.check(construct, ((0, Level.HI),))
+        self.check(construct, ((0, None),))
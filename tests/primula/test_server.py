@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import os
+import tempfile
+from primula import gates, latches, netlist, server, Pull, Wire, Level
+from primula.server import Client, Server
+
+
+class Test_Server(unittest.TestCase):
+    def construct(self):
+        s = Wire('s', Pull.DOWN)
+        r = Wire('r', Pull.DOWN)
+        q = Wire('q')
+        q_ = Wire('q_')
+        latch = latches.SR()
+        s.connect(latch.pins.s)
+        r.connect(latch.pins.r)
+        q.connect(latch.pins.q)
+        q_.connect(latch.pins.q_)
+
+        a = Wire('a', Pull.DOWN)
+        na = Wire('na')
+        inv = gates.Inverter()
+        a.connect(inv.pins.inp)
+        na.connect(inv.pins.out)
+
+        x = Wire('x', Pull.DOWN)
+        y = Wire('y', Pull.DOWN)
+        o = Wire('o')
+        xor = gates.Xor()
+        x.connect(xor.pins.a)
+        y.connect(xor.pins.b)
+        o.connect(xor.pins.out)
+        return netlist.compile(s, a, x)
+
+    def run_client(self, test):
+        nl = self.construct()
+
+        async def main(path):
+            srv = await Server(nl).start(path)
+            async with srv:
+                client = await Client.connect(path)
+                try:
+                    await test(nl, client)
+                finally:
+                    await client.close()
+
+        with tempfile.TemporaryDirectory() as d:
+            asyncio.run(main(os.path.join(d, 'sock')))
+
+    def test_drive_read(self):
+        async def test(nl, client):
+            s, r, q, a, na, bad = await client.lookup('s', 'r', 'q', 'a',
+                                                      'na', 'nope')
+            self.assertEqual(bad, -1)
+
+            # Each frame settles on its own, so pulses are kept
+            client.drive({s: Level.HI})
+            client.drive({s: Level.LO})
+            client.drive({a: Level.HI})
+            self.assertEqual(await client.read([s, q, na]),
+                             [Level.LO, Level.HI, Level.LO])
+            self.assertEqual(nl.level('q'), Level.HI)
+
+            # Lots of pipelined drives
+            for i in range(1000):
+                client.drive([(a, Level.LO if i & 1 else Level.HI)])
+            await client.sync()
+            self.assertEqual(await client.read([na]), [Level.HI])
+
+        self.run_client(test)
+
+    def test_subscribe(self):
+        async def test(nl, client):
+            r, q, q_ = await client.lookup('r', 'q', 'q_')
+            client.subscribe([q, q_])
+            client.drive({r: Level.HI})
+            await client.sync()
+            self.assertEqual(client.changes,
+                             [[(q, Level.LO), (q_, Level.HI)]])
+
+            client.unsubscribe([q_])
+            client.drive({r: Level.LO})
+            await client.sync()
+            self.assertEqual(len(client.changes), 1)
+
+        self.run_client(test)
+
+    def test_reconvergent(self):
+        async def test(nl, client):
+            x, y, o = await client.lookup('x', 'y', 'o')
+            client.subscribe([o])
+
+            # One frame after another, as if driven one after the other
+            client.drive({x: Level.HI})
+            client.drive({y: Level.HI})
+            self.assertEqual(await client.read([o]), [Level.LO])
+            self.assertEqual(client.changes,
+                             [[(o, Level.HI)], [(o, Level.LO)]])
+
+            # Both in one frame, at once
+            client.drive({x: Level.LO, y: Level.LO})
+            self.assertEqual(await client.read([o]), [Level.LO])
+            self.assertEqual(len(client.changes), 2)
+
+        self.run_client(test)
+
+    def test_errors(self):
+        async def test(nl, client):
+            with self.assertRaises(Exception):
+                await client.read([1000])
+            client.drive([(0, Level.FLT)])
+            with self.assertRaises(Exception):
+                await client.sync()
+
+            # The connection carries on after an error
+            self.assertEqual(len(await client.read([0])), 1)
+
+        self.run_client(test)
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'inv.blif')
+            with open(path, 'w') as f:
+                f.write('.model inv\n.inputs a\n.outputs y\n'
+                        '.names a y\n0 1\n.end\n')
+            nl = server.load(path)
+            self.assertEqual(nl.level('y'), Level.HI)
@@ -0,0 +1,99 @@
+import unittest
+from primula import gates, netlist, Pull, Wire, Level, Simulation
+from primula.vector import VectorNetlist
+
+
+class Test_Apply(unittest.TestCase):
+    @staticmethod
+    def construct_jk_latch():
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return j, k, clk, s, r, q, qc
+
+    def test_independent(self):
+        j, k, clk, s, r, q, qc = self.construct_jk_latch()
+        Simulation.apply({j: Level.LO, k: Level.HI})
+        clk.pulse()
+        self.assertEqual(j.level, Level.LO)
+        self.assertEqual(k.level, Level.HI)
+        self.assertEqual(q.level, Level.HI)
+        self.assertEqual(qc.level, Level.LO)
+
+    def test_and(self):
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b', Pull.DOWN)
+        out = Wire('out')
+        g = gates.And()
+        a.connect(g.pins.a)
+        b.connect(g.pins.b)
+        out.connect(g.pins.out)
+
+        Simulation.apply({a: Level.HI, b: Level.HI})
+        self.assertEqual(out.level, Level.HI)
+
+        Simulation.apply({a: Level.LO, b: Level.HI})
+        self.assertEqual(out.level, Level.LO)
+
+    def test_simultaneous(self):
+        # Both inputs of an Xor change in the same step, so the output
+        # changes twice on the way to the fix-point
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b', Pull.DOWN)
+        out = Wire('out')
+        g = gates.Xor()
+        a.connect(g.pins.a)
+        b.connect(g.pins.b)
+        out.connect(g.pins.out)
+
+        Simulation.apply({a: Level.HI, b: Level.HI})
+        self.assertIs(out.level, Level.LO)
+
+        a.drive(Level.LO)
+        self.assertEqual(out.level, Level.HI)
+
+        # Compiled, and in every lane
+        nl = netlist.compile(a)
+        nl.apply({a: Level.LO, b: Level.LO})
+        self.assertIs(nl.level(out), Level.LO)
+        nl.apply({a: Level.HI, b: Level.HI})
+        self.assertIs(nl.level(out), Level.LO)
+
+        vec = VectorNetlist(netlist.compile(a), 4)
+        vec.apply({a: 0b1010, b: 0b1100})
+        self.assertEqual(vec.lanes_at(out, Level.HI), 0b0110)
+        self.assertEqual(vec.lanes_at(out, Level.LO), 0b1001)
+
+    def test_netlist(self):
+        ref = self.construct_jk_latch()
+        Simulation.apply({ref[0]: Level.HI, ref[1]: Level.HI})
+        Simulation.apply({ref[2]: Level.HI})
+
+        wires = self.construct_jk_latch()
+        nl = netlist.compile(*wires)
+        nl.apply({wires[0]: Level.HI, wires[1]: Level.HI})
+        nl.apply({wires[2]: Level.HI})
+
+        for a, b in zip(ref, wires):
+            self.assertEqual(a.level, b.level)
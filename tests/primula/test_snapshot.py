@@ -0,0 +1,88 @@
+import unittest
+from primula import flipflops, netlist, snapshot, Pull, Wire, Level, Pin
+
+
+class Test_Snapshot(unittest.TestCase):
+    @staticmethod
+    def construct_jk_flip_flop():
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S', Pull.DOWN)
+        r = Wire('R', Pull.DOWN)
+        q = Wire('Q')
+        q_ = Wire('Q_')
+
+        flipflop = flipflops.JK()
+        clk.connect(flipflop.pins.clk)
+        s.connect(flipflop.pins.j)
+        r.connect(flipflop.pins.k)
+        q.connect(flipflop.pins.q)
+        q_.connect(flipflop.pins.q_)
+
+        return clk, s, r, q, q_
+
+    def test_restore(self):
+        clk, s, r, q, q_ = self.construct_jk_flip_flop()
+        r.drive(Level.HI)
+        clk.pulse()
+        r.drive(Level.LO)
+        reset = snapshot(clk)
+        self.assertEqual(len(reset.wires), 5)
+        self.assertEqual(len(reset), 5 * 6 + 2 * 5)
+
+        # Branch off twice from the reset state
+        for i in range(2):
+            s.drive(Level.HI)
+            clk.pulse()
+            self.assertEqual(q.level, Level.HI)
+            self.assertEqual(q_.level, Level.LO)
+
+            reset.restore()
+            self.assertEqual(s.level, Level.LO)
+            self.assertEqual(q.level, Level.LO)
+            self.assertEqual(q_.level, Level.HI)
+
+        # Toggle from reset and only then from set
+        s.drive(Level.HI)
+        r.drive(Level.HI)
+        clk.pulse()
+        self.assertEqual(q.level, Level.HI)
+        reset.take()
+        clk.pulse()
+        self.assertEqual(q.level, Level.LO)
+        reset.restore()
+        self.assertEqual(q.level, Level.HI)
+        clk.pulse()
+        self.assertEqual(q.level, Level.LO)
+
+    def test_netlist(self):
+        clk, s, r, q, q_ = self.construct_jk_flip_flop()
+        nl = netlist.compile(clk)
+        nl.drive(r, Level.HI)
+        nl.pulse(clk)
+        nl.drive(r, Level.LO)
+        state = nl.snapshot()
+
+        nl.drive(s, Level.HI)
+        nl.pulse(clk)
+        self.assertEqual(q.level, Level.HI)
+
+        nl.restore(state)
+        self.assertEqual(nl.level(s), Level.LO)
+        self.assertEqual(nl.level(q), Level.LO)
+        self.assertEqual(q.level, Level.LO)
+        self.assertEqual(s.level, Level.LO)
+
+        # The objects and the netlist agree after a restore
+        nl.drive(s, Level.HI)
+        nl.pulse(clk)
+        self.assertEqual(nl.level(q_), Level.LO)
+        self.assertEqual(q_.level, Level.LO)
+
+    def test_directions(self):
+        clk, s, r, q, q_ = self.construct_jk_flip_flop()
+        reset = snapshot(clk)
+        ff = q._pins[1].component
+        pin = ff.pins.q.pin
+        ff._set_pin_direction(pin, Pin.HIZ)
+        reset.restore()
+        self.assertEqual(ff.get_direction(pin), Pin.OUT)
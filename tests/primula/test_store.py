@@ -0,0 +1,110 @@
+import unittest
+import os
+import tempfile
+from primula import gates, netfile, errors, Pull, Level, Store
+
+
+def adder(size):
+    store = Store()
+    a = [store.wire(f'a{i}', Pull.DOWN) for i in range(size)]
+    b = [store.wire(f'b{i}', Pull.DOWN) for i in range(size)]
+    c = store.wire('cin', Pull.DOWN)
+    s = []
+    for i in range(size):
+        p = store.wire()
+        store.add(gates.Xor, a[i], b[i], p)
+        s.append(store.wire(f's{i}'))
+        store.add(gates.Xor, p, c, s[-1])
+        g = store.wire()
+        store.add(gates.And, a[i], b[i], g)
+        h = store.wire()
+        store.add(gates.And, p, c, h)
+        c = store.wire()
+        store.add(gates.Or, g, h, c)
+    return store, a, b, s + [c]
+
+
+def value(nl, nets):
+    return sum(1 << i for i, n in enumerate(nets)
+               if nl.levels[n] == Level.HI.value)
+
+
+class Test_Store(unittest.TestCase):
+    def test_adder(self):
+        store, a, b, s = adder(16)
+        self.assertEqual(store.nr_components, 80)
+        nl = store.netlist()
+        self.assertIs(store.netlist(), nl)
+
+        # The first settle merges the glitches of everything at once
+        self.assertEqual([nl.levels[n] for n in s], [Level.LO.value] * 17)
+        self.assertEqual(nl.levels.count(Level.ERR.value), 0)
+
+        nl.drive(a[3], Level.HI)
+        nl.drive(b[0], Level.HI)
+        nl.drive(b[3], Level.HI)
+        self.assertEqual(value(nl, s), 17)
+        self.assertIs(nl.level('s4'), Level.HI)
+
+    def test_objects(self):
+        store, a, b, s = adder(4)
+        nl = store.netlist()
+        nl.drive('a1', Level.HI)
+        self.assertEqual([w.name for w in nl.wires][:3], ['a0', 'a1', 'a2'])
+        self.assertIs(nl.wires[s[1]].level, Level.HI)
+        self.assertIsInstance(nl.components[0], gates.Xor)
+
+        # Once there are objects they are kept up to date too
+        nl.drive('b1', Level.HI)
+        self.assertIs(nl.wires[s[1]].level, Level.LO)
+        self.assertIs(nl.wires[s[2]].level, Level.HI)
+        self.assertIs(nl.components[1].pins.out.level, Level.LO)
+
+    def test_save(self):
+        store, a, b, s = adder(4)
+        nl = store.netlist()
+        nl.drive('a2', Level.HI)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'adder.net')
+            netfile.save(path, nl)
+            loaded = netfile.load(path)
+            self.assertEqual(bytes(loaded.levels), bytes(nl.levels))
+            loaded.drive('b2', Level.HI)
+            self.assertIs(loaded.level('s3'), Level.HI)
+
+    def test_feedback(self):
+        store = Store()
+        s = store.wire('S', Pull.DOWN)
+        r = store.wire('R', Pull.UP)
+        q = store.wire('Q')
+        qc = store.wire('Qc')
+        store.add(gates.Nor, r, qc, q)
+        store.add(gates.Nor, out=qc, a=q, b=s)
+        nl = store.netlist()
+        self.assertIs(nl.level(q), Level.LO)
+        self.assertIs(nl.level(qc), Level.HI)
+
+        nl.drive(r, Level.LO)
+        nl.pulse(s)
+        self.assertIs(nl.level(q), Level.HI)
+        self.assertIs(nl.level(qc), Level.LO)
+        nl.pulse(r)
+        self.assertIs(nl.level(q), Level.LO)
+        self.assertIs(nl.level(qc), Level.HI)
+
+    def test_errors(self):
+        store = Store()
+        n = store.wire()
+        with self.assertRaises(errors.PinNotFoundError):
+            store.add(gates.Inverter, n, n, n)
+        with self.assertRaises(errors.PinNotFoundError):
+            store.add(gates.Inverter, nope=n)
+        with self.assertRaises(errors.NetNotFoundError):
+            store.add(gates.Inverter, n + 1)
+        with self.assertRaises(TypeError):
+            store.add(int, n)
+
+        store.add(gates.Inverter, n)
+        store.netlist()
+        with self.assertRaises(errors.PrimulaError):
+            store.wire()
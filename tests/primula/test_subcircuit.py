@@ -0,0 +1,156 @@
+import unittest
+import random
+from primula import gates, trace, netlist, Pull, Wire, Level, Subcircuit
+from primula.trace import Kind, ListSink
+
+
+class JKLatch(Subcircuit):
+    _port_names = (
+        'j',
+        'k',
+        'clk',
+        'q',
+        'qc',
+    )
+
+    builds = 0
+
+    @staticmethod
+    def _build():
+        JKLatch.builds += 1
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return {
+            'j': j,
+            'k': k,
+            'clk': clk,
+            'q': q,
+            'qc': qc,
+        }
+
+
+class Test_Subcircuit(unittest.TestCase):
+    @staticmethod
+    def construct_jk_latch():
+        # This is a copy of what is in test_gates_master_slave_jk
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return j, k, clk, q, qc
+
+    def test_matches_hand_built(self):
+        rng = random.Random(3)
+        ref = self.construct_jk_latch()
+        latch = JKLatch()
+        p = latch.ports
+        got = (p.j, p.k, p.clk, p.q, p.qc)
+        self.assertEqual([w.level for w in got], [w.level for w in ref])
+
+        for i in range(50):
+            which = rng.randrange(3)
+            level = rng.choice((Level.LO, Level.HI))
+            ref[which].drive(level)
+            got[which].drive(level)
+            self.assertEqual([w.level for w in got],
+                             [w.level for w in ref])
+
+    def test_template_cached(self):
+        JKLatch()
+        builds = JKLatch.builds
+        latches = [JKLatch() for i in range(10)]
+        self.assertEqual(JKLatch.builds, builds)
+
+        # Copies share nothing
+        latches[0].ports.j.drive(Level.HI)
+        latches[0].ports.clk.pulse()
+        self.assertEqual(latches[0].ports.q.level, Level.LO)
+        for latch in latches[1:]:
+            self.assertIsNot(latch.ports.q, latches[0].ports.q)
+            self.assertEqual(latch.ports.q.level, Level.HI)
+
+    def test_no_simulation(self):
+        JKLatch()
+        sink = ListSink()
+        with trace.tracing(sink):
+            JKLatch(clk=Wire('clk', Pull.DOWN))
+        kinds = {r.kind for r in sink.records}
+        self.assertEqual(kinds, {Kind.CONNECT})
+
+    def test_shared_clock(self):
+        clk = Wire('clk', Pull.DOWN)
+        latches = [JKLatch(clk=clk) for i in range(4)]
+        for i, latch in enumerate(latches):
+            self.assertIs(latch.ports.clk, clk)
+            if i & 1:
+                latch.ports.j.drive(Level.HI)
+
+        clk.pulse()
+        for i, latch in enumerate(latches):
+            self.assertEqual(latch.ports.q.level,
+                             Level.LO if i & 1 else Level.HI)
+
+        nl = netlist.compile(clk)
+        self.assertEqual(len(nl.components), 16)
+
+    def test_bound_output(self):
+        q = Wire('q')
+        latch = JKLatch(q=q)
+        self.assertIs(latch.ports.q, q)
+        self.assertEqual(q.level, Level.HI)
+        latch.ports.j.drive(Level.HI)
+        latch.ports.clk.pulse()
+        self.assertEqual(q.level, Level.LO)
+
+    def test_bad_port(self):
+        with self.assertRaises(IndexError):
+            JKLatch(d=Wire())
+
+    def test_no_build(self):
+        class Empty(Subcircuit):
+            _port_names = ('a', )
+
+        with self.assertRaises(TypeError):
+            Empty()
@@ -0,0 +1,88 @@
+import unittest
+from itertools import product
+from primula import latches, gates, Pull, Wire, Level, sweep
+from primula.component import Component, EventGenerator
+from primula.base import Pin
+
+
+class Toggle(Component):
+    """
+    Not something the netlist can compile, so it runs as Python
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'clk',
+        'q',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        if self._levels[0] == Level.HI.value:
+            yield from self.assert_pin(1, self._levels[1] != Level.HI.value)
+
+
+def build():
+    s = Wire('s', Pull.DOWN)
+    r = Wire('r', Pull.DOWN)
+    q = Wire('q')
+    q_ = Wire('q_')
+    latch = latches.SR()
+    s.connect(latch.pins.s)
+    r.connect(latch.pins.r)
+    q.connect(latch.pins.q)
+    q_.connect(latch.pins.q_)
+
+    t = Wire('t')
+    toggle = Toggle()
+    s.connect(toggle.pins.clk)
+    t.connect(toggle.pins.q)
+
+    nq = Wire('nq')
+    inv = gates.Inverter()
+    q.connect(inv.pins.inp)
+    nq.connect(inv.pins.out)
+    return {'set': s, 'reset': r, 'q': q, 'nq': nq, 't': t}
+
+
+def reference(stimulus, observe):
+    nets = build()
+    out = []
+    for step in stimulus:
+        for name, v in step.items():
+            nets[name].drive(Level.HI if v else Level.LO)
+        out.append(tuple(nets[name].level for name in observe))
+    return out
+
+
+class Test_Sweep(unittest.TestCase):
+    def stimuli(self):
+        # Every sequence of three set or reset pulses
+        for seq in product(('set', 'reset'), repeat=3):
+            stim = []
+            for name in seq:
+                stim.append({name: 1})
+                stim.append({name: 0})
+            yield stim
+
+    def test_serial(self):
+        observe = ['q', 'nq', 't']
+        res = sweep(build, self.stimuli(), workers=1, observe=observe,
+                    chunk=3)
+        expect = [reference(stim, observe) for stim in self.stimuli()]
+        self.assertEqual(res, expect)
+
+    def test_parallel(self):
+        serial = sweep(build, self.stimuli(), workers=1)
+        res = sweep(build, self.stimuli(), workers=2, chunk=3)
+        self.assertEqual(len(res), 8)
+        self.assertEqual(res, serial)
+
+    def test_levels(self):
+        res = sweep(build, [[{'set': True}], [{'set': Level.LO}]],
+                    workers=1, observe=['q'])
+        self.assertEqual(res, [[(Level.HI,)], [(Level.FLT,)]])
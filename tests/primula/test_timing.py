@@ -0,0 +1,168 @@
+import unittest
+import random
+from primula import gates, errors, Pull, Wire, Level, Simulation
+from primula.timing import TimingWheel, Timeline
+
+
+class SlowInverter(gates.Inverter):
+    __slots__ = ()
+    _delay = 2
+
+
+class SlowAnd(gates.And):
+    __slots__ = ()
+    _delay = 1
+
+
+class Test_TimingWheel(unittest.TestCase):
+    def test_order(self):
+        rng = random.Random(1)
+        wheel = TimingWheel(16)
+        items = [(rng.randrange(1000), i) for i in range(500)]
+        for at, i in items:
+            wheel.push(at, i)
+        self.assertEqual(len(wheel), 500)
+
+        out = []
+        while len(wheel):
+            t, got = wheel.pop()
+            out.extend((t, i) for i in got)
+        self.assertEqual(out, sorted(items))
+
+    def test_past(self):
+        wheel = TimingWheel(4)
+        wheel.push(10, 'a')
+        wheel.pop()
+        with self.assertRaises(ValueError):
+            wheel.push(9, 'b')
+
+    def test_size(self):
+        with self.assertRaises(ValueError):
+            TimingWheel(12)
+
+
+class Test_Timeline(unittest.TestCase):
+    def setUp(self):
+        self.saved = Simulation.timeline
+        Simulation.timeline = Timeline()
+
+    def tearDown(self):
+        Simulation.timeline = self.saved
+
+    def test_chain(self):
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b')
+        c = Wire('c')
+        i1 = SlowInverter()
+        i2 = SlowInverter()
+        a.connect(i1.pins.inp)
+        b.connect(i1.pins.out, i2.pins.inp)
+        c.connect(i2.pins.out)
+        self.assertEqual(c.level, Level.LO)
+
+        tl = Simulation.timeline
+        a.drive(Level.HI, at=10)
+        tl.run(until=11)
+        self.assertEqual(a.level, Level.HI)
+        self.assertEqual(b.level, Level.HI)
+        tl.run(until=12)
+        self.assertEqual(b.level, Level.LO)
+        self.assertEqual(c.level, Level.LO)
+        tl.run()
+        self.assertEqual(c.level, Level.HI)
+        self.assertEqual(tl.now, 14)
+
+    def test_glitch(self):
+        # a AND (NOT a) with a slow inverter makes a short pulse on every
+        # rising edge of a
+        a = Wire('a', Pull.DOWN)
+        na = Wire('na')
+        out = Wire('out')
+        inv = SlowInverter()
+        g = gates.And()
+        a.connect(inv.pins.inp, g.pins.a)
+        na.connect(inv.pins.out, g.pins.b)
+        out.connect(g.pins.out)
+        self.assertEqual(out.level, Level.LO)
+
+        tl = Simulation.timeline
+        a.pulse(at=5, width=10)
+        tl.run(until=6)
+        self.assertEqual(out.level, Level.HI)
+        tl.run(until=7)
+        self.assertEqual(out.level, Level.LO)
+        tl.run()
+        self.assertEqual(out.level, Level.LO)
+        self.assertEqual(na.level, Level.HI)
+
+    def test_pulse_shorter_than_delay(self):
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b')
+        g = SlowAnd()
+        a.connect(g.pins.a, g.pins.b)
+        b.connect(g.pins.out)
+
+        tl = Simulation.timeline
+        a.pulse(at=1, width=1)
+        tl.run(until=2)
+        self.assertEqual(b.level, Level.HI)
+        tl.run()
+        self.assertEqual(b.level, Level.LO)
+
+
+class Test_Oscillation(unittest.TestCase):
+    @staticmethod
+    def construct_ring(n, cls=SlowInverter):
+        invs = [cls() for i in range(n)]
+        wires = [Wire(f'w{i}') for i in range(n)]
+        for i in range(n):
+            wires[i].connect(invs[i].pins.out, invs[(i + 1) % n].pins.inp)
+        return wires
+
+    def test_ring(self):
+        wires = self.construct_ring(3)
+        tl = Timeline(max_events=1000)
+        tl.schedule(tl.now, wires[0].pin(0), Level.HI)
+        with self.assertRaises(errors.OscillationError) as cm:
+            tl.run()
+        self.assertEqual(cm.exception.period, 12)
+        self.assertEqual(set(cm.exception.nets), set(wires))
+
+    def test_ring_default_budget(self):
+        wires = self.construct_ring(3)
+        tl = Timeline()
+        tl.schedule(tl.now, wires[0].pin(0), Level.HI)
+        with self.assertRaises(errors.OscillationError) as cm:
+            tl.run()
+        self.assertEqual(cm.exception.period, 12)
+
+    def test_until(self):
+        wires = self.construct_ring(3)
+        tl = Timeline(max_events=1000)
+        tl.schedule(tl.now, wires[0].pin(0), Level.HI)
+        tl.run(until=100)
+        self.assertEqual(tl.now, 100)
+        self.assertNotEqual(tl.pending, 0)
+
+    def test_settles(self):
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b')
+        inv = SlowInverter()
+        a.connect(inv.pins.inp)
+        b.connect(inv.pins.out)
+        tl = Timeline(max_events=100)
+        for t in range(0, 40, 4):
+            tl.schedule(t, a.pin(0), Level.HI if t & 4 else Level.LO)
+        tl.run()
+        self.assertEqual(b.level, Level.LO)
+
+    def test_budget(self):
+        saved = Simulation.max_events
+        Simulation.max_events = 5
+        try:
+            wires = self.construct_ring(8, gates.Inverter)
+            with self.assertRaises(errors.OscillationError) as cm:
+                wires[0].drive(Level.HI)
+            self.assertNotEqual(cm.exception.nets, ())
+        finally:
+            Simulation.max_events = saved
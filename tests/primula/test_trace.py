@@ -0,0 +1,50 @@
+import unittest
+from primula import gates, trace, Pull, Wire, Level
+from primula.trace import Kind
+
+
+class Test_Trace(unittest.TestCase):
+    def test_detached(self):
+        self.assertIsNone(trace.sink)
+
+    def test_records(self):
+        a = Wire('a', Pull.DOWN)
+        out = Wire('out')
+        g = gates.Inverter()
+        a.connect(g.pins.inp)
+        out.connect(g.pins.out)
+
+        with trace.tracing(trace.ListSink()) as sink:
+            a.drive(Level.HI)
+        self.assertIsNone(trace.sink)
+
+        kinds = [r.kind for r in sink.records]
+        self.assertEqual(kinds[0], Kind.DRIVE)
+        self.assertEqual(kinds[1], Kind.SEED)
+        self.assertEqual(kinds[-1], Kind.SETTLED)
+        self.assertIn(Kind.PROPAGATE, kinds)
+
+        asserts = [r for r in sink.records if r.kind == Kind.ASSERT]
+        self.assertEqual(len(asserts), 1)
+        self.assertIs(asserts[0].src.component, g)
+        self.assertIs(asserts[0].dst.component, out)
+        self.assertEqual(asserts[0].level, Level.LO)
+
+        steps = {r.step for r in sink.records if r.kind == Kind.EVENT}
+        self.assertEqual(len(steps), 1)
+
+        # Events carry the pin they came from, except for the seed
+        events = [r for r in sink.records if r.kind == Kind.EVENT]
+        self.assertIsNone(events[0].src)
+        self.assertIn((g.pins.out, out), [(r.src, r.dst.component)
+                                          for r in events])
+        self.assertIn((a.pin(0), g), [(r.src, r.dst.component)
+                                      for r in events])
+
+    def test_connect(self):
+        w = Wire('w')
+        g = gates.And()
+        with trace.tracing(trace.ListSink()) as sink:
+            w.connect(g.pins.a)
+        self.assertEqual(sink.records[0].kind, Kind.CONNECT)
+        self.assertIs(sink.records[0].dst.component, g)
@@ -0,0 +1,215 @@
+import unittest
+from itertools import product
+from primula import gates, latches, flipflops, netlist, Pin, Pull, Wire, Level
+from primula.component import Component, EventGenerator
+from primula.truthtable import tabulate
+
+
+class Majority(Component):
+    __slots__ = ()
+    _pin_names = (
+        'a',
+        'b',
+        'c',
+        'out',
+        'out_',
+    )
+
+    def __init__(self):
+        super().__init__()
+        for i in range(3):
+            self._set_pin_direction(i, Pin.IN)
+        self._set_pin_direction(3, Pin.OUT)
+        self._set_pin_direction(4, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        votes = sum(self._levels[i] == Level.HI.value for i in range(3))
+        yield from self.assert_pin(3, votes >= 2)
+        yield from self.assert_pin(4, votes < 2)
+
+
+class Toggle(Component):
+    """
+    Flips its output on every rising edge, so can't be tabulated
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'clk',
+        'q',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        if self._levels[0] == Level.HI.value:
+            yield from self.assert_pin(1, self._levels[1] != Level.HI.value)
+
+
+class OptOut(gates.Nand):
+    __slots__ = ()
+    _tabulate = False
+
+
+class Thresh(gates.Gate):
+    """
+    Buffer or inverter depending on how it was constructed
+    """
+
+    __slots__ = ('invert', )
+    _pin_names = (
+        'inp',
+        'out',
+    )
+
+    def __init__(self, invert: bool):
+        super().__init__()
+        self.invert = invert
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        yield from self.assert_pin(1, (self._levels[0] == Level.HI.value)
+                                   != self.invert)
+
+
+class Tristate(gates.Gate):
+    """
+    Only drives its output while enabled
+    """
+
+    __slots__ = ()
+    _pin_names = (
+        'en',
+        'inp',
+        'out',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.IN)
+        self._set_pin_direction(2, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        if self._levels[0] == Level.HI.value:
+            self._set_pin_direction(2, Pin.OUT)
+            yield from self.assert_pin(2, self._levels[1] == Level.HI.value)
+        else:
+            self._set_pin_direction(2, Pin.HIZ)
+
+
+class Test_TruthTable(unittest.TestCase):
+    def test_gates(self):
+        for cls in (gates.Nor, gates.Nand, gates.And, gates.And3, gates.Or,
+                    gates.Or3, gates.Xor, gates.Inverter):
+            g = cls()
+            lut = cls._lut
+            self.assertIsNotNone(lut, cls.__name__)
+
+            # Every entry matches running the gate's own logic
+            for levels in product(range(4), repeat=len(lut.inputs)):
+                for p, v in zip(lut.inputs, levels):
+                    g._levels[p] = v
+                for evt in g._on_change(lut.inputs[0]):
+                    pass
+                expect = g._levels[lut.outputs[0]]
+                self.assertEqual(lut.lookup(g._levels)[0], expect)
+
+    def test_flt(self):
+        g = gates.And()
+        idx = gates.And._lut.index((Level.HI.value, Level.FLT.value))
+        self.assertEqual(gates.And._lut.table[idx], Level.FLT.value)
+        self.assertEqual(g.pins.out.level, Level.FLT)
+
+    def test_stateful(self):
+        latches.SR()
+        flipflops.JK()
+        Toggle()
+        OptOut()
+        self.assertIsNone(latches.SR._lut)
+        self.assertIsNone(flipflops.JK._lut)
+        self.assertIsNone(Toggle._lut)
+        self.assertIsNone(OptOut._lut)
+
+    def test_arguments(self):
+        """
+        One table can't stand for instances constructed differently
+        """
+
+        inp = Wire('inp', Pull.DOWN)
+        buf = Wire('buf')
+        inv = Wire('inv')
+        b = Thresh(False)
+        i = Thresh(True)
+        self.assertIsNone(Thresh._lut)
+        inp.connect(b.pins.inp, i.pins.inp)
+        buf.connect(b.pins.out)
+        inv.connect(i.pins.out)
+        self.assertIs(buf.level, Level.LO)
+        self.assertIs(inv.level, Level.HI)
+
+    def test_directions(self):
+        t = Tristate()
+        self.assertIsNone(Tristate._lut)
+        self.assertIs(t.get_direction(2), Pin.OUT)
+
+    def test_user_defined(self):
+        a = Wire('a', Pull.DOWN)
+        b = Wire('b', Pull.DOWN)
+        c = Wire('c', Pull.DOWN)
+        out = Wire('out')
+        out_ = Wire('out_')
+        # Tabulated without asking for it
+        m = Majority()
+        self.assertNotIn('_tabulate', Majority.__dict__)
+        self.assertEqual(len(Majority._lut.table), 2 * 4 ** 3)
+
+        a.connect(m.pins.a)
+        b.connect(m.pins.b)
+        c.connect(m.pins.c)
+        out.connect(m.pins.out)
+        out_.connect(m.pins.out_)
+        self.assertEqual(out.level, Level.LO)
+        self.assertEqual(out_.level, Level.HI)
+
+        a.drive(Level.HI)
+        self.assertEqual(out.level, Level.LO)
+        c.drive(Level.HI)
+        self.assertEqual(out.level, Level.HI)
+        self.assertEqual(out_.level, Level.LO)
+
+        nl = netlist.compile(a)
+        self.assertEqual(nl.opcodes[nl.components.index(m)], netlist.OP_LUT)
+        nl.drive(a, Level.LO)
+        self.assertEqual(out.level, Level.LO)
+        self.assertEqual(out_.level, Level.HI)
+
+    def test_connected(self):
+        w = Wire('w')
+        g = gates.Nand()
+        w.connect(g.pins.a)
+        self.assertIsNone(tabulate(g))
+
+    def test_generic_netlist(self):
+        def construct():
+            clk = Wire('clk', Pull.DOWN)
+            q = Wire('q')
+            t = Toggle()
+            clk.connect(t.pins.clk)
+            q.connect(t.pins.q)
+            return clk, q
+
+        ref = construct()
+        for i in range(3):
+            ref[0].pulse()
+
+        wires = construct()
+        nl = netlist.compile(*wires)
+        self.assertEqual(nl.opcodes[0], netlist.OP_GENERIC)
+        for i in range(3):
+            nl.pulse(wires[0])
+        self.assertEqual(ref[1].level, wires[1].level)
@@ -0,0 +1,99 @@
+import io
+import unittest
+from primula import gates, vcd, Pull, Wire, Level, Simulation, Subcircuit
+from primula.errors import PrimulaError
+
+
+class Inv(Subcircuit):
+    __slots__ = ()
+    _port_names = ('a', 'y')
+
+    @staticmethod
+    def _build():
+        a = Wire('a', Pull.DOWN)
+        y = Wire('y')
+        g = gates.Inverter()
+        a.connect(g.pins.inp)
+        y.connect(g.pins.out)
+        return {'a': a, 'y': y}
+
+
+def _changes(text):
+    """
+    Time and value changes after the header
+    """
+
+    body = text.split('$enddefinitions $end\n')[1]
+    out = []
+    t = None
+    for line in body.splitlines():
+        if line.startswith('#'):
+            t = int(line[1:])
+        elif line[0] in '01xz':
+            out.append((t, line[0], line[1:]))
+    return out
+
+
+class Test_VCD(unittest.TestCase):
+    def test_header(self):
+        a = Wire('a', Pull.DOWN)
+        inv = Inv(a=a)
+        f = io.StringIO()
+        with vcd.VCDWriter(f) as w:
+            w.watch(a)
+            w.watch(inv, scope='top.inv')
+        text = f.getvalue()
+        self.assertIn('$timescale 1 ns $end', text)
+        self.assertIn('$scope module inv $end', text)
+        self.assertEqual(text.count('$var wire 1 '), 3)
+        self.assertEqual(text.count('$upscope $end'), 2)
+
+        # The port shares the outer wire, so they share a code
+        self.assertEqual(len(_changes(text)), 2)
+        self.assertIsNone(a._probe)
+
+    def test_changes(self):
+        a = Wire('a', Pull.DOWN)
+        y = Wire('y')
+        hidden = Wire('hidden')
+        g = gates.Inverter()
+        h = gates.Inverter()
+        a.connect(g.pins.inp, h.pins.inp)
+        y.connect(g.pins.out)
+        hidden.connect(h.pins.out)
+
+        f = io.StringIO()
+        with vcd.VCDWriter(f, chunk=1) as w:
+            w.watch(a, y)
+            a.drive(Level.HI)
+            a.drive(Level.LO)
+            with self.assertRaises(PrimulaError):
+                w.watch(hidden)
+        self.assertIsNone(hidden._probe)
+
+        codes = {'!': 'a', '"': 'y'}
+        got = [(t, v, codes[c]) for t, v, c in _changes(f.getvalue())]
+        self.assertEqual(got, [
+            (0, '0', 'a'), (0, '1', 'y'),
+            (1, '1', 'a'), (1, '0', 'y'),
+            (2, '0', 'a'), (2, '1', 'y'),
+        ])
+
+    def test_timeline(self):
+        a = Wire('a', Pull.DOWN)
+        f = io.StringIO()
+        tl = Simulation.timeline
+        with vcd.VCDWriter(f, clock=lambda: tl.now) as w:
+            w.watch(a)
+            start = tl.now
+            a.pulse(at=start + 5, width=3)
+            tl.run()
+        got = [(t - start, v) for t, v, c in _changes(f.getvalue())]
+        self.assertEqual(got, [(0, '0'), (5, '1'), (8, '0')])
+
+    def test_codes(self):
+        codes = [vcd._code(n) for n in range(10000)]
+        self.assertEqual(len(set(codes)), len(codes))
+        self.assertEqual(codes[0], '!')
+        self.assertTrue(all(c.isprintable() and ' ' not in c
+                            for c in codes))
@@ -0,0 +1,160 @@
+import unittest
+import random
+from primula import gates, latches, flipflops, netlist, Pin, Pull, Wire, Level
+from primula.component import Component, EventGenerator
+from primula.vector import VectorNetlist
+
+
+class Buffer(Component):
+    __slots__ = ()
+    _pin_names = (
+        'inp',
+        'out',
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._set_pin_direction(0, Pin.IN)
+        self._set_pin_direction(1, Pin.OUT)
+
+    def _on_change(self, pin: int) -> EventGenerator:
+        yield from self.assert_pin(1, self._levels[0])
+
+
+class Test_VectorNetlist(unittest.TestCase):
+    @staticmethod
+    def construct_jk_latch():
+        rnor = gates.Nor()
+        snor = gates.Nor()
+        kand = gates.And3()
+        jand = gates.And3()
+
+        j = Wire('J', Pull.DOWN)
+        k = Wire('K', Pull.DOWN)
+        clk = Wire('CLK', Pull.DOWN)
+        s = Wire('S')
+        r = Wire('R')
+        q = Wire('Q')
+        qc = Wire('Qc')
+
+        k.connect(kand.pins.b)
+        j.connect(jand.pins.b)
+
+        clk.connect(kand.pins.a, jand.pins.c)
+
+        s.connect(kand.pins.out, snor.pins.a)
+        r.connect(jand.pins.out, rnor.pins.b)
+
+        qc.connect(snor.pins.out, rnor.pins.a, kand.pins.c)
+        q.connect(rnor.pins.out, snor.pins.b, jand.pins.a)
+
+        return j, k, clk, s, r, q, qc
+
+    @staticmethod
+    def construct_mixed():
+        """
+        Every gate type plus the prefabricated latch and flip-flop
+        """
+
+        a = Wire('A', Pull.DOWN)
+        b = Wire('B', Pull.DOWN)
+        c = Wire('C', Pull.DOWN)
+        outs = []
+        for cls in (gates.Nor, gates.Nand, gates.And, gates.Or, gates.Xor):
+            g = cls()
+            a.connect(g.pins.a)
+            b.connect(g.pins.b)
+            w = Wire(cls.__name__)
+            w.connect(g.pins.out)
+            outs.append(w)
+        for cls in (gates.And3, gates.Or3):
+            g = cls()
+            a.connect(g.pins.a)
+            b.connect(g.pins.b)
+            c.connect(g.pins.c)
+            w = Wire(cls.__name__)
+            w.connect(g.pins.out)
+            outs.append(w)
+
+        inv = gates.Inverter()
+        c.connect(inv.pins.inp)
+        nc = Wire('NC')
+        nc.connect(inv.pins.out)
+
+        sr = latches.SR()
+        a.connect(sr.pins.s)
+        b.connect(sr.pins.r)
+        q = Wire('Q')
+        q_ = Wire('Q_')
+        q.connect(sr.pins.q)
+        q_.connect(sr.pins.q_)
+
+        jk = flipflops.JK()
+        c.connect(jk.pins.clk)
+        nc.connect(jk.pins.j)
+        b.connect(jk.pins.k)
+        jq = Wire('JQ')
+        jq_ = Wire('JQ_')
+        jq.connect(jk.pins.q)
+        jq_.connect(jk.pins.q_)
+
+        buf = Buffer()
+        jq.connect(buf.pins.inp)
+        bq = Wire('BQ')
+        bq.connect(buf.pins.out)
+
+        return (a, b, c, nc, q, q_, jq, jq_, bq, *outs)
+
+    def check(self, construct, nr_inputs, lanes=64, steps=20):
+        """
+        Drive random stimulus in every lane and compare each lane against the
+        scalar netlist running that lane's stimulus alone.
+        """
+
+        rng = random.Random(lanes * steps + nr_inputs)
+        program = [(rng.randrange(nr_inputs), rng.getrandbits(lanes))
+                   for x in range(steps)]
+
+        wires = construct()
+        vec = VectorNetlist(netlist.compile(*wires), lanes)
+        for i, value in program:
+            vec.drive(wires[i], value)
+
+        for lane in range(lanes):
+            ref = construct()
+            nl = netlist.compile(*ref)
+            for i, value in program:
+                level = Level.HI if (value >> lane) & 1 else Level.LO
+                nl.drive(ref[i], level)
+
+            for a, b in zip(ref, wires):
+                self.assertEqual(nl.level(a), vec.level(b, lane))
+
+    def test_jk_latch(self):
+        self.check(self.construct_jk_latch, 3)
+
+    def test_mixed(self):
+        self.check(self.construct_mixed, 3)
+
+    def test_wide(self):
+        self.check(self.construct_mixed, 3, lanes=200, steps=8)
+
+    def test_broadcast(self):
+        wires = self.construct_jk_latch()
+        j, k, clk, s, r, q, qc = wires
+        vec = VectorNetlist(netlist.compile(*wires), 8)
+        vec.drive(k, Level.HI)
+        vec.pulse(clk)
+        vec.drive(k, Level.LO)
+        self.assertEqual(vec.lanes_at(q, Level.HI), 0xff)
+        self.assertEqual(vec.levels(qc), [Level.LO] * 8)
+
+    def test_mask(self):
+        wires = self.construct_jk_latch()
+        j, k, clk, s, r, q, qc = wires
+        vec = VectorNetlist(netlist.compile(*wires), 4)
+        vec.drive(j, Level.HI, mask=0b0101)
+        vec.pulse(clk)
+        self.assertEqual(vec.lanes_at(q, Level.LO), 0b0101)
+        self.assertEqual(vec.lanes_at(q, Level.HI), 0b1010)
+        self.assertEqual(vec.lanes_at(j, Level.LO), 0b1010)
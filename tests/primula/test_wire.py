@@ -1,5 +1,5 @@
 import unittest
-from primula import gates, Pull, Wire, Level
+from primula import gates, activity, Pull, Wire, Level
 
 
 class Test_Wire(unittest.TestCase):
@@ -37,3 +37,41 @@ class Test_Wire(unittest.TestCase):
 
         b.drive(Level.HI)
         self.assertEqual(g.pins.out.level, Level.HI)
+
+    def test_pin_handles(self):
+        w = Wire()
+        g = gates.And()
+        self.assertIs(g.pins.a, g.pins.a)
+        self.assertIs(g.pin(2), g.pins.out)
+        w.connect(g.pins.a)
+        self.assertIs(w.pin(1), g._conns[0])
+        with self.assertRaises(IndexError):
+            g.pin(3)
+        with self.assertRaises(IndexError):
+            w.pin(2)
+
+    def test_connect_many(self):
+        clk = Wire('clk', Pull.UP)
+        invs = [gates.Inverter() for i in range(100)]
+        outs = [Wire() for inv in invs]
+        for inv, w in zip(invs, outs):
+            w.connect(inv.pins.out)
+
+        # All of the loads are settled together
+        with activity.profiling() as prof:
+            clk.connect(*(inv.pins.inp for inv in invs))
+        self.assertEqual(len(prof.depths), 1)
+        self.assertTrue(all(w.level is Level.LO for w in outs))
+        self.assertIs(clk.pin(100), invs[-1]._conns[0])
+
+        clk.drive(Level.LO)
+        self.assertTrue(all(w.level is Level.HI for w in outs))
+
+    def test_connect_reconvergent(self):
+        # Both inputs of the Nor change in the one settle of the connect,
+        # which changes its output twice on the way to the fix-point
+        nor = gates.Nor()
+        o = Wire('o')
+        o.connect(nor.pins.out)
+        Wire('w', Pull.DOWN).connect(nor.pins.a, nor.pins.b)
+        self.assertIs(o.level, Level.HI)